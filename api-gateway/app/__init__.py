@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# database/, messaging/ and telemetry/ live at the repository root. The
+# image sets PYTHONPATH=/app; running from api-gateway/ in a checkout does not.
+_repo_root = str(Path(__file__).resolve().parent.parent.parent)
+if _repo_root not in sys.path:
+    sys.path.append(_repo_root)
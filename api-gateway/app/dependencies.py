@@ -0,0 +1,37 @@
+from fastapi import Request
+from .services import (
+    BitNetClient, DatabaseClient, HealthMonitor, RabbitMQPublisher,
+    ServiceContainer, SideEffectDispatcher, YOLOClient
+)
+
+
+def get_services(request: Request) -> ServiceContainer:
+    return request.app.state.services
+
+
+def get_bitnet_client(request: Request) -> BitNetClient:
+    return get_services(request).bitnet_client
+
+
+def get_yolo_client(request: Request) -> YOLOClient:
+    return get_services(request).yolo_client
+
+
+def get_db_client(request: Request) -> DatabaseClient:
+    return get_services(request).db_client
+
+
+def get_firebase_backend(request: Request):
+    return get_services(request).firebase_backend
+
+
+def get_side_effects(request: Request) -> SideEffectDispatcher:
+    return get_services(request).side_effects
+
+
+def get_health_monitor(request: Request) -> HealthMonitor:
+    return get_services(request).health_monitor
+
+
+def get_publisher(request: Request) -> RabbitMQPublisher:
+    return get_services(request).publisher
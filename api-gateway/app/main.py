@@ -1,7 +1,10 @@
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routes import router
+from telemetry import instrument_app
+from .services import ServiceContainer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -9,10 +12,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    services = ServiceContainer()
+    await services.start()
+    app.state.services = services
+    yield
+    await services.stop()
+
+
 app = FastAPI(
     title="Milo AI Unified API Gateway",
     description="RESTful API Gateway for BitNet (Text) and YOLO (Vision) models",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -23,6 +37,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+instrument_app(app)
 app.include_router(router)
 
 if __name__ == "__main__":
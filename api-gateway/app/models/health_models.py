@@ -12,4 +12,5 @@ class HealthResponse(BaseModel):
     firebase_connected: bool = False
     firebase_stats: Optional[Dict[str, Any]] = None
     rabbitmq_connected: bool = False
+    upstreams: Optional[Dict[str, Any]] = None
 
@@ -1,25 +1,32 @@
+import json
+import time
 import logging
-from fastapi import APIRouter, HTTPException, status
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from ..models import CompletionRequest, CompletionResponse
-from ..services import BitNetClient, DatabaseClient, FirebaseClient, RabbitMQClient
-from ..utils import clean_response, is_low_quality_response
+from ..dependencies import get_bitnet_client, get_health_monitor, get_side_effects
+from ..services import BitNetClient, HealthMonitor, SideEffectDispatcher
+from ..utils import clean_response, is_low_quality_response, StreamingCleaner
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-bitnet_client = BitNetClient()
-db_client = DatabaseClient()
-firebase_client = FirebaseClient()
-rabbitmq_client = RabbitMQClient()
-
 
 @router.post("/completion", response_model=CompletionResponse, status_code=200)
-async def completion(request: CompletionRequest):
+async def completion(
+    request: CompletionRequest,
+    bitnet_client: BitNetClient = Depends(get_bitnet_client),
+    side_effects: SideEffectDispatcher = Depends(get_side_effects),
+    health_monitor: HealthMonitor = Depends(get_health_monitor)
+):
     try:
-        if not bitnet_client.is_healthy():
+        if health_monitor.is_down("bitnet"):
             raise HTTPException(status_code=503, detail="BitNet service unavailable")
         
-        result = bitnet_client.generate(
+        start = time.perf_counter()
+        result = await bitnet_client.generate(
             prompt=request.prompt,
             n_predict=request.n_predict,
             temperature=request.temperature,
@@ -47,25 +54,12 @@ async def completion(request: CompletionRequest):
             tokens_predicted=tokens
         )
         
-        db_client.log_request(
-            service="bitnet",
-            request_data=request.model_dump(),
-            response_data=response_data.model_dump(),
-            status="success"
-        )
-        
-        firebase_client.create_output(
+        await side_effects.submit(
             service="bitnet",
             request_data=request.model_dump(),
             response_data=response_data.model_dump(),
-            metadata={"mock": bitnet_client.mock_mode}
-        )
-        
-        rabbitmq_client.publish(
-            service="bitnet",
-            request_data=request.model_dump(),
-            response_data=response_data.model_dump(),
-            metadata={"mock": bitnet_client.mock_mode}
+            metadata={"mock": bitnet_client.mock_mode},
+            latency_ms=round((time.perf_counter() - start) * 1000, 2)
         )
         
         return response_data
@@ -76,3 +70,94 @@ async def completion(request: CompletionRequest):
         logger.exception(f"BitNet completion error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def _sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def _stream_completion(
+    request: CompletionRequest,
+    bitnet_client: BitNetClient,
+    side_effects: SideEffectDispatcher
+) -> AsyncIterator[str]:
+    cleaner = StreamingCleaner(prompt=request.prompt)
+    start = time.perf_counter()
+    tokens = None
+    stopped = True
+    
+    try:
+        chunks = bitnet_client.stream(
+            prompt=request.prompt,
+            n_predict=request.n_predict,
+            temperature=request.temperature,
+            stop=request.stop
+        )
+        # aclosing() shuts the upstream response when we return early.
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                delta = cleaner.feed(chunk.get("content", ""))
+                if cleaner.low_quality:
+                    yield _sse({"detail": "Low quality response generated"}, event="error")
+                    return
+                if delta:
+                    yield _sse({"content": delta})
+                if chunk.get("stop"):
+                    tokens = chunk.get("tokens_predicted")
+                    stopped = chunk.get("stop", True)
+                    break
+    except Exception as e:
+        logger.exception(f"BitNet streaming error: {e}")
+        yield _sse({"detail": str(e)}, event="error")
+        return
+    
+    content = cleaner.finish()
+    if not content:
+        yield _sse({"detail": "Empty response from model"}, event="error")
+        return
+    if cleaner.low_quality:
+        yield _sse({"detail": "Low quality response generated"}, event="error")
+        return
+    
+    if not isinstance(tokens, int):
+        tokens = len(content.split())
+    
+    response_data = CompletionResponse(
+        content=content,
+        stop=stopped,
+        generated_text=content,
+        tokens_predicted=tokens
+    )
+    
+    await side_effects.submit(
+        service="bitnet",
+        request_data=request.model_dump(),
+        response_data=response_data.model_dump(),
+        metadata={"mock": bitnet_client.mock_mode, "stream": True},
+        latency_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
+    
+    yield _sse(response_data.model_dump(), event="done")
+
+
+@router.post("/completion/stream", status_code=200)
+async def completion_stream(
+    request: CompletionRequest,
+    bitnet_client: BitNetClient = Depends(get_bitnet_client),
+    side_effects: SideEffectDispatcher = Depends(get_side_effects),
+    health_monitor: HealthMonitor = Depends(get_health_monitor)
+):
+    """Stream the completion as Server-Sent Events.
+
+    Each ``data`` event carries a cleaned ``content`` delta; the final
+    ``done`` event carries the full CompletionResponse, and ``error``
+    events carry a ``detail`` message.
+    """
+    if health_monitor.is_down("bitnet"):
+        raise HTTPException(status_code=503, detail="BitNet service unavailable")
+    
+    return StreamingResponse(
+        _stream_completion(request, bitnet_client, side_effects),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
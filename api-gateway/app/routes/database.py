@@ -1,19 +1,23 @@
+import asyncio
 import logging
+from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, HTTPException
-from ..services import DatabaseClient
+from fastapi import APIRouter, Depends, HTTPException
+from ..dependencies import get_db_client
+from ..services import RECORD_CACHE_ENABLED, DatabaseClient, request_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-db_client = DatabaseClient()
-
 
 @router.get("", status_code=200)
 async def get_all_requests(
     service: Optional[str] = None,
     limit: int = 50,
-    skip: int = 0
+    skip: int = 0,
+    include_bodies: bool = False,
+    cursor: Optional[str] = None,
+    db_client: DatabaseClient = Depends(get_db_client)
 ):
     if not db_client.available:
         raise HTTPException(
@@ -28,37 +32,101 @@ async def get_all_requests(
                 detail="Service must be 'bitnet' or 'yolo'"
             )
         
-        requests = db_client.get_requests(
+        page = await asyncio.to_thread(
+            db_client.get_requests_page,
             service=service,
             limit=min(limit, 100),
-            skip=skip
+            skip=skip,
+            include_bodies=include_bodies,
+            cursor=cursor
         )
         
         return {
-            "total": len(requests),
+            "total": len(page["requests"]),
             "service_filter": service,
             "limit": limit,
             "skip": skip,
-            "requests": requests
+            "cursor": cursor,
+            "next_cursor": page["next_cursor"],
+            "requests": page["requests"]
         }
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving requests: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/stats", status_code=200)
+async def get_request_stats(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "hour",
+    service: Optional[str] = None,
+    db_client: DatabaseClient = Depends(get_db_client)
+):
+    """Pre-aggregated request counts and latency (defaults to the last 24 hours).
+
+    Only covers the rollup retention window: minute buckets are kept for
+    MONGO_MINUTE_ROLLUP_RETENTION_DAYS.
+    """
+    if not db_client.available:
+        raise HTTPException(
+            status_code=503,
+            detail="Database service not available"
+        )
+    
+    if service and service not in ["bitnet", "yolo"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Service must be 'bitnet' or 'yolo'"
+        )
+    
+    try:
+        stats = await asyncio.to_thread(
+            db_client.get_request_stats,
+            start=start,
+            end=end,
+            granularity=granularity,
+            service=service
+        )
+        if not stats.get("connected"):
+            raise HTTPException(
+                status_code=503,
+                detail="Database service not available"
+            )
+        return stats
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error retrieving request stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{request_id}", status_code=200)
-async def get_request_by_id(request_id: str):
+async def get_request_by_id(
+    request_id: str,
+    db_client: DatabaseClient = Depends(get_db_client)
+):
     if not db_client.available:
         raise HTTPException(
             status_code=503,
             detail="Database service not available"
         )
     
+    if RECORD_CACHE_ENABLED:
+        cached = request_cache.get(request_id)
+        if cached is not None:
+            return cached
+    
     try:
-        request = db_client.get_request_by_id(request_id)
+        request = await asyncio.to_thread(db_client.get_request_by_id, request_id)
         
         if not request:
             raise HTTPException(
@@ -66,6 +134,8 @@ async def get_request_by_id(request_id: str):
                 detail=f"Request {request_id} not found"
             )
         
+        if RECORD_CACHE_ENABLED:
+            request_cache.set(request_id, request)
         return request
         
     except HTTPException:
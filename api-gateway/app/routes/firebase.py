@@ -1,35 +1,35 @@
-import os
 import logging
-import requests
 from typing import Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from ..models import FirebaseOutputRequest
+from ..dependencies import get_firebase_backend, get_health_monitor
+from ..services import RECORD_CACHE_ENABLED, FirebaseBackendError, HealthMonitor, output_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-FIREBASE_SERVICE_URL = os.getenv("FIREBASE_SERVICE_URL", "http://firebase-service:8002")
 
-
-@router.post("/outputs", status_code=status.HTTP_201_CREATED)
-async def create_firebase_output(request: FirebaseOutputRequest):
-    try:
-        response = requests.post(
-            f"{FIREBASE_SERVICE_URL}/outputs",
-            json=request.model_dump(),
-            timeout=10
-        )
-        if response.status_code != 201:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Firebase service error: {response.text}"
-            )
-        return response.json()
-    except requests.exceptions.ConnectionError:
+def _firebase_backend(
+    backend=Depends(get_firebase_backend),
+    health_monitor: HealthMonitor = Depends(get_health_monitor)
+):
+    if health_monitor.is_down("firebase"):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Firebase service not available"
         )
+    return backend
+
+
+@router.post("/outputs", status_code=status.HTTP_201_CREATED)
+async def create_firebase_output(
+    request: FirebaseOutputRequest,
+    backend=Depends(_firebase_backend)
+):
+    try:
+        return await backend.create_output(request.model_dump())
+    except FirebaseBackendError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except HTTPException:
         raise
     except Exception as e:
@@ -41,10 +41,11 @@ async def create_firebase_output(request: FirebaseOutputRequest):
 async def get_firebase_outputs(
     service: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    backend=Depends(_firebase_backend)
 ):
     try:
-        params = {"limit": limit, "offset": offset}
         if service:
             service = service.lower().strip()
             if service not in ["bitnet", "yolo"]:
@@ -52,24 +53,15 @@ async def get_firebase_outputs(
                     status_code=400,
                     detail="Service must be 'bitnet' or 'yolo'"
                 )
-            params["service"] = service
 
-        response = requests.get(
-            f"{FIREBASE_SERVICE_URL}/outputs",
-            params=params,
-            timeout=10
-        )
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Firebase service error: {response.text}"
-            )
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Firebase service not available"
+        return await backend.get_outputs(
+            service=service,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
         )
+    except FirebaseBackendError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except HTTPException:
         raise
     except Exception as e:
@@ -78,23 +70,21 @@ async def get_firebase_outputs(
 
 
 @router.get("/outputs/{output_id}", status_code=200)
-async def get_firebase_output(output_id: str):
+async def get_firebase_output(output_id: str, backend=Depends(_firebase_backend)):
+    if RECORD_CACHE_ENABLED:
+        cached = output_cache.get(output_id)
+        if cached is not None:
+            return cached
+
+    generation = output_cache.generation()
     try:
-        response = requests.get(
-            f"{FIREBASE_SERVICE_URL}/outputs/{output_id}",
-            timeout=10
-        )
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Firebase service error: {response.text}"
-            )
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Firebase service not available"
-        )
+        output = await backend.get_output(output_id)
+        if RECORD_CACHE_ENABLED:
+            # Not cached if a PUT/DELETE of this id finished while we were reading.
+            output_cache.set(output_id, output, generation=generation)
+        return output
+    except FirebaseBackendError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except HTTPException:
         raise
     except Exception as e:
@@ -105,53 +95,32 @@ async def get_firebase_output(output_id: str):
 @router.put("/outputs/{output_id}", status_code=200)
 async def update_firebase_output(
     output_id: str,
-    updates: Dict[str, Any]
+    updates: Dict[str, Any],
+    backend=Depends(_firebase_backend)
 ):
     try:
-        response = requests.put(
-            f"{FIREBASE_SERVICE_URL}/outputs/{output_id}",
-            json=updates,
-            timeout=10
-        )
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Firebase service error: {response.text}"
-            )
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Firebase service not available"
-        )
+        return await backend.update_output(output_id, updates)
+    except FirebaseBackendError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error updating Firebase output: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        output_cache.invalidate(output_id)
 
 
 @router.delete("/outputs/{output_id}", status_code=200)
-async def delete_firebase_output(output_id: str):
+async def delete_firebase_output(output_id: str, backend=Depends(_firebase_backend)):
     try:
-        response = requests.delete(
-            f"{FIREBASE_SERVICE_URL}/outputs/{output_id}",
-            timeout=10
-        )
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"Firebase service error: {response.text}"
-            )
-        return response.json()
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Firebase service not available"
-        )
+        return await backend.delete_output(output_id)
+    except FirebaseBackendError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error deleting Firebase output: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-
+    finally:
+        output_cache.invalidate(output_id)
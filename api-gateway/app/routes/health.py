@@ -1,20 +1,15 @@
 import os
-import requests
 import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from ..models import HealthResponse
-from ..services import BitNetClient, DatabaseClient, FirebaseClient, RabbitMQClient
+from ..dependencies import get_health_monitor, get_publisher, get_side_effects
+from ..services import (
+    HealthMonitor, RabbitMQPublisher, SideEffectDispatcher, completion_cache, output_cache, request_cache
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-bitnet_client = BitNetClient()
-YOLO_SERVICE_URL = os.getenv("YOLO_SERVICE_URL", "http://yolo-service:8001")
-FIREBASE_SERVICE_URL = os.getenv("FIREBASE_SERVICE_URL", "http://firebase-service:8002")
-db_client = DatabaseClient()
-firebase_client = FirebaseClient()
-rabbitmq_client = RabbitMQClient()
-
 
 @router.get("/", response_model=dict, status_code=200)
 async def root():
@@ -24,9 +19,14 @@ async def root():
         "framework": "FastAPI",
         "endpoints": {
             "POST /bitnet/completion": "Generate text completion (BitNet)",
+            "POST /bitnet/completion/stream": "Stream text completion as Server-Sent Events (BitNet)",
             "POST /yolo/detect": "Detect objects in image (YOLO)",
+            "POST /yolo/detect/batch": "Detect objects in many images or a zip/tar archive (YOLO)",
             "GET /health": "Check service health",
+            "GET /stats": "Gateway runtime statistics",
+            "GET /metrics": "Prometheus metrics",
             "GET /requests": "Get request history (MongoDB)",
+            "GET /requests/stats": "Get aggregated request stats (MongoDB)",
             "GET /requests/{id}": "Get specific request (MongoDB)",
             "POST /firebase/outputs": "Create model output (Firebase)",
             "GET /firebase/outputs": "Get model outputs (Firebase)",
@@ -51,41 +51,37 @@ async def root():
 
 
 @router.get("/health", response_model=HealthResponse, status_code=200)
-async def health_check():
-    bitnet_healthy = bitnet_client.is_healthy()
-    
-    yolo_available = False
-    try:
-        response = requests.get(f"{YOLO_SERVICE_URL}/health", timeout=2)
-        yolo_available = response.status_code == 200
-    except Exception:
-        pass
-    
-    db_connected = db_client.is_connected()
-    db_stats = db_client.get_stats()
-    
-    firebase_connected = False
-    firebase_stats = None
-    try:
-        response = requests.get(f"{FIREBASE_SERVICE_URL}/health", timeout=2)
-        if response.status_code == 200:
-            data = response.json()
-            firebase_connected = data.get("connected", False)
-            firebase_stats = data.get("stats")
-    except Exception:
-        firebase_connected = False
+async def health_check(monitor: HealthMonitor = Depends(get_health_monitor)):
+    if not monitor.has_run:
+        await monitor.refresh()
     
-    rabbitmq_connected = rabbitmq_client.is_connected()
+    bitnet_healthy = monitor.is_healthy("bitnet")
+    yolo_available = monitor.is_healthy("yolo")
     
     return HealthResponse(
         status="ok" if (bitnet_healthy and yolo_available) else "degraded",
         model_loaded=bitnet_healthy,
         llama_server_running=bitnet_healthy,
         yolo_available=yolo_available,
-        database_connected=db_connected,
-        database_stats=db_stats,
-        firebase_connected=firebase_connected,
-        firebase_stats=firebase_stats,
-        rabbitmq_connected=rabbitmq_connected
+        database_connected=monitor.is_healthy("mongodb"),
+        database_stats=monitor.details("mongodb"),
+        firebase_connected=monitor.is_healthy("firebase"),
+        firebase_stats=monitor.details("firebase"),
+        rabbitmq_connected=monitor.is_healthy("rabbitmq"),
+        upstreams=monitor.snapshot()
     )
 
+
+@router.get("/stats", response_model=dict, status_code=200)
+async def runtime_stats(
+    side_effects: SideEffectDispatcher = Depends(get_side_effects),
+    publisher: RabbitMQPublisher = Depends(get_publisher)
+):
+    return {
+        "worker_pid": os.getpid(),
+        "side_effects": side_effects.stats(),
+        "rabbitmq_publisher": publisher.stats(),
+        "completion_cache": completion_cache.stats(),
+        "output_cache": output_cache.stats(),
+        "request_cache": request_cache.stats()
+    }
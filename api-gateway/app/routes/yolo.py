@@ -1,29 +1,40 @@
+import time
 import logging
-import os
-import requests
-from fastapi import APIRouter, HTTPException, status, UploadFile, File
-from ..services import DatabaseClient, FirebaseClient, RabbitMQClient
+import httpx
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from telemetry import observe
+from ..dependencies import get_health_monitor, get_side_effects, get_yolo_client
+from ..services import HealthMonitor, SideEffectDispatcher, YOLOClient
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-YOLO_SERVICE_URL = os.getenv("YOLO_SERVICE_URL", "http://yolo-service:8001")
-db_client = DatabaseClient()
-firebase_client = FirebaseClient()
-rabbitmq_client = RabbitMQClient()
+
+def _require_yolo(health_monitor: HealthMonitor):
+    if health_monitor.is_down("yolo"):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="YOLO service is not available"
+        )
 
 
 @router.post("/detect", status_code=200)
-async def detect_objects_endpoint(file: UploadFile = File(...)):
+async def detect_objects_endpoint(
+    file: UploadFile = File(...),
+    yolo_client: YOLOClient = Depends(get_yolo_client),
+    side_effects: SideEffectDispatcher = Depends(get_side_effects),
+    health_monitor: HealthMonitor = Depends(get_health_monitor)
+):
+    _require_yolo(health_monitor)
     try:
         contents = await file.read()
         files = {"file": (file.filename or "image.jpg", contents, file.content_type)}
         
-        response = requests.post(
-            f"{YOLO_SERVICE_URL}/detect",
-            files=files,
-            timeout=30
-        )
+        start = time.perf_counter()
+        with observe("yolo", "detect"):
+            response = await yolo_client.http.post("/detect", files=files)
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
         
         if response.status_code != 200:
             raise HTTPException(
@@ -36,37 +47,86 @@ async def detect_objects_endpoint(file: UploadFile = File(...)):
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
         
-        db_client.log_request(
+        await side_effects.submit(
             service="yolo",
             request_data={"filename": file.filename, "content_type": file.content_type},
             response_data=result,
-            status="success"
+            metadata={"image_processed": True},
+            latency_ms=latency_ms
         )
         
-        firebase_client.create_output(
-            service="yolo",
-            request_data={"filename": file.filename, "content_type": file.content_type},
-            response_data=result,
-            metadata={"image_processed": True}
+        return result
+        
+    except HTTPException:
+        raise
+    except httpx.ConnectError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="YOLO service is not available"
         )
+    except Exception as e:
+        logger.error(f"YOLO processing error: {e}")
+        raise HTTPException(status_code=500, detail=f"YOLO processing error: {str(e)}")
+
+
+@router.post("/detect/batch", status_code=200)
+async def detect_objects_batch_endpoint(
+    files: Optional[List[UploadFile]] = File(default=None),
+    archive: Optional[UploadFile] = File(default=None),
+    yolo_client: YOLOClient = Depends(get_yolo_client),
+    side_effects: SideEffectDispatcher = Depends(get_side_effects),
+    health_monitor: HealthMonitor = Depends(get_health_monitor)
+):
+    _require_yolo(health_monitor)
+    try:
+        upload_files = []
+        for upload in files or []:
+            upload_files.append(
+                ("files", (upload.filename or "image.jpg", await upload.read(), upload.content_type))
+            )
+        if archive is not None:
+            upload_files.append(
+                ("archive", (archive.filename or "images.zip", await archive.read(), archive.content_type))
+            )
         
-        rabbitmq_client.publish(
+        if not upload_files:
+            raise HTTPException(status_code=400, detail="No images provided")
+        
+        start = time.perf_counter()
+        with observe("yolo", "detect_batch"):
+            response = await yolo_client.http.post("/detect/batch", files=upload_files)
+        latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"YOLO service error: {response.text}"
+            )
+        
+        result = response.json()
+        
+        await side_effects.submit_batch(
             service="yolo",
-            request_data={"filename": file.filename, "content_type": file.content_type},
-            response_data=result,
-            metadata={"image_processed": True}
+            items=[
+                {
+                    "request_data": {"filename": item.get("filename"), "batch": True},
+                    "response_data": {k: v for k, v in item.items() if k != "filename"},
+                    "metadata": {"image_processed": "error" not in item, "batch_size": result.get("total_images")}
+                }
+                for item in result.get("results", [])
+            ],
+            latency_ms=latency_ms
         )
         
         return result
         
     except HTTPException:
         raise
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="YOLO service is not available"
         )
     except Exception as e:
-        logger.error(f"YOLO processing error: {e}")
+        logger.error(f"YOLO batch processing error: {e}")
         raise HTTPException(status_code=500, detail=f"YOLO processing error: {str(e)}")
-
@@ -1,14 +1,34 @@
-from .bitnet_client import BitNetClient
+from .bitnet_client import BitNetClient, completion_cache
 from .yolo_client import YOLOClient
 from .database_client import DatabaseClient
 from .firebase_client import FirebaseClient
 from .rabbitmq_client import RabbitMQClient
+from .rabbitmq_publisher import RabbitMQPublisher, get_rabbitmq_publisher
+from .firebase_backend import FirebaseBackendError, create_firebase_backend
+from .record_cache import RECORD_CACHE_ENABLED, output_cache, request_cache
+from .http_client import get_http_client, close_http_clients
+from .side_effects import SideEffectDispatcher
+from .health_monitor import HealthMonitor
+from .container import ServiceContainer
 
 __all__ = [
     "BitNetClient",
+    "completion_cache",
     "YOLOClient",
     "DatabaseClient",
     "FirebaseClient",
     "RabbitMQClient",
+    "RabbitMQPublisher",
+    "get_rabbitmq_publisher",
+    "FirebaseBackendError",
+    "create_firebase_backend",
+    "RECORD_CACHE_ENABLED",
+    "output_cache",
+    "request_cache",
+    "get_http_client",
+    "close_http_clients",
+    "SideEffectDispatcher",
+    "HealthMonitor",
+    "ServiceContainer",
 ]
 
@@ -1,26 +1,54 @@
 import os
+import json
+import hashlib
 import logging
-from typing import Dict, Any, Optional
-import requests
+from typing import AsyncIterator, Dict, Any, Optional
+from telemetry import observe
+from .http_client import get_http_client
+from ..utils import TTLCache
 
 logger = logging.getLogger(__name__)
 
+COMPLETION_CACHE_ENABLED = os.getenv("COMPLETION_CACHE_ENABLED", "1") == "1"
+
+# Only deterministic (temperature == 0) completions are cached.
+completion_cache = TTLCache(
+    "completions",
+    max_entries=int(os.getenv("COMPLETION_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("COMPLETION_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.getenv("COMPLETION_CACHE_TTL", "3600"))
+)
+
+
+def completion_cache_key(prompt: str, n_predict: int, stop: Optional[list]) -> str:
+    # Exactly what is sent upstream: whitespace and stop order can change the output.
+    params = {
+        "prompt": prompt,
+        "n_predict": n_predict,
+        "stop": stop or [],
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
 
 class BitNetClient:
     def __init__(self, base_url: Optional[str] = None):
         self.base_url = (base_url or os.getenv("BITNET_URL", "http://bitnet:8080")).replace("/completion", "")
         self.mock_mode = os.getenv("BITNET_MOCK", "0") == "1"
-    
-    def is_healthy(self) -> bool:
+
+    @property
+    def http(self):
+        return get_http_client("bitnet", self.base_url, timeout=120)
+
+    async def is_healthy(self) -> bool:
         if self.mock_mode:
             return True
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=2)
+            response = await self.http.get("/health", timeout=2)
             return response.status_code == 200
         except Exception:
             return False
-    
-    def generate(self, prompt: str, n_predict: int = 50, temperature: float = 0.7, stop: Optional[list] = None) -> Dict[str, Any]:
+
+    async def generate(self, prompt: str, n_predict: int = 50, temperature: float = 0.7, stop: Optional[list] = None) -> Dict[str, Any]:
         if self.mock_mode:
             return {
                 "content": f"Test response: {prompt[:120]}",
@@ -28,23 +56,82 @@ class BitNetClient:
                 "generated_text": f"Test response: {prompt[:120]}",
                 "tokens_predicted": len(prompt.split()) + 6
             }
-        
+
+        cache_key = None
+        if COMPLETION_CACHE_ENABLED and temperature == 0:
+            cache_key = completion_cache_key(prompt, n_predict, stop)
+            cached = completion_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+
+        request_data = {
+            "prompt": prompt,
+            "n_predict": n_predict,
+            "temperature": temperature,
+        }
+        if stop:
+            request_data["stop"] = stop
+
+        with observe("bitnet", "completion"):
+            response = await self.http.post("/completion", json=request_data)
+
+            if response.status_code != 200:
+                raise Exception(f"BitNet error: {response.text}")
+
+        result = response.json()
+        if cache_key is not None:
+            completion_cache.set(cache_key, result)
+        return result
+
+    async def stream(self, prompt: str, n_predict: int = 50, temperature: float = 0.7, stop: Optional[list] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield llama-server streaming chunks ({"content": ..., "stop": ...})."""
+        if self.mock_mode:
+            words = f"Test response: {prompt[:120]}".split(" ")
+            for i, word in enumerate(words):
+                yield {"content": word if i == 0 else f" {word}", "stop": False}
+            yield {"content": "", "stop": True, "tokens_predicted": len(prompt.split()) + 6}
+            return
+
+        cache_key = None
+        if COMPLETION_CACHE_ENABLED and temperature == 0:
+            cache_key = completion_cache_key(prompt, n_predict, stop)
+            cached = completion_cache.get(cache_key)
+            if cached is not None:
+                yield {**cached, "stop": True}
+                return
+
         request_data = {
             "prompt": prompt,
             "n_predict": n_predict,
             "temperature": temperature,
+            "stream": True,
         }
         if stop:
             request_data["stop"] = stop
-        
-        response = requests.post(
-            f"{self.base_url}/completion",
-            json=request_data,
-            timeout=120
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"BitNet error: {response.text}")
-        
-        return response.json()
 
+        content = ""
+        with observe("bitnet", "completion_stream"):
+            async with self.http.stream("POST", "/completion", json=request_data) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise Exception(f"BitNet error: {body.decode(errors='replace')}")
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if not payload or payload == "[DONE]":
+                        continue
+                    chunk = json.loads(payload)
+                    content += chunk.get("content", "")
+                    if chunk.get("stop"):
+                        # Cache before the last yield: consumers may stop iterating at the stop chunk.
+                        if cache_key is not None:
+                            completion_cache.set(cache_key, {
+                                "content": content,
+                                "stop": True,
+                                "tokens_predicted": chunk.get("tokens_predicted", len(content.split()))
+                            })
+                        yield chunk
+                        return
+                    yield chunk
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from .bitnet_client import BitNetClient
+from .yolo_client import YOLOClient
+from .database_client import DatabaseClient
+from .firebase_client import FirebaseClient
+from .firebase_backend import create_firebase_backend
+from .rabbitmq_client import RabbitMQClient
+from .rabbitmq_publisher import get_rabbitmq_publisher
+from .http_client import close_http_clients
+from .side_effects import SideEffectDispatcher
+from .health_monitor import HealthMonitor
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """One instance of every gateway client, shared by all routes.
+
+    Created and started by the app lifespan (``app.state.services``) and
+    handed to routes through the dependencies in ``app.dependencies``.
+    """
+
+    def __init__(self):
+        self.publisher = get_rabbitmq_publisher()
+        self.bitnet_client = BitNetClient()
+        self.yolo_client = YOLOClient()
+        self.db_client = DatabaseClient()
+        self.firebase_client = FirebaseClient()
+        self.rabbitmq_client = RabbitMQClient()
+        self.firebase_backend = create_firebase_backend(self.firebase_client)
+        self.side_effects = SideEffectDispatcher(
+            db_client=self.db_client,
+            firebase_client=self.firebase_client,
+            rabbitmq_client=self.rabbitmq_client
+        )
+        self.health_monitor = HealthMonitor(
+            bitnet_client=self.bitnet_client,
+            yolo_client=self.yolo_client,
+            db_client=self.db_client,
+            rabbitmq_client=self.rabbitmq_client,
+            firebase_backend=self.firebase_backend
+        )
+
+    async def start(self):
+        self.publisher.start()
+        await self.warm_up()
+        await self.side_effects.start()
+        await self.health_monitor.start()
+
+    async def warm_up(self):
+        """Connect to MongoDB and Firestore and run one round of health checks.
+
+        The health round also opens the keep-alive pools to BitNet, YOLO
+        and the Firebase service, so the first request pays for none of it.
+        """
+        await asyncio.gather(
+            asyncio.to_thread(self.db_client.is_connected),
+            asyncio.to_thread(self.firebase_client.is_connected),
+            return_exceptions=True
+        )
+        try:
+            await self.health_monitor.refresh()
+        except Exception as e:
+            logger.warning(f"Initial health check failed: {e}")
+        states = ", ".join(
+            f"{name}={'up' if state['healthy'] else 'down'}"
+            for name, state in self.health_monitor.snapshot().items()
+        )
+        logger.info(f"Service clients ready ({states})")
+
+    async def stop(self):
+        await self.health_monitor.stop()
+        await self.side_effects.stop()
+        await asyncio.to_thread(self.db_client.close)
+        await asyncio.to_thread(self.firebase_client.flush)
+        await asyncio.to_thread(self.publisher.stop)
+        await close_http_clients()
@@ -1,6 +1,8 @@
 import os
 import logging
+from datetime import datetime
 from typing import Optional, List, Dict, Any
+from telemetry import observe
 
 logger = logging.getLogger(__name__)
 
@@ -39,25 +41,99 @@ class DatabaseClient:
         except Exception:
             return None
     
-    def log_request(self, service: str, request_data: Dict, response_data: Dict, status: str):
+    def log_request(self, service: str, request_data: Dict, response_data: Dict, status: str, latency_ms: Optional[float] = None) -> Optional[str]:
         if not self.available:
-            return
+            return None
         try:
             db_service = self._get_service()
-            db_service.log_request(service, request_data, response_data, status)
+            with observe("mongodb", "log_request"):
+                return db_service.log_request(service, request_data, response_data, status, latency_ms)
         except Exception as e:
             logger.warning(f"Failed to log request: {e}")
+            return None
     
-    def get_requests(self, service: Optional[str] = None, limit: int = 50, skip: int = 0) -> List[Dict[str, Any]]:
+    def log_requests(self, service: str, entries: List[Dict], status: str, latency_ms: Optional[float] = None) -> List[Optional[str]]:
         if not self.available:
             return []
         try:
             db_service = self._get_service()
-            return db_service.get_requests(service=service, limit=limit, skip=skip)
+            with observe("mongodb", "log_requests"):
+                return db_service.log_requests(service, entries, status, latency_ms)
+        except Exception as e:
+            logger.warning(f"Failed to log requests: {e}")
+            return []
+    
+    def flush(self):
+        if not self.available or self._service is None:
+            return
+        try:
+            self._service.flush()
+        except Exception as e:
+            logger.warning(f"Failed to flush request log: {e}")
+    
+    def close(self):
+        if not self.available or self._service is None:
+            return
+        try:
+            self._service.close()
+        except Exception as e:
+            logger.warning(f"Failed to close database connection: {e}")
+    
+    def get_requests(self, service: Optional[str] = None, limit: int = 50, skip: int = 0, include_bodies: bool = False) -> List[Dict[str, Any]]:
+        if not self.available:
+            return []
+        try:
+            db_service = self._get_service()
+            return db_service.get_requests(service=service, limit=limit, skip=skip, include_bodies=include_bodies)
         except Exception as e:
             logger.error(f"Error getting requests: {e}")
             return []
     
+    def get_requests_page(
+        self,
+        service: Optional[str] = None,
+        limit: int = 50,
+        skip: int = 0,
+        include_bodies: bool = False,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Raises ValueError for an invalid cursor."""
+        if not self.available:
+            return {"requests": [], "next_cursor": None}
+        try:
+            db_service = self._get_service()
+            return db_service.get_requests_page(
+                service=service,
+                limit=limit,
+                skip=skip,
+                include_bodies=include_bodies,
+                cursor=cursor
+            )
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting requests: {e}")
+            return {"requests": [], "next_cursor": None}
+    
+    def get_request_stats(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        granularity: str = "hour",
+        service: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Raises ValueError for an invalid range or granularity."""
+        if not self.available:
+            return {"connected": False}
+        try:
+            db_service = self._get_service()
+            return db_service.get_request_stats(start=start, end=end, granularity=granularity, service=service)
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting request stats: {e}")
+            return {"connected": False, "error": str(e)}
+    
     def get_request_by_id(self, request_id: str) -> Optional[Dict[str, Any]]:
         if not self.available:
             return None
@@ -0,0 +1,183 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from telemetry import observe
+from .firebase_client import FirebaseClient
+from .http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+# "remote" proxies to firebase-service over HTTP; "local" calls FirebaseService
+# in-process and skips that hop.
+FIREBASE_BACKEND = os.getenv("FIREBASE_BACKEND", "remote").lower()
+FIREBASE_SERVICE_URL = os.getenv("FIREBASE_SERVICE_URL", "http://firebase-service:8002")
+
+BACKENDS = ("remote", "local")
+
+
+class FirebaseBackendError(Exception):
+    """A CRUD call failed with the HTTP status the route should return."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class RemoteFirebaseBackend:
+    """Proxies the CRUD routes to firebase-service over the pooled HTTP client."""
+
+    name = "remote"
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        return get_http_client("firebase", FIREBASE_SERVICE_URL, timeout=10)
+
+    async def _request(self, operation: str, method: str, path: str, expected: int = 200, **kwargs) -> Dict[str, Any]:
+        try:
+            with observe("firebase_service", operation):
+                response = await self.http.request(method, path, **kwargs)
+        except httpx.ConnectError:
+            raise FirebaseBackendError(503, "Firebase service not available")
+        if response.status_code != expected:
+            raise FirebaseBackendError(response.status_code, f"Firebase service error: {response.text}")
+        return response.json()
+
+    async def health(self, timeout: float) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        response = await self.http.get("/health", timeout=timeout)
+        if response.status_code != 200:
+            return False, None
+        data = response.json()
+        return data.get("connected", False), data.get("stats")
+
+    async def create_output(self, output: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("create_output", "POST", "/outputs", expected=201, json=output)
+
+    async def get_outputs(
+        self,
+        service: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        params = {"limit": limit, "offset": offset}
+        if cursor:
+            params["cursor"] = cursor
+        if service:
+            params["service"] = service
+        return await self._request("get_outputs", "GET", "/outputs", params=params)
+
+    async def get_output(self, output_id: str) -> Dict[str, Any]:
+        return await self._request("get_output", "GET", f"/outputs/{output_id}")
+
+    async def update_output(self, output_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("update_output", "PUT", f"/outputs/{output_id}", json=updates)
+
+    async def delete_output(self, output_id: str) -> Dict[str, Any]:
+        return await self._request("delete_output", "DELETE", f"/outputs/{output_id}")
+
+
+class LocalFirebaseBackend:
+    """Calls FirebaseService in-process; responses match firebase-service."""
+
+    name = "local"
+
+    def __init__(self, firebase_client: Optional[FirebaseClient] = None):
+        self.firebase_client = firebase_client or FirebaseClient()
+
+    def _require_available(self):
+        if not self.firebase_client.available:
+            raise FirebaseBackendError(503, "Firebase service not available")
+        if not self.firebase_client.is_connected():
+            raise FirebaseBackendError(503, "Firebase not initialized")
+
+    async def health(self, timeout: float) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        connected = await asyncio.to_thread(self.firebase_client.is_connected)
+        stats = await asyncio.to_thread(self.firebase_client.get_stats) if connected else None
+        return connected, stats
+
+    async def create_output(self, output: Dict[str, Any]) -> Dict[str, Any]:
+        self._require_available()
+        if output.get("service") not in ["bitnet", "yolo"]:
+            raise FirebaseBackendError(400, "Service must be 'bitnet' or 'yolo'")
+        doc_id = await asyncio.to_thread(
+            self.firebase_client.create_output,
+            output["service"],
+            output["request_data"],
+            output["response_data"],
+            output.get("metadata")
+        )
+        if not doc_id:
+            raise FirebaseBackendError(500, "Failed to create output")
+        return {
+            "id": doc_id,
+            "message": "Output created successfully",
+            "service": output["service"]
+        }
+
+    async def get_outputs(
+        self,
+        service: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        self._require_available()
+        try:
+            page = await asyncio.to_thread(
+                self.firebase_client.get_outputs_page,
+                service=service,
+                limit=min(limit, 100),
+                offset=offset,
+                cursor=cursor
+            )
+        except ValueError as e:
+            raise FirebaseBackendError(400, str(e))
+        return {
+            "total": len(page["outputs"]),
+            "service_filter": service,
+            "limit": limit,
+            "offset": offset,
+            "cursor": cursor,
+            "next_cursor": page["next_cursor"],
+            "outputs": page["outputs"]
+        }
+
+    async def get_output(self, output_id: str) -> Dict[str, Any]:
+        self._require_available()
+        output = await asyncio.to_thread(self.firebase_client.get_output, output_id)
+        if not output:
+            raise FirebaseBackendError(404, f"Output {output_id} not found")
+        return output
+
+    async def update_output(self, output_id: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        self._require_available()
+        if not updates:
+            raise FirebaseBackendError(400, "No updates provided")
+        if not await asyncio.to_thread(self.firebase_client.update_output, output_id, updates):
+            raise FirebaseBackendError(404, f"Output {output_id} not found")
+        return {
+            "id": output_id,
+            "message": "Output updated successfully",
+            "updated_fields": list(updates.keys())
+        }
+
+    async def delete_output(self, output_id: str) -> Dict[str, Any]:
+        self._require_available()
+        if not await asyncio.to_thread(self.firebase_client.delete_output, output_id):
+            raise FirebaseBackendError(404, f"Output {output_id} not found")
+        return {
+            "id": output_id,
+            "message": "Output deleted successfully"
+        }
+
+
+def create_firebase_backend(firebase_client: Optional[FirebaseClient] = None, backend: str = FIREBASE_BACKEND):
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown Firebase backend '{backend}', using 'remote'")
+        backend = "remote"
+    instance = LocalFirebaseBackend(firebase_client) if backend == "local" else RemoteFirebaseBackend()
+    logger.info(f"Firebase routes use the {instance.name} backend")
+    return instance
@@ -1,6 +1,7 @@
 import os
 import logging
 from typing import Optional, List, Dict, Any
+from telemetry import observe
 
 logger = logging.getLogger(__name__)
 
@@ -46,11 +47,33 @@ class FirebaseClient:
             firebase_service = self._get_service()
             if not firebase_service:
                 return None
-            return firebase_service.create_output(service, request_data, response_data, metadata)
+            with observe("firestore", "create_output"):
+                return firebase_service.create_output(service, request_data, response_data, metadata)
         except Exception as e:
             logger.warning(f"Failed to store in Firebase: {e}")
             return None
 
+    def create_outputs(self, service: str, entries: List[Dict]) -> List[str]:
+        if not self.available:
+            return []
+        try:
+            firebase_service = self._get_service()
+            if not firebase_service:
+                return []
+            with observe("firestore", "create_outputs"):
+                return firebase_service.create_outputs(service, entries)
+        except Exception as e:
+            logger.warning(f"Failed to store batch in Firebase: {e}")
+            return []
+
+    def flush(self):
+        if not self.available or self._service is None:
+            return
+        try:
+            self._service.flush()
+        except Exception as e:
+            logger.warning(f"Failed to flush Firebase outputs: {e}")
+
     def get_outputs(self, service: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
         if not self.available:
             return []
@@ -63,6 +86,28 @@ class FirebaseClient:
             logger.error(f"Error getting outputs: {e}")
             return []
 
+    def get_outputs_page(
+        self,
+        service: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Raises ValueError for an invalid cursor."""
+        if not self.available:
+            return {"outputs": [], "next_cursor": None}
+        try:
+            firebase_service = self._get_service()
+            if not firebase_service:
+                return {"outputs": [], "next_cursor": None}
+            with observe("firestore", "get_outputs"):
+                return firebase_service.get_outputs_page(service=service, limit=limit, offset=offset, cursor=cursor)
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting outputs: {e}")
+            return {"outputs": [], "next_cursor": None}
+
     def get_output(self, output_id: str) -> Optional[Dict[str, Any]]:
         if not self.available:
             return None
@@ -70,7 +115,8 @@ class FirebaseClient:
             firebase_service = self._get_service()
             if not firebase_service:
                 return None
-            return firebase_service.get_output(output_id)
+            with observe("firestore", "get_output"):
+                return firebase_service.get_output(output_id)
         except Exception as e:
             logger.error(f"Error getting output: {e}")
             return None
@@ -82,7 +128,8 @@ class FirebaseClient:
             firebase_service = self._get_service()
             if not firebase_service:
                 return False
-            return firebase_service.update_output(output_id, updates)
+            with observe("firestore", "update_output"):
+                return firebase_service.update_output(output_id, updates)
         except Exception as e:
             logger.error(f"Error updating output: {e}")
             return False
@@ -94,7 +141,8 @@ class FirebaseClient:
             firebase_service = self._get_service()
             if not firebase_service:
                 return False
-            return firebase_service.delete_output(output_id)
+            with observe("firestore", "delete_output"):
+                return firebase_service.delete_output(output_id)
         except Exception as e:
             logger.error(f"Error deleting output: {e}")
             return False
@@ -0,0 +1,137 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from .bitnet_client import BitNetClient
+from .yolo_client import YOLOClient
+from .database_client import DatabaseClient
+from .rabbitmq_client import RabbitMQClient
+from .firebase_backend import create_firebase_backend
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "10"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+
+class HealthMonitor:
+    """Polls every upstream in the background and keeps the latest result.
+
+    Routes read the cached state (``is_down``) instead of probing an
+    upstream on every request; ``/health`` serves ``snapshot()``.
+    """
+
+    def __init__(
+        self,
+        bitnet_client: Optional[BitNetClient] = None,
+        yolo_client: Optional[YOLOClient] = None,
+        db_client: Optional[DatabaseClient] = None,
+        rabbitmq_client: Optional[RabbitMQClient] = None,
+        firebase_backend=None,
+        interval: float = HEALTH_CHECK_INTERVAL,
+        timeout: float = HEALTH_CHECK_TIMEOUT
+    ):
+        self.bitnet_client = bitnet_client or BitNetClient()
+        self.yolo_client = yolo_client or YOLOClient()
+        self.db_client = db_client or DatabaseClient()
+        self.rabbitmq_client = rabbitmq_client or RabbitMQClient()
+        self.firebase_backend = firebase_backend or create_firebase_backend()
+        self.interval = interval
+        self.timeout = timeout
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._rounds = 0
+        self._task: Optional[asyncio.Task] = None
+        self._checks: Dict[str, Callable[[], Awaitable[Tuple[bool, Optional[Dict[str, Any]]]]]] = {
+            "bitnet": self._check_bitnet,
+            "yolo": self._check_yolo,
+            "firebase": self._check_firebase,
+            "mongodb": self._check_mongodb,
+            "rabbitmq": self._check_rabbitmq,
+        }
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Health monitor started (interval={self.interval}s)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    @property
+    def has_run(self) -> bool:
+        return self._rounds > 0
+
+    def is_healthy(self, name: str) -> bool:
+        return self._state.get(name, {}).get("healthy", False)
+
+    def is_down(self, name: str) -> bool:
+        """True only if the last check of ``name`` failed (unknown is not down)."""
+        state = self._state.get(name)
+        return state is not None and not state["healthy"]
+
+    def details(self, name: str) -> Optional[Dict[str, Any]]:
+        return self._state.get(name, {}).get("details")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {k: v for k, v in state.items() if k != "details"}
+            for name, state in self._state.items()
+        }
+
+    async def refresh(self):
+        await asyncio.gather(*(self._check(name) for name in self._checks))
+        self._rounds += 1
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health monitor round failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _check(self, name: str):
+        start = time.perf_counter()
+        healthy, details, error = False, None, None
+        try:
+            healthy, details = await asyncio.wait_for(self._checks[name](), timeout=self.timeout * 3)
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except Exception as e:
+            error = str(e)
+
+        previous = self._state.get(name)
+        if previous is not None and previous["healthy"] != healthy:
+            logger.warning(f"Upstream {name} is now {'up' if healthy else 'down'}")
+        self._state[name] = {
+            "healthy": healthy,
+            "checked_at": datetime.utcnow().isoformat(),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "error": error,
+            "details": details,
+        }
+
+    async def _check_bitnet(self):
+        return await self.bitnet_client.is_healthy(), None
+
+    async def _check_yolo(self):
+        response = await self.yolo_client.http.get("/health", timeout=self.timeout)
+        return response.status_code == 200, None
+
+    async def _check_firebase(self):
+        return await self.firebase_backend.health(self.timeout)
+
+    async def _check_mongodb(self):
+        connected = await asyncio.to_thread(self.db_client.is_connected)
+        stats = await asyncio.to_thread(self.db_client.get_stats) if connected else None
+        return connected, stats
+
+    async def _check_rabbitmq(self):
+        return self.rabbitmq_client.is_connected(), self.rabbitmq_client.stats()
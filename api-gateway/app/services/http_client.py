@@ -0,0 +1,67 @@
+import os
+import logging
+from typing import Dict, Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_clients_pid = os.getpid()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def get_http_client(name: str, base_url: str, timeout: Optional[float] = None) -> httpx.AsyncClient:
+    """Shared keep-alive client for one upstream.
+
+    Pool size and timeout can be overridden per upstream with
+    ``<NAME>_POOL_SIZE``, ``<NAME>_KEEPALIVE`` and ``<NAME>_TIMEOUT``.
+    """
+    global _clients_pid
+    if _clients_pid != os.getpid():
+        # Pools created before a fork belong to the parent's event loop.
+        _clients.clear()
+        _clients_pid = os.getpid()
+
+    client = _clients.get(name)
+    if client is not None and not client.is_closed:
+        return client
+
+    prefix = name.upper()
+    limits = httpx.Limits(
+        max_connections=_env_int(f"{prefix}_POOL_SIZE", HTTP_MAX_CONNECTIONS),
+        max_keepalive_connections=_env_int(f"{prefix}_KEEPALIVE", HTTP_MAX_KEEPALIVE),
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    read_timeout = _env_float(f"{prefix}_TIMEOUT", timeout if timeout is not None else HTTP_TIMEOUT)
+    client = httpx.AsyncClient(
+        base_url=base_url,
+        limits=limits,
+        timeout=httpx.Timeout(read_timeout, connect=HTTP_CONNECT_TIMEOUT),
+    )
+    _clients[name] = client
+    logger.info(f"Created HTTP pool '{name}' -> {base_url} (max {limits.max_connections} connections)")
+    return client
+
+
+async def close_http_clients():
+    for name, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close HTTP pool '{name}': {e}")
+    _clients.clear()
@@ -1,82 +1,64 @@
-import os
-import json
 import logging
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from messaging import encode
+from telemetry import observe
+from .rabbitmq_publisher import get_rabbitmq_publisher
 
 logger = logging.getLogger(__name__)
 
-try:
-    import pika
-    RABBITMQ_AVAILABLE = True
-except ImportError:
-    RABBITMQ_AVAILABLE = False
-
-RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
-RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "model_outputs")
 
 class RabbitMQClient:
+    """Builds output messages and hands them to the process-wide publisher.
+
+    Publishing never blocks: messages are buffered and sent with publisher
+    confirms from the publisher's own IO thread.
+    """
+
     def __init__(self):
-        self.available = RABBITMQ_AVAILABLE
-        self.connection = None
-        self.channel = None
+        self.publisher = get_rabbitmq_publisher()
+        self.available = self.publisher.available
     
-    def _connect(self):
-        if not self.available:
-            return False
+    def publish(self, service: str, request_data: Dict, response_data: Dict, metadata: Optional[Dict] = None):
+        message = {
+            "service": service,
+            "request_data": request_data,
+            "response_data": response_data,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
         
-        try:
-            self.connection = pika.BlockingConnection(
-                pika.ConnectionParameters(host=RABBITMQ_HOST)
-            )
-            self.channel = self.connection.channel()
-            self.channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
-            return True
-        except Exception as e:
-            logger.warning(f"RabbitMQ connection failed: {e}")
-            return False
+        if metadata:
+            message["metadata"] = metadata
+        
+        self._send(message)
     
-    def publish(self, service: str, request_data: Dict, response_data: Dict, metadata: Optional[Dict] = None):
+    def publish_batch(self, service: str, items: List[Dict]):
+        """Publish several outputs of one service as a single message."""
+        message = {
+            "service": service,
+            "items": items,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        
+        self._send(message)
+    
+    def _send(self, message: Dict[str, Any]):
         if not self.available:
             return
         
         try:
-            if not self.channel or self.channel.is_closed:
-                if not self._connect():
-                    return
-            
-            message = {
-                "service": service,
-                "request_data": request_data,
-                "response_data": response_data,
-                "timestamp": datetime.utcnow().isoformat(),
-            }
-            
-            if metadata:
-                message["metadata"] = metadata
-            
-            self.channel.basic_publish(
-                exchange="",
-                routing_key=RABBITMQ_QUEUE,
-                body=json.dumps(message),
-                properties=pika.BasicProperties(delivery_mode=2)
-            )
-            
-            logger.info(f"Published {service} output to RabbitMQ")
+            # Encoding and buffering only; the broker round trip is timed by the publisher.
+            with observe("rabbitmq", "enqueue"):
+                body, content_type, content_encoding = encode(message)
+                self.publisher.publish(body, content_type, content_encoding)
         except Exception as e:
             logger.warning(f"Failed to publish to RabbitMQ: {e}")
     
     def is_connected(self) -> bool:
-        if not self.available:
-            return False
-        try:
-            if not self.channel or self.channel.is_closed:
-                return self._connect()
-            return True
-        except Exception:
-            return False
+        return self.available and self.publisher.is_connected()
+    
+    def stats(self) -> Dict[str, Any]:
+        return self.publisher.stats()
     
     def close(self):
-        if self.connection and not self.connection.is_closed:
-            self.connection.close()
-
+        self.publisher.stop()
@@ -0,0 +1,335 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from telemetry import record
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pika
+    RABBITMQ_AVAILABLE = True
+except ImportError:
+    RABBITMQ_AVAILABLE = False
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "model_outputs")
+RABBITMQ_CHANNELS = int(os.getenv("RABBITMQ_CHANNELS", "4"))
+RABBITMQ_BUFFER_SIZE = int(os.getenv("RABBITMQ_BUFFER_SIZE", "10000"))
+RABBITMQ_PUBLISH_BATCH = int(os.getenv("RABBITMQ_PUBLISH_BATCH", "100"))
+RABBITMQ_MAX_INFLIGHT = int(os.getenv("RABBITMQ_MAX_INFLIGHT", "1000"))
+RABBITMQ_RECONNECT_MIN = float(os.getenv("RABBITMQ_RECONNECT_MIN", "1"))
+RABBITMQ_RECONNECT_MAX = float(os.getenv("RABBITMQ_RECONNECT_MAX", "30"))
+
+# (body, content_type, content_encoding)
+Message = Tuple[bytes, str, Optional[str]]
+
+
+class RabbitMQPublisher:
+    """Process-wide, non-blocking RabbitMQ publisher.
+
+    ``publish()`` only appends to a bounded in-memory buffer and returns.
+    A dedicated IO thread runs pika's asynchronous ``SelectConnection``,
+    drains the buffer in batches round-robin over a pool of confirm-mode
+    channels, and tracks publisher confirms per channel. Nacked messages and
+    messages still unconfirmed when a channel or the connection drops go
+    back to the front of the buffer. Reconnects use exponential backoff and
+    never run on a request path. When the buffer is full the oldest
+    message is dropped.
+
+    The ``rabbitmq``/``publish`` latency metric runs from ``basic_publish``
+    to the broker's confirm.
+    """
+
+    def __init__(
+        self,
+        host: str = RABBITMQ_HOST,
+        queue: str = RABBITMQ_QUEUE,
+        channels: int = RABBITMQ_CHANNELS,
+        buffer_size: int = RABBITMQ_BUFFER_SIZE,
+        batch_size: int = RABBITMQ_PUBLISH_BATCH,
+        max_inflight: int = RABBITMQ_MAX_INFLIGHT
+    ):
+        self.available = RABBITMQ_AVAILABLE
+        self.host = host
+        self.queue = queue
+        self.channel_count = max(1, channels)
+        self.buffer_size = buffer_size
+        self.batch_size = max(1, batch_size)
+        self.max_inflight = max(1, max_inflight)
+
+        self._buffer: Deque[Message] = deque()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._connection = None
+        self._channels: List[Any] = []
+        # channel number -> delivery tag -> (message, monotonic time sent)
+        self._unconfirmed: Dict[int, "OrderedDict[int, Tuple[Message, float]]"] = {}
+        # Total of the maps above, kept by the IO thread so stats() need not
+        # iterate them while they change.
+        self._unconfirmed_count = 0
+        self._next_tag: Dict[int, int] = {}
+        self._round_robin = 0
+        self._drain_scheduled = False
+        self._reconnect_delay = RABBITMQ_RECONNECT_MIN
+        self._counters = {
+            "published": 0,
+            "confirmed": 0,
+            "nacked": 0,
+            "requeued": 0,
+            "dropped": 0,
+            "reconnects": 0,
+        }
+
+    def start(self):
+        if not self.available:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="rabbitmq-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Flush what can be flushed within ``timeout`` and close the connection."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        connection = self._connection
+        if connection is not None and connection.is_open:
+            deadline = time.monotonic() + timeout
+            connection.ioloop.add_callback_threadsafe(lambda: self._shutdown(deadline))
+        self._thread.join(timeout=timeout + 1)
+        self._thread = None
+        with self._lock:
+            pending = len(self._buffer)
+        if pending:
+            logger.warning(f"RabbitMQ publisher stopped with {pending} unpublished messages")
+
+    def publish(self, body: bytes, content_type: str = "application/json", content_encoding: Optional[str] = None) -> bool:
+        """Buffer a message for publishing. Never blocks on the broker."""
+        if not self.available:
+            return False
+        self.start()
+        with self._lock:
+            if len(self._buffer) >= self.buffer_size:
+                self._buffer.popleft()
+                self._counters["dropped"] += 1
+            self._buffer.append((body, content_type, content_encoding))
+            schedule = not self._drain_scheduled
+            self._drain_scheduled = True
+        if schedule:
+            self._schedule_drain()
+        return True
+
+    def is_connected(self) -> bool:
+        connection = self._connection
+        return bool(connection is not None and connection.is_open and self._channels)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "connected": self.is_connected(),
+            "channels": len(self._channels),
+            "buffered": buffered,
+            "buffer_capacity": self.buffer_size,
+            "unconfirmed": self._unconfirmed_count,
+            **self._counters,
+        }
+
+    # -- IO thread -------------------------------------------------------
+
+    def _run(self):
+        params = pika.ConnectionParameters(host=self.host, heartbeat=30)
+        while not self._stopping.is_set():
+            self._connection = pika.SelectConnection(
+                params,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_error,
+                on_close_callback=self._on_connection_closed
+            )
+            try:
+                self._connection.ioloop.start()
+            except Exception as e:
+                logger.error(f"RabbitMQ publisher IO loop crashed: {e}")
+            if self._stopping.is_set():
+                break
+            self._counters["reconnects"] += 1
+            logger.info(f"Reconnecting to RabbitMQ in {self._reconnect_delay:.0f}s")
+            self._stopping.wait(self._reconnect_delay)
+            self._reconnect_delay = min(self._reconnect_delay * 2, RABBITMQ_RECONNECT_MAX)
+        self._connection = None
+
+    def _schedule_drain(self):
+        connection = self._connection
+        if connection is None or not connection.is_open:
+            # Drained once a channel opens.
+            with self._lock:
+                self._drain_scheduled = False
+            return
+        try:
+            connection.ioloop.add_callback_threadsafe(self._drain)
+        except Exception:
+            with self._lock:
+                self._drain_scheduled = False
+
+    def _on_connection_open(self, connection):
+        logger.info(f"RabbitMQ publisher connected to {self.host}")
+        self._reconnect_delay = RABBITMQ_RECONNECT_MIN
+        for _ in range(self.channel_count):
+            connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection, error):
+        logger.warning(f"RabbitMQ connection failed: {error!r}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        if not self._stopping.is_set():
+            logger.warning(f"RabbitMQ connection closed: {reason}")
+        for channel in list(self._channels):
+            self._requeue_unconfirmed(channel.channel_number)
+        self._channels = []
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.queue_declare(
+            queue=self.queue,
+            durable=True,
+            callback=lambda _frame: channel.confirm_delivery(
+                ack_nack_callback=self._on_confirm,
+                callback=lambda _ok: self._on_channel_ready(channel)
+            )
+        )
+
+    def _on_channel_ready(self, channel):
+        self._unconfirmed[channel.channel_number] = OrderedDict()
+        self._next_tag[channel.channel_number] = 1
+        self._channels.append(channel)
+        self._drain()
+
+    def _on_channel_closed(self, channel, reason):
+        if channel in self._channels:
+            self._channels.remove(channel)
+        self._requeue_unconfirmed(channel.channel_number)
+        connection = self._connection
+        if not self._stopping.is_set() and connection is not None and connection.is_open:
+            logger.warning(f"RabbitMQ channel {channel.channel_number} closed: {reason}; reopening")
+            connection.channel(on_open_callback=self._on_channel_open)
+
+    def _requeue_unconfirmed(self, channel_number: int):
+        pending = self._unconfirmed.pop(channel_number, None)
+        self._next_tag.pop(channel_number, None)
+        if not pending:
+            return
+        self._unconfirmed_count -= len(pending)
+        with self._lock:
+            self._buffer.extendleft(reversed([message for message, _ in pending.values()]))
+        self._counters["requeued"] += len(pending)
+
+    def _on_confirm(self, frame):
+        method = frame.method
+        pending = self._unconfirmed.get(frame.channel_number)
+        if pending is None:
+            return
+        if method.multiple:
+            tags = [tag for tag in pending if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag] if method.delivery_tag in pending else []
+        entries = [pending.pop(tag) for tag in tags]
+        self._unconfirmed_count -= len(entries)
+        messages = [message for message, _ in entries]
+        nacked = method.NAME == "Basic.Nack"
+        now = time.monotonic()
+        for _, sent_at in entries:
+            record("rabbitmq", "publish", now - sent_at, error="Nack" if nacked else None)
+
+        if nacked:
+            self._counters["nacked"] += len(messages)
+            with self._lock:
+                self._buffer.extendleft(reversed(messages))
+        else:
+            self._counters["confirmed"] += len(messages)
+        self._drain()
+
+    def _drain(self):
+        with self._lock:
+            self._drain_scheduled = False
+        if not self._channels:
+            return
+
+        for _ in range(self.batch_size):
+            channel = self._next_channel()
+            if channel is None:
+                return
+            with self._lock:
+                if not self._buffer:
+                    return
+                message = self._buffer.popleft()
+            body, content_type, content_encoding = message
+            try:
+                channel.basic_publish(
+                    exchange="",
+                    routing_key=self.queue,
+                    body=body,
+                    properties=pika.BasicProperties(
+                        delivery_mode=2,
+                        content_type=content_type,
+                        content_encoding=content_encoding
+                    )
+                )
+            except Exception as e:
+                logger.warning(f"RabbitMQ publish failed: {e}")
+                with self._lock:
+                    self._buffer.appendleft(message)
+                return
+            number = channel.channel_number
+            tag = self._next_tag[number]
+            self._next_tag[number] = tag + 1
+            self._unconfirmed[number][tag] = (message, time.monotonic())
+            self._unconfirmed_count += 1
+            self._counters["published"] += 1
+
+        # Yield to the IO loop so confirms are processed, then keep going.
+        with self._lock:
+            more = bool(self._buffer) and not self._drain_scheduled
+            if more:
+                self._drain_scheduled = True
+        if more:
+            self._connection.ioloop.call_later(0, self._drain)
+
+    def _next_channel(self):
+        """Round-robin over open channels that are below the in-flight limit."""
+        for _ in range(len(self._channels)):
+            channel = self._channels[self._round_robin % len(self._channels)]
+            self._round_robin += 1
+            if channel.is_open and len(self._unconfirmed.get(channel.channel_number, ())) < self.max_inflight:
+                return channel
+        return None
+
+    def _shutdown(self, deadline: float):
+        self._drain()
+        with self._lock:
+            buffered = len(self._buffer)
+        if (self._unconfirmed_count or buffered) and time.monotonic() < deadline:
+            self._connection.ioloop.call_later(0.05, lambda: self._shutdown(deadline))
+            return
+        self._connection.close()
+
+
+_publisher: Optional[RabbitMQPublisher] = None
+_publisher_pid: Optional[int] = None
+
+
+def get_rabbitmq_publisher() -> RabbitMQPublisher:
+    """One publisher per process; a forked worker gets its own, since the
+    parent's IO thread and socket do not survive the fork."""
+    global _publisher, _publisher_pid
+    if _publisher is None or _publisher_pid != os.getpid():
+        _publisher = RabbitMQPublisher()
+        _publisher_pid = os.getpid()
+    return _publisher
@@ -0,0 +1,32 @@
+import os
+from ..utils import TTLCache
+
+RECORD_CACHE_ENABLED = os.getenv("RECORD_CACHE_ENABLED", "1") == "1"
+RECORD_CACHE_MAX_ENTRIES = int(os.getenv("RECORD_CACHE_MAX_ENTRIES", "10000"))
+RECORD_CACHE_MAX_BYTES = int(os.getenv("RECORD_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RECORD_CACHE_TTL = float(os.getenv("RECORD_CACHE_TTL", "300"))
+
+# Set by gunicorn.conf.py. Every worker has its own caches and a PUT/DELETE
+# only invalidates the worker that handled it, so with several workers
+# outputs are cached for OUTPUT_CACHE_MULTI_WORKER_TTL at most.
+GATEWAY_WORKERS = int(os.getenv("GATEWAY_WORKERS", "1"))
+OUTPUT_CACHE_MULTI_WORKER_TTL = float(os.getenv("OUTPUT_CACHE_MULTI_WORKER_TTL", "2"))
+OUTPUT_CACHE_TTL = (
+    RECORD_CACHE_TTL if GATEWAY_WORKERS <= 1
+    else min(RECORD_CACHE_TTL, OUTPUT_CACHE_MULTI_WORKER_TTL)
+)
+
+# Single records by id: Firebase outputs (invalidated by the gateway's
+# PUT/DELETE routes) and MongoDB request logs (never modified).
+output_cache = TTLCache(
+    "firebase-outputs",
+    max_entries=RECORD_CACHE_MAX_ENTRIES,
+    max_bytes=RECORD_CACHE_MAX_BYTES,
+    ttl=OUTPUT_CACHE_TTL
+)
+request_cache = TTLCache(
+    "requests",
+    max_entries=RECORD_CACHE_MAX_ENTRIES,
+    max_bytes=RECORD_CACHE_MAX_BYTES,
+    ttl=RECORD_CACHE_TTL
+)
@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List
+from .database_client import DatabaseClient
+from .firebase_client import FirebaseClient
+from .rabbitmq_client import RabbitMQClient
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+SIDE_EFFECT_QUEUE_SIZE = int(os.getenv("SIDE_EFFECT_QUEUE_SIZE", "1000"))
+SIDE_EFFECT_WORKERS = int(os.getenv("SIDE_EFFECT_WORKERS", "4"))
+SIDE_EFFECT_POLICY = os.getenv("SIDE_EFFECT_POLICY", "drop").lower()
+SIDE_EFFECT_SPILL_PATH = os.getenv("SIDE_EFFECT_SPILL_PATH", "/tmp/milo_side_effects.jsonl")
+SIDE_EFFECT_REPLAY_INTERVAL = float(os.getenv("SIDE_EFFECT_REPLAY_INTERVAL", "5"))
+SIDE_EFFECT_DRAIN_TIMEOUT = float(os.getenv("SIDE_EFFECT_DRAIN_TIMEOUT", "10"))
+
+POLICIES = ("drop", "block", "spill")
+
+
+class SideEffectDispatcher:
+    """Runs the post-inference writes (MongoDB log, Firebase output,
+    RabbitMQ publish) on background workers so routes only pay for the
+    model call.
+
+    When the queue is full the policy decides what happens to new records:
+    ``drop`` discards them, ``block`` waits for space and ``spill`` appends
+    them to a JSON lines file that is replayed once the queue has room.
+    Records still queued or in flight when ``stop`` times out are spilled
+    (and may then be written twice) or counted as dropped.
+    """
+
+    def __init__(
+        self,
+        db_client: Optional[DatabaseClient] = None,
+        firebase_client: Optional[FirebaseClient] = None,
+        rabbitmq_client: Optional[RabbitMQClient] = None,
+        max_size: int = SIDE_EFFECT_QUEUE_SIZE,
+        workers: int = SIDE_EFFECT_WORKERS,
+        policy: str = SIDE_EFFECT_POLICY,
+        spill_path: str = SIDE_EFFECT_SPILL_PATH
+    ):
+        if policy not in POLICIES:
+            logger.warning(f"Unknown side-effect policy '{policy}', using 'drop'")
+            policy = "drop"
+        self.db_client = db_client or DatabaseClient()
+        self.firebase_client = firebase_client or FirebaseClient()
+        self.rabbitmq_client = rabbitmq_client or RabbitMQClient()
+        self.max_size = max_size
+        self.workers = max(1, workers)
+        self.policy = policy
+        self.spill_path = spill_path
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._interrupted: List[Dict[str, Any]] = []
+        self._counters = {
+            "submitted": 0,
+            "processed": 0,
+            "failed": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "replayed": 0,
+        }
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._lag_last = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        if self.policy == "spill":
+            self._tasks.append(asyncio.create_task(self._replay_loop()))
+        logger.info(f"Side-effect dispatcher started ({self.workers} workers, policy={self.policy})")
+
+    async def stop(self, timeout: float = SIDE_EFFECT_DRAIN_TIMEOUT):
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Side-effect queue not drained after {timeout}s ({self._queue.qsize()} pending)")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        leftover, self._interrupted = self._interrupted, []
+        while not self._queue.empty():
+            leftover.append(self._queue.get_nowait())
+        if leftover:
+            if self.policy == "spill":
+                self._spill(leftover)
+            else:
+                self._counters["dropped"] += len(leftover)
+                logger.warning(f"Discarded {len(leftover)} pending side effects on shutdown")
+
+    async def submit(
+        self,
+        service: str,
+        request_data: Dict[str, Any],
+        response_data: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None,
+        status: str = "success",
+        latency_ms: Optional[float] = None
+    ) -> bool:
+        """Queue the writes for one model output. Returns False if dropped."""
+        return await self._enqueue({
+            "service": service,
+            "request_data": request_data,
+            "response_data": response_data,
+            "metadata": metadata,
+            "status": status,
+            "latency_ms": latency_ms,
+        })
+
+    async def submit_batch(
+        self,
+        service: str,
+        items: List[Dict[str, Any]],
+        status: str = "success",
+        latency_ms: Optional[float] = None
+    ) -> bool:
+        """Queue several outputs to be written with one bulk call per store.
+
+        Each item holds ``request_data``, ``response_data`` and optional ``metadata``.
+        """
+        return await self._enqueue({
+            "service": service,
+            "items": items,
+            "status": status,
+            "latency_ms": latency_ms,
+        })
+
+    async def _enqueue(self, record: Dict[str, Any]) -> bool:
+        await self.start()
+        service = record["service"]
+        record["enqueued_at"] = time.time()
+        self._counters["submitted"] += 1
+
+        if self.policy == "block":
+            await self._queue.put(record)
+            return True
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            if self.policy == "spill":
+                self._spill([record])
+                return True
+            self._counters["dropped"] += 1
+            logger.warning(f"Side-effect queue full, dropped {service} output")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        completed = self._counters["processed"] + self._counters["failed"]
+        return {
+            "policy": self.policy,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.max_size,
+            **self._counters,
+            "lag_ms": {
+                "last": round(self._lag_last * 1000, 2),
+                "max": round(self._lag_max * 1000, 2),
+                "avg": round(self._lag_total / completed * 1000, 2) if completed else 0.0,
+            },
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            record = await self._queue.get()
+            try:
+                await self._deliver(record)
+                self._counters["processed"] += 1
+            except asyncio.CancelledError:
+                self._interrupted.append(record)
+                raise
+            except Exception as e:
+                self._counters["failed"] += 1
+                logger.warning(f"Side-effect worker {index} failed for {record.get('service')}: {e}")
+            finally:
+                lag = time.time() - record.get("enqueued_at", time.time())
+                self._lag_last = lag
+                self._lag_max = max(self._lag_max, lag)
+                self._lag_total += lag
+                self._queue.task_done()
+
+    async def _deliver(self, record: Dict[str, Any]):
+        if "items" in record:
+            await self._deliver_batch(record)
+            return
+
+        service = record["service"]
+        request_data = record["request_data"]
+        response_data = record["response_data"]
+        metadata = record.get("metadata")
+
+        await asyncio.to_thread(
+            self.db_client.log_request,
+            service,
+            request_data,
+            response_data,
+            record.get("status", "success"),
+            record.get("latency_ms")
+        )
+        await asyncio.to_thread(
+            self.firebase_client.create_output,
+            service,
+            request_data,
+            response_data,
+            metadata
+        )
+        # Only buffers the message; the publisher thread does the network IO.
+        self.rabbitmq_client.publish(service, request_data, response_data, metadata)
+
+    async def _deliver_batch(self, record: Dict[str, Any]):
+        service = record["service"]
+        items = record["items"]
+
+        await asyncio.to_thread(
+            self.db_client.log_requests,
+            service,
+            items,
+            record.get("status", "success"),
+            record.get("latency_ms")
+        )
+        await asyncio.to_thread(self.firebase_client.create_outputs, service, items)
+        self.rabbitmq_client.publish_batch(service, items)
+
+    @contextmanager
+    def _spill_lock(self):
+        """Exclusive lock on the spill file; gateway workers share it."""
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(f"{self.spill_path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _spill(self, records: List[Dict[str, Any]]):
+        try:
+            with self._spill_lock(), open(self.spill_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+            self._counters["spilled"] += len(records)
+        except Exception as e:
+            self._counters["dropped"] += len(records)
+            logger.error(f"Failed to spill side effects to {self.spill_path}: {e}")
+
+    async def _replay_loop(self):
+        while True:
+            await asyncio.sleep(SIDE_EFFECT_REPLAY_INTERVAL)
+            if self._queue.qsize() > self.max_size // 2 or not os.path.exists(self.spill_path):
+                continue
+            replay_path = f"{self.spill_path}.{os.getpid()}.replay"
+            try:
+                with self._spill_lock():
+                    if not os.path.exists(self.spill_path):
+                        continue
+                    os.replace(self.spill_path, replay_path)
+                with open(replay_path, "r", encoding="utf-8") as f:
+                    lines = f.readlines()
+                os.remove(replay_path)
+            except Exception as e:
+                logger.error(f"Failed to read spilled side effects: {e}")
+                continue
+
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                await self._queue.put(record)
+                self._counters["replayed"] += 1
+            logger.info(f"Replayed {len(lines)} spilled side effects")
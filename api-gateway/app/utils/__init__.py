@@ -1,4 +1,4 @@
-from .response_utils import clean_response, is_low_quality_response
-
-__all__ = ["clean_response", "is_low_quality_response"]
+from .response_utils import clean_response, is_low_quality_response, StreamingCleaner
+from .cache import TTLCache
 
+__all__ = ["clean_response", "is_low_quality_response", "StreamingCleaner", "TTLCache"]
@@ -1,8 +1,47 @@
 import re
 import logging
+from collections import Counter
+from typing import List
 
 logger = logging.getLogger(__name__)
 
+# A cleaned answer repeating one line this often is a generation loop.
+REPEATED_LINE_LIMIT = 5
+# StreamingCleaner re-cleans only this much of the start of a stream.
+STREAM_HEAD_CHARS = 256
+
+
+def _line_key(line: str) -> str:
+    return re.sub(r'\s+', ' ', line.strip()).lower()
+
+
+def _keep_line(line_stripped: str) -> bool:
+    """Per-line filter of clean_response (lines are judged on their own)."""
+    return bool(line_stripped) and not (
+        line_stripped.startswith('- ') and len(line_stripped) < 10 or
+        (line_stripped.count('|') >= 2 and 'comment' in line_stripped.lower()) or
+        (line_stripped.isdigit() and len(line_stripped) < 3) or
+        (len(line_stripped) < 5 and '?' in line_stripped)
+    )
+
+
+def _is_table_row(line: str) -> bool:
+    """A "| 12-01-2024 |"-style row: an inner cell shaped like a date.
+
+    Cells between two pipes never change as text is appended, and any text
+    containing such a row fails is_low_quality_response, so this is safe to
+    check on a prefix of a stream.
+    """
+    return (
+        line.count('|') >= 2 and any(char.isdigit() for char in line) and
+        any(part.strip().count('-') == 2 for part in line.split('|')[1:-1])
+    )
+
+
+def _has_repeated_line(lines: List[str]) -> bool:
+    counts = Counter(_line_key(line) for line in lines if line.strip())
+    return bool(counts) and max(counts.values()) >= REPEATED_LINE_LIMIT
+
 
 def is_low_quality_response(content: str) -> bool:
     if not content or len(content.strip()) < 3:
@@ -11,6 +50,10 @@ def is_low_quality_response(content: str) -> bool:
     content_lower = content.lower()
     lines = content.split('\n')
     
+    if _has_repeated_line(lines):
+        logger.warning("Detected repeated-line pattern")
+        return True
+    
     question_lines = sum(1 for line in lines if line.strip().endswith('?') and len(line.strip()) < 100)
     if question_lines >= 3 and len(lines) < 20:
         logger.warning("Detected question-spamming pattern")
@@ -50,16 +93,7 @@ def clean_response(content: str, prompt: str = "") -> str:
     content = re.sub(r'^\s*\|\s*\d{1,2}-\d{1,2}-\d{4}\s*\|\s*\d+\s*[Cc]omments?\s*', '', content)
     
     lines = content.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        line_stripped = line.strip()
-        if line_stripped and not (
-            line_stripped.startswith('- ') and len(line_stripped) < 10 or
-            (line_stripped.count('|') >= 2 and 'comment' in line_stripped.lower()) or
-            (line_stripped.isdigit() and len(line_stripped) < 3) or
-            (len(line_stripped) < 5 and '?' in line_stripped)
-        ):
-            cleaned_lines.append(line)
+    cleaned_lines = [line for line in lines if _keep_line(line.strip())]
     
     content = '\n'.join(cleaned_lines).strip()
     content = re.sub(r'\n{3,}', '\n\n', content)
@@ -67,3 +101,174 @@ def clean_response(content: str, prompt: str = "") -> str:
     
     return content.strip()
 
+
+class StreamingCleaner:
+    """Cleans text as it streams in, in time linear in its length.
+
+    The first ``STREAM_HEAD_CHARS`` characters are re-cleaned with
+    clean_response on every chunk, which strips an echoed prompt or an "A:"
+    marker. After that only the new text is cleaned, line by line with the
+    same rules. feed() returns the newly cleaned text; lines containing "|"
+    are held until they are complete.
+
+    is_low_quality_response judges a whole answer (line counts and ratios),
+    so while streaming only checks that hold for any prefix run: a repeated
+    line and a date-like table row. Both are checked before the text is
+    emitted. finish() cleans the whole text and runs the full check.
+    """
+
+    def __init__(self, prompt: str = ""):
+        self.prompt = prompt.strip()
+        self.low_quality = False
+        self._raw: List[str] = []
+        self._raw_len = 0
+        self._emitted: List[str] = []
+        self._emitted_len = 0
+        self._head = True
+        self._stalled = False
+        self._line = ""
+        self._line_open = False
+        self._line_counts: Counter = Counter()
+        # Lines one repeat short of the limit; a line that may become one is held.
+        self._hot_lines: set = set()
+
+    @property
+    def raw(self) -> str:
+        return "".join(self._raw)
+
+    @property
+    def emitted(self) -> str:
+        return "".join(self._emitted)
+
+    def feed(self, text: str) -> str:
+        if not text or self.low_quality:
+            return ""
+        self._raw.append(text)
+        self._raw_len += len(text)
+        if self._head:
+            delta = self._feed_head()
+            if self._raw_len >= STREAM_HEAD_CHARS and not self.low_quality:
+                delta += self._end_head()
+            return delta
+        if self._stalled:
+            return ""
+        return self._feed_tail(text)
+
+    def finish(self) -> str:
+        content = clean_response(self.raw, prompt=self.prompt)
+        if is_low_quality_response(content):
+            self.low_quality = True
+        return content
+
+    def _emit(self, text: str) -> str:
+        if text:
+            self._emitted.append(text)
+            self._emitted_len += len(text)
+        return text
+
+    def _feed_head(self) -> str:
+        raw = self.raw
+        if len(self.prompt) > 5 and self.prompt.startswith(raw.strip()):
+            # Might still be the model echoing the prompt.
+            return ""
+
+        cleaned = clean_response(raw, prompt=self.prompt)
+        lines = cleaned.split('\n')
+        complete = lines if raw.endswith('\n') else lines[:-1]
+        if _has_repeated_line(complete) or any(_is_table_row(line) for line in complete):
+            self.low_quality = True
+            return ""
+
+        if not raw.endswith('\n') and ('|' in lines[-1] or self._may_repeat(lines[-1], complete)):
+            cleaned = '\n'.join(complete).rstrip()
+        emitted = self.emitted
+        if len(cleaned) < 3 or len(cleaned) <= len(emitted) or not cleaned.startswith(emitted):
+            return ""
+        return self._emit(cleaned[len(emitted):])
+
+    @staticmethod
+    def _may_repeat(partial: str, complete: List[str]) -> bool:
+        """Whether the unfinished line could complete into a repeat over the limit."""
+        key = _line_key(partial)
+        counts = Counter(_line_key(line) for line in complete if line.strip())
+        return any(n >= REPEATED_LINE_LIMIT - 1 and line.startswith(key) for line, n in counts.items())
+
+    def _end_head(self) -> str:
+        """Hand the line in progress over to line-by-line cleaning."""
+        self._head = False
+        raw = self.raw
+        cleaned = clean_response(raw, prompt=self.prompt)
+        emitted = self.emitted
+        if not cleaned.startswith(emitted):
+            # A late "A:" marker rewrote the start; finish() has the full text.
+            self._stalled = True
+            return ""
+
+        lines = cleaned.split('\n')
+        self._line = raw[raw.rfind('\n') + 1:]
+        last = lines[-1].strip()
+        current = re.sub(r' {2,}', ' ', self._line).strip()
+        self._line_open = bool(last) and current.endswith(last) and emitted.rstrip().endswith(last)
+        complete = lines if not self._line_open else lines[:-1]
+        for line in complete:
+            if line.strip():
+                self._count(line)
+        if self._line_open and self._line != self._line.rstrip() and not emitted.endswith(' '):
+            # clean_response stripped the space the next word follows.
+            return self._emit(' ')
+        return ""
+
+    def _count(self, line: str) -> int:
+        key = _line_key(line)
+        self._line_counts[key] += 1
+        if self._line_counts[key] >= REPEATED_LINE_LIMIT - 1:
+            self._hot_lines.add(key)
+        return self._line_counts[key]
+
+    def _feed_tail(self, text: str) -> str:
+        delta = []
+        for index, part in enumerate(text.split('\n')):
+            if index:
+                delta.append(self._complete_line())
+                if self.low_quality:
+                    return ""
+                self._line = ""
+                self._line_open = False
+            self._line += part
+            delta.append(self._extend_line(part))
+        return "".join(delta)
+
+    def _collapse(self, text: str) -> str:
+        text = re.sub(r' {2,}', ' ', text)
+        if text.startswith(' ') and self._emitted and self._emitted[-1].endswith(' '):
+            text = text[1:]
+        return text
+
+    def _extend_line(self, part: str) -> str:
+        if self._line_open:
+            return self._emit(self._collapse(part))
+        # Emit a line early only once the filter cannot drop it any more.
+        if len(self._line.strip()) < 10 or '|' in self._line:
+            return ""
+        key = _line_key(self._line)
+        if any(hot.startswith(key) for hot in self._hot_lines):
+            return ""
+        self._line_open = True
+        if not self._emitted_len:
+            return self._emit(self._collapse(self._line.lstrip()))
+        return self._emit('\n' + self._collapse(self._line))
+
+    def _complete_line(self) -> str:
+        line = self._line
+        stripped = line.strip()
+        if not self._line_open and not _keep_line(stripped):
+            return ""
+        if _keep_line(stripped):
+            if self._count(line) >= REPEATED_LINE_LIMIT or _is_table_row(line):
+                self.low_quality = True
+                return ""
+        if self._line_open:
+            return ""
+        if not self._emitted_len:
+            return self._emit(self._collapse(line.lstrip()))
+        return self._emit('\n' + self._collapse(line))
@@ -0,0 +1,56 @@
+"""
+Gunicorn settings for running the gateway with several uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Each worker is a separate process with its own clients, caches and
+counters (see "Gateway workers" in the README). ``kill -HUP <master>``
+replaces the workers one generation at a time; in-flight requests finish
+within GATEWAY_GRACEFUL_TIMEOUT.
+"""
+import os
+import shutil
+import multiprocessing
+
+bind = f"0.0.0.0:{os.getenv('GATEWAY_PORT', '8000')}"
+workers = int(os.getenv("GATEWAY_WORKERS", "0")) or multiprocessing.cpu_count()
+# The app reads the resolved count (see record_cache.py).
+os.environ["GATEWAY_WORKERS"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master and fork it. Nothing connects at
+# import time; sockets, threads and gRPC channels are opened per worker
+# by the lifespan after the fork.
+preload_app = os.getenv("GATEWAY_PRELOAD", "1") == "1"
+
+# Streamed BitNet completions can run for BITNET_TIMEOUT (120s).
+timeout = int(os.getenv("GATEWAY_TIMEOUT", "180"))
+# Time for a worker to finish requests and drain side effects on shutdown or reload.
+graceful_timeout = int(os.getenv("GATEWAY_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GATEWAY_KEEPALIVE", "5"))
+
+# Recycle workers after this many requests (0 disables).
+max_requests = int(os.getenv("GATEWAY_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GATEWAY_MAX_REQUESTS_JITTER", "0"))
+
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("GATEWAY_LOG_LEVEL", "info")
+
+# Workers write their metrics to files here and /metrics aggregates them.
+# Set before the app (and prometheus_client) is imported.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/gateway-metrics")
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be added to this one.
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from telemetry import mark_process_dead
+    mark_process_dead(worker.pid)
+
@@ -2,9 +2,15 @@
 Firebase client for storing model outputs with CRUD operations.
 """
 import os
+import time
+import atexit
+import random
 import logging
+import threading
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+from .pagination import decode_cursor, next_cursor
+from .write_buffer import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +24,40 @@ except ImportError:
 _initialized = False
 _db = None
 
+# Firestore rejects batched writes with more than 500 operations.
+FIRESTORE_BATCH_LIMIT = 500
+
+SERVICES = ("bitnet", "yolo")
+
+# Output counts are kept in sharded counter documents, updated in the same
+# batch as each create/delete, so stats never scan the collection. A marker
+# document records that the shards were seeded from a full count; until a
+# process has seen it (or seeded them itself) it does not increment them.
+# A process that had to skip an increment marks its counters dirty and
+# rebuilds them once initialisation succeeds.
+COUNTERS_MARKER = "initialized"
+FIREBASE_COUNTER_SHARDS = int(os.getenv("FIREBASE_COUNTER_SHARDS", "10"))
+FIREBASE_STATS_TTL = float(os.getenv("FIREBASE_STATS_TTL", "30"))
+
+# Buffered output writes: outputs are committed in one Firestore batch when
+# FIREBASE_WRITE_BATCH_SIZE are pending or every FIREBASE_WRITE_FLUSH_INTERVAL
+# seconds. One slot per batch is kept for the counter update.
+FIREBASE_BUFFERED_WRITES = os.getenv("FIREBASE_BUFFERED_WRITES", "1") == "1"
+FIREBASE_WRITE_BATCH_SIZE = min(int(os.getenv("FIREBASE_WRITE_BATCH_SIZE", "200")), FIRESTORE_BATCH_LIMIT - 1)
+FIREBASE_WRITE_FLUSH_INTERVAL = float(os.getenv("FIREBASE_WRITE_FLUSH_INTERVAL", "0.5"))
+FIREBASE_WRITE_MAX_PENDING = int(os.getenv("FIREBASE_WRITE_MAX_PENDING", "10000"))
+FIREBASE_WRITE_RETRIES = int(os.getenv("FIREBASE_WRITE_RETRIES", "3"))
+
+# FirebaseService is created per request, so the stats snapshot and the
+# write buffer are module-level.
+_stats_cache: Dict[str, Any] = {"value": None, "expires_at": 0.0}
+_stats_lock = threading.Lock()
+_write_buffer: Optional[WriteBehindBuffer] = None
+_write_buffer_lock = threading.Lock()
+_counters_ready = False
+_counters_dirty = False
+_counters_lock = threading.Lock()
+
 def _get_credentials_path():
     cred_path = os.getenv("FIREBASE_CREDENTIALS", "firebase-key.json")
     if os.path.exists(cred_path):
@@ -53,6 +93,40 @@ def _initialize_firebase():
         logger.error(f"Firebase initialization error: {e}")
         return None
 
+def _get_write_buffer(service: "FirebaseService") -> WriteBehindBuffer:
+    global _write_buffer
+    with _write_buffer_lock:
+        if _write_buffer is None:
+            _write_buffer = WriteBehindBuffer(
+                "firestore-outputs",
+                service._commit_outputs,
+                max_batch=FIREBASE_WRITE_BATCH_SIZE,
+                flush_interval=FIREBASE_WRITE_FLUSH_INTERVAL,
+                max_pending=FIREBASE_WRITE_MAX_PENDING,
+                retries=FIREBASE_WRITE_RETRIES
+            )
+            atexit.register(_write_buffer.close)
+        return _write_buffer
+
+def _ensure_counters(service: "FirebaseService") -> bool:
+    """Seed the counters from a full count unless the marker says they were
+    and no increment was skipped since."""
+    global _counters_ready, _counters_dirty
+    if _counters_ready:
+        return True
+    with _counters_lock:
+        if _counters_ready:
+            return True
+        try:
+            marker = service.db.collection(service.counters_name).document(COUNTERS_MARKER).get()
+            if _counters_dirty or not marker.exists:
+                service.rebuild_counters()
+            _counters_ready = True
+            _counters_dirty = False
+        except Exception as e:
+            logger.error(f"Error initialising Firebase output counters: {e}")
+        return _counters_ready
+
 def get_firebase_service():
     if not FIREBASE_AVAILABLE:
         return None
@@ -62,10 +136,79 @@ class FirebaseService:
     def __init__(self):
         self.db = _initialize_firebase()
         self.collection_name = "model_outputs"
+        self.counters_name = f"{self.collection_name}_counters"
+        self._write_buffer: Optional[WriteBehindBuffer] = None
+        if self.is_connected():
+            _ensure_counters(self)
+            if FIREBASE_BUFFERED_WRITES:
+                self._write_buffer = _get_write_buffer(self)
     
     def is_connected(self) -> bool:
         return self.db is not None
     
+    def _counter_shard(self):
+        shard = random.randrange(FIREBASE_COUNTER_SHARDS)
+        return self.db.collection(self.counters_name).document(f"shard_{shard}")
+    
+    def _counting(self, change) -> bool:
+        """Whether a counter change may be written; if not, the rebuild that
+        runs once initialisation succeeds accounts for it."""
+        global _counters_dirty
+        if _ensure_counters(self):
+            return True
+        _counters_dirty = True
+        logger.warning(f"Firebase output counters not initialised, skipped change {change}")
+        return False
+    
+    def _count_in_batch(self, batch, counts: Dict[str, int]):
+        """Add a counter increment (``{service: delta}``) to ``batch``."""
+        if not self._counting(counts):
+            return
+        deltas = {"total": sum(counts.values())}
+        deltas.update(counts)
+        batch.set(
+            self._counter_shard(),
+            {key: firestore.Increment(value) for key, value in deltas.items()},
+            merge=True
+        )
+    
+    @staticmethod
+    def _output_document(
+        service: str,
+        request_data: Dict[str, Any],
+        response_data: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]],
+        timestamp: datetime
+    ) -> Dict[str, Any]:
+        doc_data = {
+            "service": service,
+            "request_data": request_data,
+            "response_data": response_data,
+            "timestamp": timestamp,
+        }
+        if metadata:
+            doc_data["metadata"] = metadata
+        return doc_data
+    
+    def _new_id(self) -> str:
+        """Client-generated document id; no round trip."""
+        return self.db.collection(self.collection_name).document().id
+    
+    def _commit_outputs(self, items: List[Tuple[str, Dict[str, Any]]]):
+        """Write ``(id, document)`` pairs and their counter increment in one batch.
+
+        Safe to retry: the batch is atomic and the documents have fixed ids.
+        """
+        collection = self.db.collection(self.collection_name)
+        batch = self.db.batch()
+        counts: Dict[str, int] = {}
+        for doc_id, doc_data in items:
+            batch.set(collection.document(doc_id), doc_data)
+            counts[doc_data["service"]] = counts.get(doc_data["service"], 0) + 1
+        self._count_in_batch(batch, counts)
+        batch.commit()
+        logger.info(f"Committed {len(items)} Firebase outputs")
+    
     def create_output(
         self,
         service: str,
@@ -73,45 +216,115 @@ class FirebaseService:
         response_data: Dict[str, Any],
         metadata: Optional[Dict[str, Any]] = None
     ) -> Optional[str]:
+        """Store an output.
+
+        With buffered writes enabled the document is queued and its
+        client-generated id is returned before it reaches Firestore.
+        """
         if not self.is_connected():
             return None
         
         try:
-            doc_data = {
-                "service": service,
-                "request_data": request_data,
-                "response_data": response_data,
-                "timestamp": datetime.utcnow(),
-            }
+            doc_id = self._new_id()
+            doc_data = self._output_document(service, request_data, response_data, metadata, datetime.utcnow())
             
-            if metadata:
-                doc_data["metadata"] = metadata
+            if self._write_buffer is not None:
+                return doc_id if self._write_buffer.add((doc_id, doc_data)) else None
             
-            doc_ref = self.db.collection(self.collection_name).add(doc_data)
-            doc_id = doc_ref[1].id
-            logger.info(f"Created Firebase output: {doc_id}")
+            self._commit_outputs([(doc_id, doc_data)])
             return doc_id
         except Exception as e:
             logger.error(f"Error creating Firebase output: {e}")
             return None
     
+    def create_outputs(
+        self,
+        service: str,
+        entries: List[Dict[str, Any]]
+    ) -> List[str]:
+        """Create several outputs with batched commits (max 500 writes each,
+        including the counter update).
+
+        Each entry holds ``request_data``, ``response_data`` and optional ``metadata``.
+        """
+        if not self.is_connected():
+            return []
+        
+        timestamp = datetime.utcnow()
+        items = [
+            (
+                self._new_id(),
+                self._output_document(
+                    service,
+                    entry.get("request_data", {}),
+                    entry.get("response_data", {}),
+                    entry.get("metadata"),
+                    timestamp
+                )
+            )
+            for entry in entries
+        ]
+        
+        if self._write_buffer is not None:
+            return [doc_id for doc_id, doc_data in items if self._write_buffer.add((doc_id, doc_data))]
+        
+        doc_ids = []
+        try:
+            chunk_size = FIRESTORE_BATCH_LIMIT - 1
+            for start in range(0, len(items), chunk_size):
+                chunk = items[start:start + chunk_size]
+                self._commit_outputs(chunk)
+                doc_ids.extend(doc_id for doc_id, _ in chunk)
+            return doc_ids
+        except Exception as e:
+            logger.error(f"Error creating Firebase outputs: {e}")
+            return doc_ids
+    
+    def flush(self):
+        """Commit any buffered outputs now."""
+        if self._write_buffer is not None:
+            self._write_buffer.flush()
+    
+    def _flush_if_pending(self, output_id: str):
+        """Commit the buffer first if ``output_id`` has not reached Firestore yet."""
+        if self._write_buffer is not None and any(
+            doc_id == output_id for doc_id, _ in self._write_buffer.pending()
+        ):
+            self._write_buffer.flush()
+    
     def get_outputs(
         self,
         service: Optional[str] = None,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
+        """Newest outputs first.
+
+        With ``cursor`` the page starts right after the document it encodes
+        (``start_after``) and ``offset`` is ignored. Raises ``InvalidCursor``
+        for a bad cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
         if not self.is_connected():
             return []
         
         try:
-            query = self.db.collection(self.collection_name)
+            collection = self.db.collection(self.collection_name)
+            query = collection
             
             if service:
                 service = service.lower().strip()
                 query = query.where("service", "==", service)
             
-            query = query.order_by("timestamp", direction=firestore.Query.DESCENDING).limit(limit).offset(offset)
+            query = query.order_by("timestamp", direction=firestore.Query.DESCENDING).limit(limit)
+            if after:
+                timestamp, doc_id = after
+                snapshot = collection.document(doc_id).get()
+                # Fall back to the timestamp if the cursor document was deleted.
+                query = query.start_after(snapshot if snapshot.exists else {"timestamp": timestamp})
+            elif offset:
+                query = query.offset(offset)
             
             docs = query.stream()
             results = []
@@ -127,11 +340,32 @@ class FirebaseService:
             logger.error(f"Error getting Firebase outputs: {e}")
             return []
     
+    def get_outputs_page(
+        self,
+        service: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """``get_outputs`` plus the cursor of the following page."""
+        outputs = self.get_outputs(service, limit, offset, cursor)
+        return {"outputs": outputs, "next_cursor": next_cursor(outputs, limit, "id")}
+    
     def get_output(self, output_id: str) -> Optional[Dict[str, Any]]:
         if not self.is_connected():
             return None
         
         try:
+            if self._write_buffer is not None:
+                pending = next(
+                    (dict(d) for doc_id, d in self._write_buffer.pending() if doc_id == output_id),
+                    None
+                )
+                if pending is not None:
+                    pending["id"] = output_id
+                    pending["timestamp"] = pending["timestamp"].isoformat()
+                    return pending
+            
             doc_ref = self.db.collection(self.collection_name).document(output_id)
             doc = doc_ref.get()
             
@@ -151,54 +385,133 @@ class FirebaseService:
             return False
         
         try:
+            self._flush_if_pending(output_id)
             doc_ref = self.db.collection(self.collection_name).document(output_id)
-            doc_ref.update(updates)
+            if "service" in updates:
+                self._update_with_service_change(doc_ref, updates)
+            else:
+                doc_ref.update(updates)
             logger.info(f"Updated Firebase output: {output_id}")
             return True
         except Exception as e:
             logger.error(f"Error updating Firebase output: {e}")
             return False
     
+    def _update_with_service_change(self, doc_ref, updates: Dict[str, Any]):
+        """Update an output and move its count to the new service atomically."""
+        counting = self._counting(f"service -> {updates['service']}")
+        
+        @firestore.transactional
+        def update(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                raise ValueError(f"Output {doc_ref.id} not found")
+            old_service = (snapshot.to_dict() or {}).get("service")
+            transaction.update(doc_ref, updates)
+            if old_service != updates["service"] and counting:
+                deltas = {updates["service"]: firestore.Increment(1)}
+                if old_service:
+                    deltas[old_service] = firestore.Increment(-1)
+                transaction.set(self._counter_shard(), deltas, merge=True)
+        
+        update(self.db.transaction())
+    
     def delete_output(self, output_id: str) -> bool:
+        """Delete an output and decrement the counters; False if it does not exist."""
         if not self.is_connected():
             return False
         
-        try:
-            doc_ref = self.db.collection(self.collection_name).document(output_id)
-            doc_ref.delete()
-            logger.info(f"Deleted Firebase output: {output_id}")
+        self._flush_if_pending(output_id)
+        doc_ref = self.db.collection(self.collection_name).document(output_id)
+        counting = self._counting(f"delete {output_id}")
+        
+        @firestore.transactional
+        def delete(transaction) -> bool:
+            snapshot = doc_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return False
+            service = (snapshot.to_dict() or {}).get("service")
+            transaction.delete(doc_ref)
+            if counting:
+                deltas = {"total": firestore.Increment(-1)}
+                if service:
+                    deltas[service] = firestore.Increment(-1)
+                transaction.set(self._counter_shard(), deltas, merge=True)
             return True
+        
+        try:
+            deleted = delete(self.db.transaction())
+            if deleted:
+                logger.info(f"Deleted Firebase output: {output_id}")
+            return deleted
         except Exception as e:
             logger.error(f"Error deleting Firebase output: {e}")
             return False
     
     def get_stats(self) -> Dict[str, Any]:
+        """Output counts from the sharded counters, cached for FIREBASE_STATS_TTL seconds."""
         if not self.is_connected():
             return {}
         
+        with _stats_lock:
+            if _stats_cache["value"] is not None and time.monotonic() < _stats_cache["expires_at"]:
+                return dict(_stats_cache["value"])
+        
         try:
-            all_docs = self.db.collection(self.collection_name).stream()
-            total = 0
-            bitnet_count = 0
-            yolo_count = 0
+            if not _ensure_counters(self):
+                return {"connected": False}
+            counts = self._read_counters()
             
-            for doc in all_docs:
-                total += 1
-                data = doc.to_dict()
-                service = data.get("service", "").lower()
-                if service == "bitnet":
-                    bitnet_count += 1
-                elif service == "yolo":
-                    yolo_count += 1
-            
-            return {
+            stats = {
                 "connected": True,
-                "total_outputs": total,
-                "bitnet_outputs": bitnet_count,
-                "yolo_outputs": yolo_count,
+                "total_outputs": counts.get("total", 0),
+                "bitnet_outputs": counts.get("bitnet", 0),
+                "yolo_outputs": counts.get("yolo", 0),
                 "collection": self.collection_name
             }
         except Exception as e:
             logger.error(f"Error getting Firebase stats: {e}")
             return {"connected": False}
+        
+        with _stats_lock:
+            _stats_cache["value"] = stats
+            _stats_cache["expires_at"] = time.monotonic() + FIREBASE_STATS_TTL
+        return dict(stats)
+    
+    def _read_counters(self) -> Dict[str, int]:
+        """Sum the counter shards."""
+        totals: Dict[str, int] = {}
+        for shard in self.db.collection(self.counters_name).stream():
+            if shard.id == COUNTERS_MARKER:
+                continue
+            for key, value in (shard.to_dict() or {}).items():
+                totals[key] = totals.get(key, 0) + int(value)
+        return totals
+    
+    def rebuild_counters(self) -> Dict[str, int]:
+        """Recount outputs with aggregation queries, reset the shards to match
+        and write the marker.
 
+        Runs once per collection, before any process increments the shards;
+        also the way to repair drifted counters. Writes that land while it
+        runs may be counted twice or missed.
+        """
+        collection = self.db.collection(self.collection_name)
+        counts = {"total": self._aggregate_count(collection)}
+        for service in SERVICES:
+            counts[service] = self._aggregate_count(collection.where("service", "==", service))
+        
+        counters = self.db.collection(self.counters_name)
+        batch = self.db.batch()
+        for shard in range(FIREBASE_COUNTER_SHARDS):
+            values = counts if shard == 0 else {key: 0 for key in counts}
+            batch.set(counters.document(f"shard_{shard}"), values)
+        batch.set(counters.document(COUNTERS_MARKER), {"initialized_at": datetime.utcnow(), **counts})
+        batch.commit()
+        logger.info(f"Rebuilt Firebase output counters: {counts}")
+        return counts
+    
+    @staticmethod
+    def _aggregate_count(query) -> int:
+        result = query.count(alias="count").get()
+        return int(result[0][0].value)
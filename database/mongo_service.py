@@ -2,17 +2,88 @@
 MongoDB client for logging API requests.
 """
 import os
+import atexit
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
-from pymongo import MongoClient, DESCENDING
-from pymongo.errors import ConnectionFailure, OperationFailure
+from bson.objectid import ObjectId
+from pymongo import MongoClient, ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, OperationFailure
+from pymongo.write_concern import WriteConcern
+from .pagination import InvalidCursor, decode_cursor, next_cursor
+from .rollups import (
+    GRANULARITIES, backfill_pipeline, bucket_start, rollup_updates, stats_query, summarize, to_utc_naive
+)
+from .write_buffer import WriteBehindBuffer
 
 logger = logging.getLogger(__name__)
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb:27017")
 DB_NAME = os.getenv("MONGO_DB_NAME", "milo_db")
 REQUESTS_COLLECTION = "requests"
+ROLLUPS_COLLECTION = "request_rollups"
+
+# Buffered request logging: documents are flushed with insert_many when
+# MONGO_LOG_BATCH_SIZE are pending or every MONGO_LOG_FLUSH_INTERVAL seconds.
+MONGO_BUFFERED_WRITES = os.getenv("MONGO_BUFFERED_WRITES", "1") == "1"
+MONGO_LOG_BATCH_SIZE = int(os.getenv("MONGO_LOG_BATCH_SIZE", "100"))
+MONGO_LOG_FLUSH_INTERVAL = float(os.getenv("MONGO_LOG_FLUSH_INTERVAL", "0.5"))
+MONGO_LOG_MAX_PENDING = int(os.getenv("MONGO_LOG_MAX_PENDING", "10000"))
+MONGO_LOG_RETRIES = int(os.getenv("MONGO_LOG_RETRIES", "3"))
+MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN", "1")
+MONGO_WRITE_JOURNAL = os.getenv("MONGO_WRITE_JOURNAL", "0") == "1"
+
+# Requests older than this are removed by a TTL index; 0 keeps everything.
+MONGO_RETENTION_DAYS = float(os.getenv("MONGO_RETENTION_DAYS", "0"))
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "1") == "1"
+
+# Per-minute/per-hour request rollups maintained on every flush. A marker
+# document in the rollups collection records that they were backfilled from
+# the logs written before they existed; the first process to claim it runs
+# the backfill.
+MONGO_ROLLUPS = os.getenv("MONGO_ROLLUPS", "1") == "1"
+ROLLUPS_MARKER = "backfill"
+MONGO_MINUTE_ROLLUP_RETENTION_DAYS = float(os.getenv("MONGO_MINUTE_ROLLUP_RETENTION_DAYS", "7"))
+# A "running" marker older than this is left by a process that died
+# mid-backfill, and the next process to start takes it over.
+MONGO_ROLLUP_BACKFILL_LEASE = float(os.getenv("MONGO_ROLLUP_BACKFILL_LEASE", "1800"))
+
+SERVICES = ("bitnet", "yolo")
+
+# List queries return only these fields, so they are answered from the
+# indexes below without fetching the documents (covered queries).
+REQUEST_LIST_FIELDS = {"_id": 1, "service": 1, "timestamp": 1, "status": 1}
+
+REQUEST_INDEXES = [
+    IndexModel(
+        [("service", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING), ("status", ASCENDING)],
+        name="service_timestamp"
+    ),
+    IndexModel(
+        [("timestamp", DESCENDING), ("_id", DESCENDING), ("service", ASCENDING), ("status", ASCENDING)],
+        name="timestamp"
+    ),
+]
+TTL_INDEX_NAME = "timestamp_ttl"
+DUPLICATE_KEY = 11000
+
+ROLLUP_INDEXES = [
+    IndexModel(
+        [("granularity", ASCENDING), ("bucket", ASCENDING), ("service", ASCENDING), ("status", ASCENDING)],
+        name="rollup_key",
+        unique=True
+    ),
+]
+ROLLUP_TTL_INDEX_NAME = "minute_rollup_ttl"
+
+
+def _write_concern() -> WriteConcern:
+    """Build the write concern from MONGO_WRITE_CONCERN ("0", "1", "majority", ...)."""
+    w = int(MONGO_WRITE_CONCERN) if MONGO_WRITE_CONCERN.isdigit() else MONGO_WRITE_CONCERN
+    if w == 0:
+        return WriteConcern(w=0)
+    return WriteConcern(w=w, j=MONGO_WRITE_JOURNAL or None)
+
 
 class MongoDBService:
     """MongoDB wrapper for request logging."""
@@ -21,7 +92,24 @@ class MongoDBService:
         self.client: Optional[MongoClient] = None
         self.db = None
         self.requests_collection = None
+        self.rollups_collection = None
+        self._log_buffer: Optional[WriteBehindBuffer] = None
+        self._rollups_backfilled = False
         self._connect()
+        if self.is_connected() and MONGO_ENSURE_INDEXES:
+            self.ensure_indexes()
+        if self.is_connected() and MONGO_ROLLUPS:
+            self.ensure_rollups()
+        if self.is_connected() and MONGO_BUFFERED_WRITES:
+            self._log_buffer = WriteBehindBuffer(
+                "mongo-requests",
+                self._insert_requests,
+                max_batch=MONGO_LOG_BATCH_SIZE,
+                flush_interval=MONGO_LOG_FLUSH_INTERVAL,
+                max_pending=MONGO_LOG_MAX_PENDING,
+                retries=MONGO_LOG_RETRIES
+            )
+            atexit.register(self.flush)
     
     def _connect(self):
         """Connect to MongoDB."""
@@ -29,7 +117,14 @@ class MongoDBService:
             self.client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
             self.client.admin.command('ping')
             self.db = self.client[DB_NAME]
-            self.requests_collection = self.db[REQUESTS_COLLECTION]
+            self.requests_collection = self.db.get_collection(
+                REQUESTS_COLLECTION,
+                write_concern=_write_concern()
+            )
+            self.rollups_collection = self.db.get_collection(
+                ROLLUPS_COLLECTION,
+                write_concern=_write_concern()
+            )
             logger.info(f"Connected to MongoDB: {DB_NAME}")
         except ConnectionFailure as e:
             logger.error(f"MongoDB connection failed: {e}")
@@ -42,28 +137,151 @@ class MongoDBService:
         """Check connection status."""
         return self.client is not None
     
+    def ensure_indexes(self):
+        """Create the request and rollup indexes and sync the retention TTL indexes."""
+        try:
+            self.requests_collection.create_indexes(REQUEST_INDEXES)
+            self._ensure_ttl_index(self.requests_collection, TTL_INDEX_NAME, "timestamp", MONGO_RETENTION_DAYS)
+            self.rollups_collection.create_indexes(ROLLUP_INDEXES)
+            self._ensure_ttl_index(
+                self.rollups_collection,
+                ROLLUP_TTL_INDEX_NAME,
+                "bucket",
+                MONGO_MINUTE_ROLLUP_RETENTION_DAYS,
+                partial={"granularity": "minute"}
+            )
+            logger.info("MongoDB request indexes ensured")
+        except OperationFailure as e:
+            logger.error(f"MongoDB index creation failed: {e}")
+    
+    def ensure_rollups(self) -> bool:
+        """Backfill the rollups once unless the marker says it was done.
+
+        The marker is claimed with an insert, so only one process runs the
+        backfill. A claim holds a lease of MONGO_ROLLUP_BACKFILL_LEASE
+        seconds; a "running" marker whose lease has expired is taken over.
+        If the backfill fails the marker is removed and the next start
+        retries; delete the marker to force a rebuild.
+        """
+        # Acknowledged writes whatever MONGO_WRITE_CONCERN is, so a lost
+        # race surfaces as DuplicateKeyError.
+        markers = self.db[ROLLUPS_COLLECTION]
+        now = datetime.utcnow()
+        claim = {
+            "state": "running",
+            "owner": ObjectId(),
+            "started_at": now,
+            "lease_until": now + timedelta(seconds=MONGO_ROLLUP_BACKFILL_LEASE),
+        }
+        try:
+            markers.insert_one({"_id": ROLLUPS_MARKER, **claim})
+        except DuplicateKeyError:
+            try:
+                stale = markers.find_one_and_update(
+                    {"_id": ROLLUPS_MARKER, "state": "running", "lease_until": {"$lt": now}},
+                    {"$set": claim}
+                )
+            except Exception as e:
+                logger.error(f"Error claiming MongoDB rollup backfill: {e}")
+                return False
+            if stale is None:
+                return True
+            logger.warning(f"Taking over MongoDB rollup backfill started at {stale.get('started_at')}")
+        except Exception as e:
+            logger.error(f"Error claiming MongoDB rollup backfill: {e}")
+            return False
+        
+        owned = {"_id": ROLLUPS_MARKER, "owner": claim["owner"]}
+        try:
+            self.backfill_rollups()
+            markers.update_one(
+                owned,
+                {"$set": {"state": "done", "finished_at": datetime.utcnow()}, "$unset": {"lease_until": ""}}
+            )
+            return True
+        except Exception as e:
+            logger.error(f"MongoDB rollup backfill failed: {e}")
+            try:
+                markers.delete_one(owned)
+            except Exception as release_error:
+                logger.error(f"Error releasing MongoDB rollup backfill marker: {release_error}")
+            return False
+    
+    def backfill_rollups(self):
+        """Recompute the rollups from the request logs with server-side aggregations.
+
+        Rollup documents covered by the logs are replaced, so this also
+        repairs drifted rollups. Minute rollups are only rebuilt inside
+        their retention window, and hour rollups whose logs have expired
+        are left as they are. Writes that land while it runs may be missed.
+        """
+        cutoff = datetime.utcnow()
+        requests = self.db[REQUESTS_COLLECTION]
+        for granularity in GRANULARITIES:
+            match: Dict[str, Any] = {"timestamp": {"$lt": cutoff}}
+            if granularity == "minute" and MONGO_MINUTE_ROLLUP_RETENTION_DAYS:
+                match["timestamp"]["$gte"] = cutoff - timedelta(days=MONGO_MINUTE_ROLLUP_RETENTION_DAYS)
+            requests.aggregate(backfill_pipeline(granularity, match, ROLLUPS_COLLECTION))
+        logger.info("MongoDB request rollups backfilled")
+    
+    def _ensure_ttl_index(self, collection, name: str, field: str, days: float, partial: Optional[Dict[str, Any]] = None):
+        existing = collection.index_information().get(name)
+        if not days:
+            if existing:
+                collection.drop_index(name)
+                logger.info(f"Retention disabled for {collection.name}, TTL index dropped")
+            return
+        
+        seconds = int(days * 86400)
+        if existing is None:
+            options: Dict[str, Any] = {"name": name, "expireAfterSeconds": seconds}
+            if partial:
+                options["partialFilterExpression"] = partial
+            collection.create_index([(field, ASCENDING)], **options)
+        elif existing.get("expireAfterSeconds") != seconds:
+            self.db.command(
+                "collMod",
+                collection.name,
+                index={"name": name, "expireAfterSeconds": seconds}
+            )
+        logger.info(f"{collection.name} retention set to {days} days")
+    
     def log_request(
         self,
         service: str,
         request_data: Dict[str, Any],
         response_data: Dict[str, Any],
-        status: str = "success"
+        status: str = "success",
+        latency_ms: Optional[float] = None
     ) -> Optional[str]:
-        """Store request in database."""
+        """Store request in database.
+
+        With buffered writes enabled the document is queued and the
+        client-generated id is returned before it reaches MongoDB.
+        """
         if not self.is_connected():
             logger.warning("MongoDB not connected, skipping log")
             return None
         
         try:
             document = {
+                "_id": ObjectId(),
                 "service": service,
                 "timestamp": datetime.utcnow(),
                 "request": request_data,
                 "response": response_data,
                 "status": status
             }
+            if latency_ms is not None:
+                document["latency_ms"] = latency_ms
+            
+            if self._log_buffer is not None:
+                if not self._log_buffer.add(document):
+                    return None
+                return str(document["_id"])
             
             result = self.requests_collection.insert_one(document)
+            self._update_rollups([document])
             logger.info(f"Logged {service} request: {result.inserted_id}")
             return str(result.inserted_id)
             
@@ -74,28 +292,121 @@ class MongoDBService:
             logger.error(f"Error logging request: {e}")
             return None
     
+    def log_requests(
+        self,
+        service: str,
+        entries: List[Dict[str, Any]],
+        status: str = "success",
+        latency_ms: Optional[float] = None
+    ) -> List[Optional[str]]:
+        """Store several requests in one bulk write.
+
+        Each entry holds ``request_data``, ``response_data`` and optionally
+        its own ``latency_ms`` (defaults to ``latency_ms``).
+        """
+        if not self.is_connected():
+            logger.warning("MongoDB not connected, skipping log")
+            return []
+        
+        timestamp = datetime.utcnow()
+        documents = [
+            {
+                "_id": ObjectId(),
+                "service": service,
+                "timestamp": timestamp,
+                "request": entry.get("request_data", {}),
+                "response": entry.get("response_data", {}),
+                "status": status
+            }
+            for entry in entries
+        ]
+        for document, entry in zip(documents, entries):
+            entry_latency = entry.get("latency_ms", latency_ms)
+            if entry_latency is not None:
+                document["latency_ms"] = entry_latency
+        
+        try:
+            if self._log_buffer is not None:
+                return [str(d["_id"]) if self._log_buffer.add(d) else None for d in documents]
+            
+            self._insert_requests(documents)
+            return [str(d["_id"]) for d in documents]
+        except Exception as e:
+            logger.error(f"Error logging requests: {e}")
+            return [None] * len(documents)
+    
+    def _insert_requests(self, documents: List[Dict[str, Any]]):
+        """Bulk insert a batch of buffered request documents.
+
+        Safe to retry: ids are generated client-side, so a document an
+        earlier attempt already stored fails with a duplicate key and counts
+        as written. Only documents this call inserted go into the rollups.
+        Raises BulkWriteError if any other insert failed.
+        """
+        try:
+            self.requests_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            duplicates = {error["index"] for error in errors if error.get("code") == DUPLICATE_KEY}
+            skipped = {error["index"] for error in errors}
+            self._update_rollups([d for i, d in enumerate(documents) if i not in skipped])
+            failed = len(skipped) - len(duplicates)
+            if failed:
+                logger.error(f"MongoDB bulk insert: {failed} of {len(documents)} documents failed")
+                raise
+            logger.info(f"Logged {len(documents)} requests ({len(duplicates)} already stored)")
+            return
+        logger.info(f"Logged {len(documents)} requests")
+        self._update_rollups(documents)
+    
+    def _update_rollups(self, documents: List[Dict[str, Any]]):
+        """Fold inserted request documents into the minute/hour rollups."""
+        if not MONGO_ROLLUPS or not documents:
+            return
+        try:
+            self.rollups_collection.bulk_write(rollup_updates(documents), ordered=False)
+        except Exception as e:
+            logger.error(f"MongoDB rollup update failed: {e}")
+    
+    def flush(self):
+        """Write any buffered request documents now."""
+        if self._log_buffer is not None:
+            self._log_buffer.flush()
+    
     def get_requests(
         self,
         service: Optional[str] = None,
         limit: int = 50,
-        skip: int = 0
+        skip: int = 0,
+        include_bodies: bool = False,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Get requests with optional service filter."""
+        """Get requests with optional service filter, newest first.
+
+        Request/response bodies are only loaded with ``include_bodies``;
+        otherwise the query is covered by an index. With ``cursor`` the page
+        starts right after the item it encodes (keyset pagination) and
+        ``skip`` is ignored. Raises ``InvalidCursor`` for a bad cursor.
+        """
+        query: Dict[str, Any] = {}
+        if service:
+            query["service"] = service
+        if cursor:
+            query.update(self._after_cursor(cursor))
+            skip = 0
+        
         if not self.is_connected():
             logger.warning("MongoDB not connected")
             return []
         
         try:
-            query = {}
-            if service:
-                query["service"] = service
-            
-            cursor = self.requests_collection.find(query).sort(
-                "timestamp", DESCENDING
+            projection = None if include_bodies else REQUEST_LIST_FIELDS
+            docs = self.requests_collection.find(query, projection).sort(
+                [("timestamp", DESCENDING), ("_id", DESCENDING)]
             ).skip(skip).limit(limit)
             
             results = []
-            for doc in cursor:
+            for doc in docs:
                 doc["_id"] = str(doc["_id"])
                 doc["timestamp"] = doc["timestamp"].isoformat()
                 results.append(doc)
@@ -110,14 +421,49 @@ class MongoDBService:
             logger.error(f"Error retrieving requests: {e}")
             return []
     
+    @staticmethod
+    def _after_cursor(cursor: str) -> Dict[str, Any]:
+        """Filter for items strictly after the cursor in (timestamp, _id) desc order."""
+        timestamp, last_id = decode_cursor(cursor)
+        if not ObjectId.is_valid(last_id):
+            raise InvalidCursor(f"Invalid cursor: {cursor}")
+        # The $lte bound keeps this a single index range scan; the $or only
+        # resolves ties on the boundary timestamp.
+        return {
+            "timestamp": {"$lte": timestamp},
+            "$or": [
+                {"timestamp": {"$lt": timestamp}},
+                {"_id": {"$lt": ObjectId(last_id)}},
+            ],
+        }
+    
+    def get_requests_page(
+        self,
+        service: Optional[str] = None,
+        limit: int = 50,
+        skip: int = 0,
+        include_bodies: bool = False,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """``get_requests`` plus the cursor of the following page."""
+        requests = self.get_requests(service, limit, skip, include_bodies, cursor)
+        return {"requests": requests, "next_cursor": next_cursor(requests, limit, "_id")}
+    
     def get_request_by_id(self, request_id: str) -> Optional[Dict[str, Any]]:
         """Fetch single request by ID."""
         if not self.is_connected():
             return None
         
         try:
-            from bson.objectid import ObjectId
-            doc = self.requests_collection.find_one({"_id": ObjectId(request_id)})
+            object_id = ObjectId(request_id)
+            doc = None
+            if self._log_buffer is not None:
+                doc = next(
+                    (dict(d) for d in self._log_buffer.pending() if d["_id"] == object_id),
+                    None
+                )
+            if doc is None:
+                doc = self.requests_collection.find_one({"_id": object_id})
             
             if doc:
                 doc["_id"] = str(doc["_id"])
@@ -129,28 +475,94 @@ class MongoDBService:
             logger.error(f"Error getting request by ID: {e}")
             return None
     
+    def get_request_stats(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        granularity: str = "hour",
+        service: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Request counts and latency over a time range, read from the rollups.
+
+        Defaults to the last 24 hours. Minute rollups only reach back
+        ``MONGO_MINUTE_ROLLUP_RETENTION_DAYS`` and hour rollups only cover
+        logs that still existed when they were backfilled, so older parts of
+        a range read as empty. Raises ValueError for an invalid range.
+        """
+        end = to_utc_naive(end) if end else datetime.utcnow()
+        start = to_utc_naive(start) if start else end - timedelta(hours=24)
+        query = stats_query(start, end, granularity, service)
+        
+        result = {
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "service_filter": service,
+        }
+        if not self.is_connected():
+            return {"connected": False, **result}
+        
+        try:
+            rollups = self.rollups_collection.find(query, {"_id": 0}).sort("bucket", ASCENDING)
+            return {"connected": True, **result, **summarize(rollups)}
+        except Exception as e:
+            logger.error(f"Error getting request stats: {e}")
+            return {"connected": False, **result, "error": str(e)}
+    
     def get_stats(self) -> Dict[str, Any]:
-        """Request counts by service."""
+        """Request counts by service.
+
+        Once the rollups are backfilled the counts are summed from the hour
+        rollups inside the log retention window. Before that the total comes
+        from collection metadata and the per-service counts are index-only
+        count scans.
+        """
         if not self.is_connected():
             return {"connected": False}
         
         try:
-            total = self.requests_collection.count_documents({})
-            bitnet_count = self.requests_collection.count_documents({"service": "bitnet"})
-            yolo_count = self.requests_collection.count_documents({"service": "yolo"})
+            if self._rollups_ready():
+                counts = self._rollup_counts()
+                stats = {"connected": True, "total_requests": sum(counts.values())}
+                for service in SERVICES:
+                    stats[f"{service}_requests"] = counts.get(service, 0)
+                return stats
             
-            return {
+            stats = {
                 "connected": True,
-                "total_requests": total,
-                "bitnet_requests": bitnet_count,
-                "yolo_requests": yolo_count
+                "total_requests": self.requests_collection.estimated_document_count()
             }
+            for service in SERVICES:
+                stats[f"{service}_requests"] = self.requests_collection.count_documents({"service": service})
+            return stats
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
             return {"connected": False, "error": str(e)}
     
+    def _rollups_ready(self) -> bool:
+        """Whether the backfill marker says the rollups cover every log."""
+        if MONGO_ROLLUPS and not self._rollups_backfilled:
+            marker = self.rollups_collection.find_one({"_id": ROLLUPS_MARKER}, {"state": 1})
+            self._rollups_backfilled = bool(marker) and marker.get("state") == "done"
+        return self._rollups_backfilled
+    
+    def _rollup_counts(self) -> Dict[str, int]:
+        """Request counts per service from the hour rollups."""
+        match: Dict[str, Any] = {"granularity": "hour"}
+        if MONGO_RETENTION_DAYS:
+            # Hour rollups outlive the logs; count only buckets still stored.
+            cutoff = datetime.utcnow() - timedelta(days=MONGO_RETENTION_DAYS)
+            match["bucket"] = {"$gte": bucket_start(cutoff, "hour")}
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": "$service", "count": {"$sum": "$count"}}},
+        ]
+        return {row["_id"]: row["count"] for row in self.rollups_collection.aggregate(pipeline)}
+    
     def close(self):
-        """Close connection."""
+        """Flush buffered writes and close connection."""
+        if self._log_buffer is not None:
+            self._log_buffer.close()
         if self.client:
             self.client.close()
             logger.info("MongoDB connection closed")
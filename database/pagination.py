@@ -0,0 +1,39 @@
+"""
+Opaque keyset cursors for newest-first listings.
+
+A cursor encodes the ``(timestamp, id)`` of the last item on a page; the
+next page starts strictly after it, so every page costs the same no
+matter how deep it is.
+"""
+import json
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class InvalidCursor(ValueError):
+    """The cursor is malformed or was not produced by ``encode_cursor``."""
+
+
+def encode_cursor(timestamp: str, item_id: str) -> str:
+    """Build a cursor from an ISO timestamp and an item id."""
+    raw = json.dumps({"t": timestamp, "i": item_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Return ``(timestamp, id)``; raises ``InvalidCursor``."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), str(data["i"])
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def next_cursor(items: List[Dict[str, Any]], limit: int, id_field: str) -> Optional[str]:
+    """Cursor for the page after ``items``, or None if this was the last page."""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last["timestamp"], last[id_field])
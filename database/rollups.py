@@ -0,0 +1,182 @@
+"""
+Pre-aggregated request statistics.
+
+Every flushed batch of request logs is folded into per-minute and per-hour
+rollup documents keyed by ``(granularity, bucket, service, status)`` with
+``$inc``/``$min``/``$max`` upserts, so dashboards read a handful of rollup
+documents instead of scanning raw logs.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+
+GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+}
+MAX_SERIES_POINTS = 10000
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """MongoDB stores naive UTC datetimes; normalise aware inputs to match."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    timestamp = timestamp.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        timestamp = timestamp.replace(minute=0)
+    return timestamp
+
+
+def rollup_updates(documents: Iterable[Dict[str, Any]]) -> List[UpdateOne]:
+    """Group request documents into one upsert per rollup key."""
+    groups: Dict[Tuple[str, datetime, str, str], Dict[str, Any]] = {}
+    for doc in documents:
+        latency = doc.get("latency_ms")
+        for granularity in GRANULARITIES:
+            key = (
+                granularity,
+                bucket_start(doc["timestamp"], granularity),
+                doc["service"],
+                doc.get("status", "success"),
+            )
+            agg = groups.setdefault(key, {"count": 0, "latency_count": 0, "latency_sum_ms": 0.0, "min": None, "max": None})
+            agg["count"] += 1
+            if latency is not None:
+                agg["latency_count"] += 1
+                agg["latency_sum_ms"] += latency
+                agg["min"] = latency if agg["min"] is None else min(agg["min"], latency)
+                agg["max"] = latency if agg["max"] is None else max(agg["max"], latency)
+
+    updates = []
+    for (granularity, bucket, service, status), agg in groups.items():
+        update: Dict[str, Any] = {"$inc": {"count": agg["count"]}}
+        if agg["latency_count"]:
+            update["$inc"]["latency_count"] = agg["latency_count"]
+            update["$inc"]["latency_sum_ms"] = agg["latency_sum_ms"]
+            update["$min"] = {"latency_min_ms": agg["min"]}
+            update["$max"] = {"latency_max_ms": agg["max"]}
+        updates.append(UpdateOne(
+            {"granularity": granularity, "bucket": bucket, "service": service, "status": status},
+            update,
+            upsert=True
+        ))
+    return updates
+
+
+def backfill_pipeline(granularity: str, match: Dict[str, Any], into: str) -> List[Dict[str, Any]]:
+    """Aggregation that recomputes the ``granularity`` rollups of the request
+    logs matching ``match`` and merges them into ``into``, replacing the
+    rollup documents with the same key.
+
+    Needs MongoDB 5.0+ (``$dateTrunc``) and the unique rollup key index.
+    """
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": granularity}},
+                "service": "$service",
+                "status": {"$ifNull": ["$status", "success"]},
+            },
+            "count": {"$sum": 1},
+            "latency_count": {"$sum": {"$cond": [{"$isNumber": "$latency_ms"}, 1, 0]}},
+            "latency_sum_ms": {"$sum": "$latency_ms"},
+            "latency_min_ms": {"$min": "$latency_ms"},
+            "latency_max_ms": {"$max": "$latency_ms"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "granularity": {"$literal": granularity},
+            "bucket": "$_id.bucket",
+            "service": "$_id.service",
+            "status": "$_id.status",
+            "count": 1,
+            "latency_count": 1,
+            "latency_sum_ms": 1,
+            "latency_min_ms": 1,
+            "latency_max_ms": 1,
+        }},
+        {"$merge": {
+            "into": into,
+            "on": ["granularity", "bucket", "service", "status"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }},
+    ]
+
+
+def stats_query(
+    start: datetime,
+    end: datetime,
+    granularity: str,
+    service: Optional[str] = None
+) -> Dict[str, Any]:
+    """Validate a time range and build the rollup filter; raises ValueError."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularity must be one of: {', '.join(GRANULARITIES)}")
+    if start >= end:
+        raise ValueError("start must be before end")
+    if (end - start) / GRANULARITIES[granularity] > MAX_SERIES_POINTS:
+        raise ValueError(f"Range too large for {granularity} granularity (max {MAX_SERIES_POINTS} points)")
+
+    query: Dict[str, Any] = {
+        "granularity": granularity,
+        "bucket": {"$gte": bucket_start(start, granularity), "$lt": end},
+    }
+    if service:
+        query["service"] = service
+    return query
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "by_service": {},
+        "by_status": {},
+        "latency_count": 0,
+        "latency_sum_ms": 0.0,
+        "latency_min_ms": None,
+        "latency_max_ms": None,
+    }
+
+
+def _add(totals: Dict[str, Any], rollup: Dict[str, Any]):
+    count = rollup.get("count", 0)
+    totals["count"] += count
+    totals["by_service"][rollup["service"]] = totals["by_service"].get(rollup["service"], 0) + count
+    totals["by_status"][rollup["status"]] = totals["by_status"].get(rollup["status"], 0) + count
+    if rollup.get("latency_count"):
+        totals["latency_count"] += rollup["latency_count"]
+        totals["latency_sum_ms"] += rollup["latency_sum_ms"]
+        for field, pick in (("latency_min_ms", min), ("latency_max_ms", max)):
+            value = rollup.get(field)
+            if value is not None:
+                totals[field] = value if totals[field] is None else pick(totals[field], value)
+
+
+def _finish(totals: Dict[str, Any]) -> Dict[str, Any]:
+    latency_count = totals.pop("latency_count")
+    latency_sum = totals.pop("latency_sum_ms")
+    totals["avg_latency_ms"] = round(latency_sum / latency_count, 2) if latency_count else None
+    return totals
+
+
+def summarize(rollups: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine rollup documents (sorted by bucket) into totals and a time series."""
+    totals = _empty_totals()
+    series: Dict[datetime, Dict[str, Any]] = {}
+    for rollup in rollups:
+        _add(totals, rollup)
+        _add(series.setdefault(rollup["bucket"], _empty_totals()), rollup)
+
+    return {
+        "totals": _finish(totals),
+        "series": [
+            {"bucket": bucket.isoformat(), **_finish(point)}
+            for bucket, point in sorted(series.items())
+        ],
+    }
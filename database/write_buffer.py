@@ -0,0 +1,147 @@
+"""
+Write-behind buffer that hands items to a flush function in batches.
+"""
+import time
+import logging
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from telemetry import observe
+    TELEMETRY_AVAILABLE = True
+except ImportError:
+    TELEMETRY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Thread-backed batching buffer.
+
+    Items are flushed when ``max_batch`` are pending or every
+    ``flush_interval`` seconds, whichever comes first. A failed batch is
+    retried up to ``retries`` times with exponential backoff starting at
+    ``retry_backoff`` seconds, so ``flush_fn`` must be safe to repeat.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush_fn: Callable[[List[Any]], None],
+        max_batch: int = 100,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        retries: int = 0,
+        retry_backoff: float = 0.5
+    ):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retries = max(0, retries)
+        self.retry_backoff = retry_backoff
+        self._items: List[Any] = []
+        # Batch handed to flush_fn and not yet committed.
+        self._in_flight: List[Any] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def add(self, item: Any) -> bool:
+        """Queue an item. Returns False if the buffer is full."""
+        with self._lock:
+            if len(self._items) >= self.max_pending:
+                self.dropped += 1
+                logger.warning(f"{self.name} buffer full, dropping item")
+                return False
+            self._items.append(item)
+            full = len(self._items) >= self.max_batch
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+        return True
+
+    def pending(self) -> List[Any]:
+        """Snapshot of items not yet flushed, including the batch being flushed."""
+        with self._lock:
+            return self._in_flight + self._items
+
+    def flush(self):
+        """Flush everything currently buffered."""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._items[:self.max_batch]
+                    del self._items[:self.max_batch]
+                    self._in_flight = batch
+                if not batch:
+                    return
+                try:
+                    self._flush_batch(batch)
+                finally:
+                    with self._lock:
+                        self._in_flight = []
+
+    def _flush_batch(self, batch: List[Any]):
+        for attempt in range(self.retries + 1):
+            try:
+                with observe(self.name, "flush") if TELEMETRY_AVAILABLE else nullcontext():
+                    self.flush_fn(batch)
+                self.flushed += len(batch)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    self.failed += len(batch)
+                    logger.error(f"{self.name} flush of {len(batch)} items failed: {e}")
+                    return
+                delay = self.retry_backoff * (2 ** attempt)
+                self.retried += 1
+                logger.warning(f"{self.name} flush of {len(batch)} items failed, retrying in {delay}s: {e}")
+                time.sleep(delay)
+
+    def close(self):
+        """Stop the background thread and flush what is left."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._in_flight) + len(self._items)
+        return {
+            "pending": pending,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+        }
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"{self.name}-flusher",
+                daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
@@ -8,6 +8,8 @@ import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+from telemetry import instrument_app
+
 try:
     from database.firebase_service import get_firebase_service
     FIREBASE_AVAILABLE = True
@@ -30,6 +32,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument_app(app)
 
 
 @app.get("/health")
@@ -104,7 +107,8 @@ async def create_output(request: Dict[str, Any]):
 async def get_outputs(
     service: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    cursor: Optional[str] = None
 ):
     if not FIREBASE_AVAILABLE:
         raise HTTPException(
@@ -125,22 +129,27 @@ async def get_outputs(
         if not firebase_service:
             raise HTTPException(status_code=503, detail="Firebase not initialized")
         
-        outputs = firebase_service.get_outputs(
+        page = firebase_service.get_outputs_page(
             service=service,
             limit=min(limit, 100),
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
 
         return {
-            "total": len(outputs),
+            "total": len(page["outputs"]),
             "service_filter": service,
             "limit": limit,
             "offset": offset,
-            "outputs": outputs
+            "cursor": cursor,
+            "next_cursor": page["next_cursor"],
+            "outputs": page["outputs"]
         }
 
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving Firebase outputs: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,4 @@
+"""Message encoding shared by the gateway and the postprocessing service."""
+from .codec import CodecError, decode, encode
+
+__all__ = ["CodecError", "decode", "encode"]
@@ -0,0 +1,76 @@
+"""
+Pluggable codec for queue messages.
+
+The encoding is carried in the AMQP properties: ``content_type`` names the
+serialisation and ``content_encoding`` is ``zstd`` when the body is
+compressed. Messages without a content type are legacy JSON.
+"""
+import os
+import json
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+ZSTD_ENCODING = "zstd"
+
+MESSAGE_CODEC = os.getenv("MESSAGE_CODEC", "msgpack").lower()
+# Bodies at least this large (bytes) are zstd-compressed; 0 disables compression.
+MESSAGE_COMPRESS_THRESHOLD = int(os.getenv("MESSAGE_COMPRESS_THRESHOLD", "4096"))
+MESSAGE_COMPRESS_LEVEL = int(os.getenv("MESSAGE_COMPRESS_LEVEL", "3"))
+
+
+class CodecError(ValueError):
+    """A message body could not be decoded."""
+
+
+def _serialise(message: Dict[str, Any], codec: str) -> Tuple[bytes, str]:
+    if codec == "msgpack" and MSGPACK_AVAILABLE:
+        return msgpack.packb(message, default=str, use_bin_type=True), MSGPACK_CONTENT_TYPE
+    return json.dumps(message, default=str).encode("utf-8"), JSON_CONTENT_TYPE
+
+
+def encode(
+    message: Dict[str, Any],
+    codec: str = MESSAGE_CODEC,
+    compress_threshold: int = MESSAGE_COMPRESS_THRESHOLD
+) -> Tuple[bytes, str, Optional[str]]:
+    """Serialise ``message``; returns ``(body, content_type, content_encoding)``."""
+    body, content_type = _serialise(message, codec)
+    if ZSTD_AVAILABLE and 0 < compress_threshold <= len(body):
+        return zstandard.ZstdCompressor(level=MESSAGE_COMPRESS_LEVEL).compress(body), content_type, ZSTD_ENCODING
+    return body, content_type, None
+
+
+def decode(body: bytes, content_type: Optional[str] = None, content_encoding: Optional[str] = None) -> Dict[str, Any]:
+    """Decode a body produced by ``encode`` (or a legacy plain JSON body)."""
+    try:
+        if content_encoding == ZSTD_ENCODING:
+            if not ZSTD_AVAILABLE:
+                raise CodecError("zstd-compressed message but zstandard is not installed")
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif content_encoding:
+            raise CodecError(f"Unsupported content encoding: {content_encoding}")
+
+        if content_type == MSGPACK_CONTENT_TYPE:
+            if not MSGPACK_AVAILABLE:
+                raise CodecError("msgpack message but msgpack is not installed")
+            return msgpack.unpackb(body, raw=False)
+        if content_type in (None, "", JSON_CONTENT_TYPE):
+            return json.loads(body)
+        raise CodecError(f"Unsupported content type: {content_type}")
+    except CodecError:
+        raise
+    except Exception as e:
+        raise CodecError(str(e)) from e
@@ -0,0 +1,70 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+
+class AckTracker:
+    """Turns out-of-order worker completions into batched acknowledgements.
+
+    Delivery tags are registered in arrival order. Workers settle them in
+    any order; ``collect()`` then returns the highest acked tag of the
+    contiguous settled prefix, so a single ``basic_ack(multiple=True)``
+    covers every earlier delivery, plus the tags that must be nacked
+    individually.
+
+    Delivery tags belong to a channel. When it closes, ``reset()`` forgets
+    them (the broker redelivers anything unacked), and settlements that
+    arrive afterwards for those tags are ignored.
+    """
+
+    def __init__(self):
+        self._pending: Deque[int] = deque()
+        self._registered: Set[int] = set()
+        self._settled: Dict[int, bool] = {}
+        self._nacks: List[Tuple[int, bool]] = []
+        self._lock = threading.Lock()
+
+    def add(self, delivery_tag: int):
+        with self._lock:
+            self._pending.append(delivery_tag)
+            self._registered.add(delivery_tag)
+
+    def ack(self, delivery_tag: int):
+        with self._lock:
+            if delivery_tag in self._registered:
+                self._settled[delivery_tag] = True
+
+    def nack(self, delivery_tag: int, requeue: bool):
+        with self._lock:
+            if delivery_tag in self._registered:
+                self._settled[delivery_tag] = False
+                self._nacks.append((delivery_tag, requeue))
+
+    def collect(self) -> Tuple[Optional[int], List[Tuple[int, bool]]]:
+        """Return ``(multiple_ack_tag, nacks)`` and forget the settled prefix.
+
+        Nacks must be sent before the multiple ack so it never covers them.
+        """
+        with self._lock:
+            nacks, self._nacks = self._nacks, []
+            ack_tag = None
+            while self._pending and self._pending[0] in self._settled:
+                tag = self._pending.popleft()
+                self._registered.discard(tag)
+                if self._settled.pop(tag):
+                    ack_tag = tag
+            return ack_tag, nacks
+
+    def reset(self) -> int:
+        """Forget every tag (the channel closed); returns how many were unacked."""
+        with self._lock:
+            dropped = len(self._pending)
+            self._pending.clear()
+            self._registered.clear()
+            self._settled.clear()
+            self._nacks = []
+            return dropped
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
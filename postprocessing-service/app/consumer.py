@@ -1,81 +1,232 @@
 import os
-import json
+import time
+import signal
 import logging
 import pika
-from typing import Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, List, Optional, Tuple
+from messaging import CodecError, decode
+from telemetry import counter, histogram, observe, start_metrics_server
+from .acks import AckTracker
+from .processing import process_output, expand_message, output_id, summarize_batch
+from .retry import DEAD, MAX_ATTEMPTS, declare_topology, route_failure
+from .sinks import create_sink
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
 RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "model_outputs")
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "4"))
+CONSUMER_BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", "25"))
+CONSUMER_BATCH_WAIT = float(os.getenv("CONSUMER_BATCH_WAIT", "0.5"))
+CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", str(CONSUMER_WORKERS * CONSUMER_BATCH_SIZE)))
+CONSUMER_ACK_INTERVAL = float(os.getenv("CONSUMER_ACK_INTERVAL", "0.2"))
+CONSUMER_DRAIN_TIMEOUT = float(os.getenv("CONSUMER_DRAIN_TIMEOUT", "30"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
 
-def process_output(message: Dict[str, Any]) -> Dict[str, Any]:
-    service = message.get("service", "")
-    response_data = message.get("response_data", {})
-    
-    processed = {
-        "service": service,
-        "original_output": response_data,
-        "processed_at": message.get("timestamp", ""),
-        "status": "processed"
-    }
-    
-    if service == "bitnet":
-        content = response_data.get("content", "") or response_data.get("generated_text", "")
-        processed["word_count"] = len(content.split())
-        processed["char_count"] = len(content)
-        processed["has_content"] = len(content.strip()) > 0
-    
-    elif service == "yolo":
-        detections = response_data.get("detections", [])
-        processed["detection_count"] = len(detections)
-        processed["unique_labels"] = list(set(d.get("label", "") for d in detections))
-    
-    logger.info(f"Processed {service} output")
-    return processed
-
-def on_message(ch, method, properties, body):
-    try:
-        message = json.loads(body)
-        logger.info(f"Received message: {message.get('service', 'unknown')}")
-        
-        processed = process_output(message)
-        
-        logger.info(f"Processing complete: {processed.get('status')}")
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        
-    except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON: {e}")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-    except Exception as e:
-        logger.error(f"Processing error: {e}")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+MESSAGES = counter(
+    "postprocessing_messages_total", "Messages by outcome", ["outcome"]
+)
+WINDOW_SIZE = histogram(
+    "postprocessing_window_messages", "Messages per processed window",
+    buckets=(1, 5, 10, 25, 50, 100, 250)
+)
 
-def main():
-    try:
-        connection = pika.BlockingConnection(
+# (delivery_tag, properties, body)
+Delivery = Tuple[int, Any, bytes]
+
+
+class Consumer:
+    """Consumes the output queue in windows processed by a pool of worker threads.
+
+    The pika connection stays on the main thread, which groups deliveries
+    into windows of up to ``CONSUMER_BATCH_SIZE`` messages (or whatever
+    arrived within ``CONSUMER_BATCH_WAIT`` seconds). Each window is
+    processed and written to the sink in one operation by a worker, and
+    acknowledgements go back from the main thread in batches
+    (``multiple=True``). On SIGTERM/SIGINT the consumer is cancelled,
+    in-flight windows are finished and acked, then the connection is
+    closed. Anything still unfinished after ``CONSUMER_DRAIN_TIMEOUT`` is
+    redelivered by the broker.
+
+    Failed messages are never requeued in place. They are republished to
+    a delayed retry queue (or, after ``CONSUMER_MAX_ATTEMPTS``, the
+    dead-letter queue) and then acked, so a poison message cannot spin at
+    the head of the queue. When a window's sink write fails, its messages
+    are written one by one so only the offending ones are retried. Every
+    output carries an ``_id`` derived from its message body, so rewriting
+    a partly written window (or a redelivered message) replaces documents
+    rather than duplicating them.
+    """
+
+    def __init__(
+        self,
+        workers: int = CONSUMER_WORKERS,
+        prefetch: int = CONSUMER_PREFETCH,
+        batch_size: int = CONSUMER_BATCH_SIZE,
+        batch_wait: float = CONSUMER_BATCH_WAIT,
+        sink=None
+    ):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.prefetch = max(self.batch_size, prefetch)
+        self.sink = sink or create_sink()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="consumer")
+        self.acks = AckTracker()
+        self.connection = None
+        self.channel = None
+        self.consumer_tag = None
+        self._window: List[Delivery] = []
+        self._failures: Deque[Tuple[int, Any, bytes, str, bool]] = deque()
+        self._window_started: Optional[float] = None
+        self._stopping = False
+
+    def run(self):
+        self.connection = pika.BlockingConnection(
             pika.ConnectionParameters(host=RABBITMQ_HOST)
         )
-        channel = connection.channel()
-        
-        channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
-        channel.basic_qos(prefetch_count=1)
-        channel.basic_consume(
+        self.channel = self.connection.channel()
+
+        self.channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
+        declare_topology(self.channel, RABBITMQ_QUEUE)
+        self.channel.basic_qos(prefetch_count=self.prefetch)
+        self.consumer_tag = self.channel.basic_consume(
             queue=RABBITMQ_QUEUE,
-            on_message_callback=on_message
+            on_message_callback=self._on_message
+        )
+
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        logger.info(
+            f"Waiting for messages ({self.workers} workers, prefetch {self.prefetch}, "
+            f"batches of {self.batch_size}, max {MAX_ATTEMPTS} attempts)"
         )
-        
-        logger.info("Waiting for messages. Press CTRL+C to exit.")
-        channel.start_consuming()
-        
-    except KeyboardInterrupt:
-        logger.info("Stopping consumer")
-        channel.stop_consuming()
-        connection.close()
+        tick = min(CONSUMER_ACK_INTERVAL, self.batch_wait)
+        while not self._stopping:
+            self.connection.process_data_events(time_limit=tick)
+            if self._window and time.monotonic() - self._window_started >= self.batch_wait:
+                self._dispatch()
+            self._flush_acks()
+
+        self._drain()
+
+    def _request_stop(self, signum, frame):
+        logger.info(f"Received signal {signum}, draining consumer")
+        self._stopping = True
+
+    def _on_message(self, ch, method, properties, body):
+        self.acks.add(method.delivery_tag)
+        if not self._window:
+            self._window_started = time.monotonic()
+        self._window.append((method.delivery_tag, properties, body))
+        if len(self._window) >= self.batch_size:
+            self._dispatch()
+
+    def _dispatch(self):
+        window, self._window = self._window, []
+        self.executor.submit(self.process_window, window)
+
+    def process_window(self, window: List[Delivery]):
+        entries = []
+        for delivery_tag, properties, body in window:
+            try:
+                message = decode(body, properties.content_type, properties.content_encoding)
+                processed = [process_output(m) for m in expand_message(message)]
+                for index, output in enumerate(processed):
+                    output["_id"] = output_id(body, index)
+            except CodecError as e:
+                self._fail(delivery_tag, properties, body, f"Undecodable message: {e}", permanent=True)
+                continue
+            except Exception as e:
+                self._fail(delivery_tag, properties, body, f"Processing error: {e}")
+                continue
+            entries.append((delivery_tag, properties, body, processed))
+
+        WINDOW_SIZE.observe(len(window))
+        if not entries:
+            return
+        outputs = [output for entry in entries for output in entry[3]]
+        try:
+            summary = summarize_batch(outputs)
+            with observe("sink", type(self.sink).__name__):
+                self.sink.write(outputs, summary)
+        except Exception as e:
+            logger.warning(f"Failed to write batch of {len(outputs)} outputs ({e}), writing messages individually")
+            self._write_individually(entries)
+            return
+
+        for entry in entries:
+            self.acks.ack(entry[0])
+        MESSAGES.labels("processed").inc(len(entries))
+        logger.info(f"Processing complete: {len(entries)} messages, {len(outputs)} outputs {summary['services']}")
+
+    def _write_individually(self, entries):
+        for delivery_tag, properties, body, processed in entries:
+            try:
+                with observe("sink", type(self.sink).__name__):
+                    self.sink.write(processed, summarize_batch(processed))
+                self.acks.ack(delivery_tag)
+                MESSAGES.labels("processed").inc()
+            except Exception as e:
+                self._fail(delivery_tag, properties, body, f"Sink error: {e}")
+
+    def _fail(self, delivery_tag: int, properties, body: bytes, error: str, permanent: bool = False):
+        logger.error(error)
+        self._failures.append((delivery_tag, properties, body, error, permanent))
+
+    def _flush_acks(self):
+        if not self.channel.is_open:
+            # Tags from a closed channel cannot be acked; the broker redelivers them.
+            self._failures.clear()
+            dropped = self.acks.reset()
+            if dropped:
+                logger.warning(f"Channel closed, {dropped} unacked messages will be redelivered")
+            return
+
+        # Failed messages are republished before their original delivery is acked.
+        while self._failures:
+            delivery_tag, properties, body, error, permanent = self._failures.popleft()
+            try:
+                outcome = route_failure(self.channel, RABBITMQ_QUEUE, body, properties, error, permanent)
+                if outcome == DEAD:
+                    logger.warning(f"Message moved to dead-letter queue: {error}")
+                MESSAGES.labels("dead_lettered" if outcome == DEAD else "retried").inc()
+                self.acks.ack(delivery_tag)
+            except Exception as e:
+                logger.error(f"Failed to route failed message: {e}")
+                self.acks.nack(delivery_tag, requeue=True)
+
+        ack_tag, nacks = self.acks.collect()
+        for delivery_tag, requeue in nacks:
+            self.channel.basic_nack(delivery_tag=delivery_tag, requeue=requeue)
+        if ack_tag is not None:
+            self.channel.basic_ack(delivery_tag=ack_tag, multiple=True)
+
+    def _drain(self):
+        self.channel.basic_cancel(self.consumer_tag)
+        if self._window:
+            self._dispatch()
+        deadline = time.monotonic() + CONSUMER_DRAIN_TIMEOUT
+        while len(self.acks) and time.monotonic() < deadline:
+            self.connection.process_data_events(time_limit=CONSUMER_ACK_INTERVAL)
+            self._flush_acks()
+
+        if len(self.acks):
+            logger.warning(f"Drain timed out, {len(self.acks)} messages will be redelivered")
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.connection.close()
+        logger.info("Consumer stopped")
+
+def main():
+    start_metrics_server(METRICS_PORT)
+    try:
+        Consumer().run()
     except Exception as e:
         logger.error(f"Connection error: {e}")
 
 if __name__ == "__main__":
     main()
-
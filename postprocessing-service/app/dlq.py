@@ -0,0 +1,99 @@
+"""
+Inspect, replay or purge the postprocessing dead-letter queue.
+
+    python -m app.dlq list [--limit N]
+    python -m app.dlq replay [--limit N]
+    python -m app.dlq purge
+"""
+import os
+import sys
+import argparse
+import pika
+from .retry import (
+    ATTEMPTS_HEADER, ERROR_HEADER, FAILED_AT_HEADER,
+    copy_properties, dead_letter_queue_name, declare_topology
+)
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+RABBITMQ_QUEUE = os.getenv("RABBITMQ_QUEUE", "model_outputs")
+
+
+def _connect():
+    connection = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST))
+    channel = connection.channel()
+    channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
+    declare_topology(channel, RABBITMQ_QUEUE)
+    return connection, channel
+
+
+def list_messages(channel, queue: str, limit: int):
+    """Print up to ``limit`` dead letters without removing them."""
+    fetched = []
+    for _ in range(limit):
+        method, properties, body = channel.basic_get(queue=queue, auto_ack=False)
+        if method is None:
+            break
+        fetched.append(method.delivery_tag)
+        headers = properties.headers or {}
+        print(
+            f"#{len(fetched)} attempts={headers.get(ATTEMPTS_HEADER, 0)} "
+            f"failed_at={headers.get(FAILED_AT_HEADER, '-')}\n"
+            f"  error: {headers.get(ERROR_HEADER, '-')}\n"
+            f"  body:  {body[:200]!r}"
+        )
+    # Unacked messages go back to the DLQ in their original order.
+    if fetched:
+        channel.basic_nack(delivery_tag=fetched[-1], multiple=True, requeue=True)
+    print(f"{len(fetched)} message(s) shown")
+
+
+def replay_messages(channel, queue: str, limit: int):
+    """Move up to ``limit`` dead letters back onto the main queue with a fresh attempt count."""
+    replayed = 0
+    for _ in range(limit):
+        method, properties, body = channel.basic_get(queue=queue, auto_ack=False)
+        if method is None:
+            break
+        headers = {
+            k: v for k, v in (properties.headers or {}).items()
+            if k not in (ATTEMPTS_HEADER, ERROR_HEADER, FAILED_AT_HEADER)
+        }
+        channel.basic_publish(
+            exchange="",
+            routing_key=RABBITMQ_QUEUE,
+            body=body,
+            properties=copy_properties(properties, headers)
+        )
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        replayed += 1
+    print(f"{replayed} message(s) replayed to {RABBITMQ_QUEUE}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.dlq", description="Manage the dead-letter queue")
+    parser.add_argument("command", choices=["list", "replay", "purge"])
+    parser.add_argument("--limit", type=int, default=20, help="max messages to list or replay")
+    args = parser.parse_args(argv)
+
+    queue = dead_letter_queue_name(RABBITMQ_QUEUE)
+    try:
+        connection, channel = _connect()
+    except Exception as e:
+        print(f"Connection error: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        if args.command == "list":
+            list_messages(channel, queue, args.limit)
+        elif args.command == "replay":
+            replay_messages(channel, queue, args.limit)
+        else:
+            frame = channel.queue_purge(queue=queue)
+            print(f"{frame.method.message_count} message(s) purged from {queue}")
+    finally:
+        connection.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
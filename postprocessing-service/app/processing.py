@@ -0,0 +1,96 @@
+import hashlib
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+
+def process_output(message: Dict[str, Any]) -> Dict[str, Any]:
+    service = message.get("service", "")
+    response_data = message.get("response_data", {})
+
+    processed = {
+        "service": service,
+        "original_output": response_data,
+        "processed_at": message.get("timestamp", ""),
+        "status": "processed"
+    }
+
+    if service == "bitnet":
+        content = response_data.get("content", "") or response_data.get("generated_text", "")
+        processed["word_count"] = len(content.split())
+        processed["char_count"] = len(content)
+        processed["has_content"] = len(content.strip()) > 0
+
+    elif service == "yolo":
+        detections = response_data.get("detections", [])
+        processed["detection_count"] = len(detections)
+        processed["unique_labels"] = list(set(d.get("label", "") for d in detections))
+        processed["label_counts"] = dict(Counter(d.get("label", "") for d in detections))
+
+    return processed
+
+
+def expand_message(message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split a queue message into single outputs (batched messages carry ``items``)."""
+    if "items" in message:
+        return [
+            {
+                "service": message.get("service", ""),
+                "timestamp": message.get("timestamp", ""),
+                **item
+            }
+            for item in message["items"]
+        ]
+    return [message]
+
+
+def output_id(body: bytes, index: int) -> str:
+    """Stable ``_id`` for the ``index``-th output of a queue message.
+
+    Derived from the message body so a redelivered or rewritten message
+    replaces its earlier outputs instead of duplicating them.
+    """
+    return f"{hashlib.sha1(body).hexdigest()}:{index}"
+
+
+def batch_id(processed: List[Dict[str, Any]]) -> str:
+    """Stable ``_id`` for the summary of a batch, from its outputs' ids."""
+    ids = "\n".join(str(p.get("_id", "")) for p in processed)
+    return hashlib.sha1(ids.encode("utf-8")).hexdigest()
+
+
+def summarize_batch(processed: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate statistics over a whole batch of processed outputs."""
+    services = Counter(p["service"] for p in processed)
+    bitnet = [p for p in processed if p["service"] == "bitnet"]
+    yolo = [p for p in processed if p["service"] == "yolo"]
+
+    words = sum(p["word_count"] for p in bitnet)
+    chars = sum(p["char_count"] for p in bitnet)
+    labels = Counter()
+    for p in yolo:
+        labels.update(p["label_counts"])
+    detections = sum(p["detection_count"] for p in yolo)
+
+    return {
+        "batch_size": len(processed),
+        "services": dict(services),
+        "bitnet": {
+            "outputs": len(bitnet),
+            "empty_outputs": sum(1 for p in bitnet if not p["has_content"]),
+            "total_words": words,
+            "total_chars": chars,
+            "avg_words": round(words / len(bitnet), 2) if bitnet else 0.0,
+            "avg_chars": round(chars / len(bitnet), 2) if bitnet else 0.0,
+        },
+        "yolo": {
+            "outputs": len(yolo),
+            "total_detections": detections,
+            "avg_detections": round(detections / len(yolo), 2) if yolo else 0.0,
+            "label_counts": dict(labels.most_common()),
+        },
+        "created_at": datetime.utcnow().isoformat(),
+    }
@@ -0,0 +1,99 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+import pika
+
+
+# A failed message waits in the retry queue for its attempt, then the
+# queue's TTL dead-letters it back onto the main queue. After
+# CONSUMER_MAX_ATTEMPTS failures it is parked in the dead-letter queue.
+RETRY_DELAYS_MS = [
+    int(delay) for delay in os.getenv("CONSUMER_RETRY_DELAYS_MS", "1000,5000,30000,120000").split(",")
+    if delay.strip()
+]
+MAX_ATTEMPTS = int(os.getenv("CONSUMER_MAX_ATTEMPTS", str(len(RETRY_DELAYS_MS) + 1)))
+
+ATTEMPTS_HEADER = "x-attempts"
+ERROR_HEADER = "x-last-error"
+FAILED_AT_HEADER = "x-failed-at"
+
+RETRY = "retry"
+DEAD = "dead"
+
+
+def retry_queue_name(queue: str, delay_ms: int) -> str:
+    return f"{queue}.retry.{delay_ms}ms"
+
+
+def dead_letter_queue_name(queue: str) -> str:
+    return f"{queue}.dlq"
+
+
+def declare_topology(channel, queue: str):
+    """Declare the retry and dead-letter queues for ``queue``.
+
+    The main queue is left as it is so existing deployments (and the
+    gateway, which declares it too) keep working; the retry queues route
+    back to it through the default exchange.
+    """
+    for delay_ms in RETRY_DELAYS_MS:
+        channel.queue_declare(
+            queue=retry_queue_name(queue, delay_ms),
+            durable=True,
+            arguments={
+                "x-message-ttl": delay_ms,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": queue,
+            }
+        )
+    channel.queue_declare(queue=dead_letter_queue_name(queue), durable=True)
+
+
+def attempts(properties: Optional[pika.BasicProperties]) -> int:
+    headers = (properties.headers if properties else None) or {}
+    try:
+        return int(headers.get(ATTEMPTS_HEADER, 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def copy_properties(properties: Optional[pika.BasicProperties], headers: Dict[str, Any]) -> pika.BasicProperties:
+    return pika.BasicProperties(
+        delivery_mode=2,
+        content_type=properties.content_type if properties else None,
+        content_encoding=properties.content_encoding if properties else None,
+        headers=headers
+    )
+
+
+def route_failure(
+    channel,
+    queue: str,
+    body: bytes,
+    properties: Optional[pika.BasicProperties],
+    error: str,
+    permanent: bool = False
+) -> str:
+    """Republish a failed message to its next retry queue or the DLQ.
+
+    The caller acks the original delivery afterwards.
+    """
+    attempt = attempts(properties) + 1
+    headers = dict((properties.headers if properties else None) or {})
+    headers[ATTEMPTS_HEADER] = attempt
+    headers[ERROR_HEADER] = error[:500]
+    headers[FAILED_AT_HEADER] = datetime.utcnow().isoformat()
+
+    if permanent or attempt >= MAX_ATTEMPTS or not RETRY_DELAYS_MS:
+        target, outcome = dead_letter_queue_name(queue), DEAD
+    else:
+        delay_ms = RETRY_DELAYS_MS[min(attempt, len(RETRY_DELAYS_MS)) - 1]
+        target, outcome = retry_queue_name(queue, delay_ms), RETRY
+
+    channel.basic_publish(
+        exchange="",
+        routing_key=target,
+        body=body,
+        properties=copy_properties(properties, headers)
+    )
+    return outcome
@@ -0,0 +1,82 @@
+import os
+import json
+import logging
+from typing import Dict, Any, List
+from .processing import batch_id
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pymongo import InsertOne, MongoClient, ReplaceOne
+    MONGO_AVAILABLE = True
+except ImportError:
+    MONGO_AVAILABLE = False
+
+PROCESSED_SINK = os.getenv("PROCESSED_SINK", "mongo").lower()
+PROCESSED_SINK_PATH = os.getenv("PROCESSED_SINK_PATH", "/data/processed_outputs.jsonl")
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb:27017")
+DB_NAME = os.getenv("MONGO_DB_NAME", "milo_db")
+PROCESSED_COLLECTION = "processed_outputs"
+BATCHES_COLLECTION = "processed_batches"
+
+
+class LogSink:
+    """Only logs the batch summary."""
+
+    def write(self, processed: List[Dict[str, Any]], summary: Dict[str, Any]):
+        logger.info(f"Processed batch of {summary['batch_size']}: {summary['services']}")
+
+
+class FileSink:
+    """Appends each batch to a JSON lines file in a single write."""
+
+    def __init__(self, path: str = PROCESSED_SINK_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, processed: List[Dict[str, Any]], summary: Dict[str, Any]):
+        lines = [json.dumps(p, default=str) for p in processed]
+        lines.append(json.dumps({"batch_summary": summary}, default=str))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+class MongoSink:
+    """Writes each batch with one ``bulk_write`` plus its summary document.
+
+    Outputs with an ``_id`` are upserted, so writing the same outputs again
+    (after a partial failure or a redelivery) leaves one document each.
+    """
+
+    def __init__(self, uri: str = MONGO_URI, db_name: str = DB_NAME):
+        self.client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+        db = self.client[db_name]
+        self.outputs = db[PROCESSED_COLLECTION]
+        self.batches = db[BATCHES_COLLECTION]
+
+    def write(self, processed: List[Dict[str, Any]], summary: Dict[str, Any]):
+        if processed:
+            self.outputs.bulk_write([_upsert(p) for p in processed], ordered=False)
+        self.batches.replace_one({"_id": batch_id(processed)}, dict(summary), upsert=True)
+
+
+def _upsert(document: Dict[str, Any]):
+    if "_id" in document:
+        return ReplaceOne({"_id": document["_id"]}, document, upsert=True)
+    # InsertOne mutates its document (adds _id); keep callers' dicts clean.
+    return InsertOne(dict(document))
+
+
+def create_sink(kind: str = PROCESSED_SINK):
+    if kind == "mongo":
+        if MONGO_AVAILABLE:
+            return MongoSink()
+        logger.warning("pymongo not installed, only logging batches")
+        return LogSink()
+    if kind == "file":
+        return FileSink()
+    if kind != "log":
+        logger.warning(f"Unknown PROCESSED_SINK '{kind}', only logging batches")
+    return LogSink()
@@ -0,0 +1,18 @@
+"""Prometheus metrics shared by the gateway and the backend services."""
+from .metrics import (
+    METRICS_ENABLED, counter, gauge, histogram, instrument_app,
+    mark_process_dead, observe, record, render_metrics, start_metrics_server
+)
+
+__all__ = [
+    "METRICS_ENABLED",
+    "counter",
+    "gauge",
+    "histogram",
+    "instrument_app",
+    "mark_process_dead",
+    "observe",
+    "record",
+    "render_metrics",
+    "start_metrics_server",
+]
@@ -0,0 +1,214 @@
+"""
+Prometheus metrics shared by the gateway and the backend services.
+
+HTTP services call ``instrument_app(app)`` to get request counters,
+latency histograms and an in-flight gauge per route plus a ``/metrics``
+endpoint; calls to other systems are timed with ``observe(upstream,
+operation)``. Services without an HTTP server expose the registry with
+``start_metrics_server``.
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set (gunicorn workers) every process
+writes its samples to that directory and ``/metrics`` aggregates them.
+Without ``prometheus_client`` installed, or with ``METRICS_ENABLED=0``,
+everything here is a no-op.
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry,
+        Counter, Gauge, Histogram, generate_latest, multiprocess
+    )
+    from prometheus_client import start_http_server as _start_http_server
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1" and PROMETHEUS_AVAILABLE
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Seconds; covers cache hits (ms) up to long BitNet completions (minutes).
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()):
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    return Counter(name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()):
+    """In multiprocess mode the gauge is summed over live processes."""
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    return Gauge(name, documentation, labelnames, multiprocess_mode="livesum")
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+HTTP_REQUESTS = counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+HTTP_LATENCY = histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is complete", ["method", "route"]
+)
+HTTP_IN_FLIGHT = gauge(
+    "http_requests_in_flight", "HTTP requests being handled", ["method"]
+)
+UPSTREAM_LATENCY = histogram(
+    "upstream_call_duration_seconds", "Latency of calls to other systems", ["upstream", "operation"]
+)
+UPSTREAM_IN_FLIGHT = gauge(
+    "upstream_calls_in_flight", "Calls to other systems in progress", ["upstream", "operation"]
+)
+UPSTREAM_ERRORS = counter(
+    "upstream_call_errors_total", "Calls to other systems that raised", ["upstream", "operation", "error"]
+)
+
+
+@contextmanager
+def observe(upstream: str, operation: str) -> Iterator[None]:
+    """Time a call to ``upstream`` and count it as an error if it raises.
+
+    Works around ``await`` too: ``with observe("bitnet", "completion"): await ...``.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    in_flight = UPSTREAM_IN_FLIGHT.labels(upstream, operation)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(upstream, operation, type(e).__name__).inc()
+        raise
+    finally:
+        in_flight.dec()
+        UPSTREAM_LATENCY.labels(upstream, operation).observe(time.perf_counter() - start)
+
+
+def record(upstream: str, operation: str, seconds: float, error: Optional[str] = None):
+    """Record a call timed elsewhere, e.g. one that completes in a callback."""
+    if not METRICS_ENABLED:
+        return
+    UPSTREAM_LATENCY.labels(upstream, operation).observe(seconds)
+    if error:
+        UPSTREAM_ERRORS.labels(upstream, operation, error).inc()
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    # Newer FastAPI keeps the included router's own route in the scope; the
+    # prefixed path is on the effective route context.
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(context, "path", None) or getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording count, latency and in-flight requests per route.
+
+    Routes are labelled by their path template (``/requests/{request_id}``),
+    so ids do not create new series. Latency runs until the last body
+    chunk is sent, which includes streamed responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            route = _route_template(scope)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """The exposition body and its content type."""
+    if not METRICS_ENABLED:
+        return b"", CONTENT_TYPE_LATEST
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def instrument_app(app):
+    """Add the metrics middleware and a ``GET /metrics`` route to a FastAPI app."""
+    from starlette.responses import Response
+
+    if not METRICS_ENABLED:
+        logger.info("Metrics disabled (METRICS_ENABLED=0 or prometheus_client missing)")
+        return
+
+    async def metrics():
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+
+
+def start_metrics_server(port: int):
+    """Serve ``/metrics`` on ``port`` from a background thread."""
+    if not METRICS_ENABLED:
+        logger.info("Metrics disabled (METRICS_ENABLED=0 or prometheus_client missing)")
+        return
+    _start_http_server(port)
+    logger.info(f"Metrics available on :{port}/metrics")
+
+
+def mark_process_dead(pid: int):
+    """Drop a finished worker's live gauges (multiprocess mode)."""
+    if METRICS_ENABLED and MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,26 @@
+"""
+Shared test helpers.
+"""
+import sys
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def load_service_app(name: str, service_dir: str) -> ModuleType:
+    """Import ``<service_dir>/app`` as the package ``name``.
+
+    Every service package is called "app" like the gateway's, so each is
+    loaded under its own name; later calls return the loaded package.
+    """
+    if name not in sys.modules:
+        app_dir = PROJECT_ROOT / service_dir / "app"
+        spec = importlib.util.spec_from_file_location(
+            name, app_dir / "__init__.py", submodule_search_locations=[str(app_dir)]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
@@ -0,0 +1,170 @@
+"""
+BitNet streaming tests against a mocked llama-server.
+"""
+import re
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("fastapi")
+pytest.importorskip("multipart")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "api-gateway"))
+
+from app.models import CompletionRequest
+from app.routes.bitnet import _stream_completion
+from app.services import BitNetClient, completion_cache
+from app.services.bitnet_client import completion_cache_key
+from app.utils import StreamingCleaner, clean_response, is_low_quality_response
+from app.utils import response_utils
+from app.utils.response_utils import REPEATED_LINE_LIMIT
+
+
+class MockBitNetClient(BitNetClient):
+    def __init__(self):
+        super().__init__(base_url="http://bitnet:8080")
+        self.mock_mode = False
+        self.calls = 0
+        self.closed = 0
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=httpx.MockTransport(self._handle)
+        )
+
+    @property
+    def http(self):
+        return self._http
+
+    def _handle(self, request):
+        self.calls += 1
+        chunks = [
+            {"content": "The answer", "stop": False},
+            {"content": " is four.", "stop": False},
+            {"content": "", "stop": True, "tokens_predicted": 4},
+        ]
+        body = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks)
+        return httpx.Response(200, stream=TrackedStream(self, body.encode()))
+
+
+class TrackedStream(httpx.AsyncByteStream):
+    def __init__(self, client, body):
+        self.client = client
+        self.body = body
+
+    async def __aiter__(self):
+        yield self.body
+
+    async def aclose(self):
+        self.client.closed += 1
+
+
+class RecordingSideEffects:
+    def __init__(self):
+        self.submitted = []
+
+    async def submit(self, **kwargs):
+        self.submitted.append(kwargs)
+
+
+def _collect(request, client, side_effects):
+    async def run():
+        return [event async for event in _stream_completion(request, client, side_effects)]
+    return asyncio.run(run())
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    completion_cache.clear()
+    yield
+    completion_cache.clear()
+
+
+def test_deterministic_stream_is_cached_and_upstream_closed():
+    client = MockBitNetClient()
+    side_effects = RecordingSideEffects()
+    request = CompletionRequest(prompt="What is 2 + 2?", n_predict=16, temperature=0)
+
+    first = _collect(request, client, side_effects)
+    assert client.calls == 1
+    assert client.closed == 1
+    assert completion_cache.stats()["entries"] == 1
+
+    second = _collect(request, client, side_effects)
+    assert client.calls == 1
+    assert first[-1] == second[-1]
+    assert first[-1].startswith("event: done")
+    assert len(side_effects.submitted) == 2
+
+
+def test_sampled_stream_is_not_cached():
+    client = MockBitNetClient()
+    request = CompletionRequest(prompt="What is 2 + 2?", n_predict=16, temperature=0.7)
+
+    _collect(request, client, RecordingSideEffects())
+    _collect(request, client, RecordingSideEffects())
+    assert client.calls == 2
+    assert completion_cache.stats()["entries"] == 0
+
+
+def test_cache_key_keeps_prompt_whitespace_and_stop_order():
+    assert completion_cache_key("Q:", 16, None) != completion_cache_key("Q: ", 16, None)
+    assert completion_cache_key("Q:", 16, ["a", "b"]) != completion_cache_key("Q:", 16, ["b", "a"])
+    assert completion_cache_key("Q:", 16, None) == completion_cache_key("Q:", 16, [])
+
+
+def _stream(text, prompt=""):
+    """Feed ``text`` word by word; returns the cleaner and what it emitted."""
+    cleaner = StreamingCleaner(prompt=prompt)
+    deltas = []
+    for token in re.findall(r"\S+|\s+", text):
+        deltas.append(cleaner.feed(token))
+        if cleaner.low_quality:
+            break
+    return cleaner, "".join(deltas)
+
+
+@pytest.mark.parametrize("text", [
+    "\n".join(f"{i}. Step number {i} of the plan" for i in range(1, 20)),
+    "Is it?\nWhy not?\nWho knows?\n" + "\n".join(f"Line {i} explains the answer in detail." for i in range(20)),
+    "A: " + " ".join(f"word{i}" for i in range(300)) + "\nSecond  line   with spaces.\n- ok\nLast line of the answer.",
+])
+def test_stream_accepts_what_completion_accepts(text):
+    assert not is_low_quality_response(clean_response(text))
+
+    cleaner, emitted = _stream(text)
+    assert not cleaner.low_quality
+    content = cleaner.finish()
+    assert not cleaner.low_quality
+    assert emitted.strip() == content
+
+
+def test_repeated_line_stops_the_stream_before_it_is_sent():
+    text = "Intro line for the answer.\n" + "Same line again and again.\n" * 6
+    cleaner, emitted = _stream(text)
+    assert cleaner.low_quality
+    assert emitted.count("Same line again and again.") == REPEATED_LINE_LIMIT - 1
+    assert is_low_quality_response(clean_response(text))
+
+
+def test_table_row_without_newline_is_never_sent():
+    cleaner, emitted = _stream("Ok so | 2024-01-02 | 3 | more text")
+    assert "|" not in emitted
+    cleaner.finish()
+    assert cleaner.low_quality
+
+
+def test_only_the_stream_head_is_recleaned(monkeypatch):
+    calls = []
+    clean = response_utils.clean_response
+    monkeypatch.setattr(response_utils, "clean_response", lambda *a, **k: calls.append(1) or clean(*a, **k))
+
+    cleaner = StreamingCleaner()
+    for i in range(2000):
+        cleaner.feed(f"w{i} " if i % 10 else f"line {i}\n")
+    assert len(calls) <= response_utils.STREAM_HEAD_CHARS + 1
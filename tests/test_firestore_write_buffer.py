@@ -0,0 +1,246 @@
+"""
+Firestore write-behind tests against an in-memory fake client.
+"""
+import sys
+import uuid
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from database import firebase_service
+from database.write_buffer import WriteBehindBuffer
+
+
+class FakeIncrement:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeDocument:
+    def __init__(self, db, collection, doc_id):
+        self.db = db
+        self.collection = collection
+        self.id = doc_id
+
+    def get(self, transaction=None):
+        if self.db.fail_gets:
+            self.db.fail_gets -= 1
+            raise RuntimeError("unavailable")
+        data = self.db.data.get(self.collection, {}).get(self.id)
+        return SimpleNamespace(exists=data is not None, to_dict=lambda: dict(data or {}))
+
+
+class FakeCollection:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def document(self, doc_id=None):
+        return FakeDocument(self.db, self.name, doc_id or uuid.uuid4().hex)
+
+    def _docs(self):
+        return self.db.data.get(self.name, {})
+
+    def where(self, field, op, value):
+        query = FakeCollection(self.db, self.name)
+        query._docs = lambda: {k: v for k, v in self._docs().items() if v.get(field) == value}
+        return query
+
+    def count(self, alias=None):
+        return SimpleNamespace(get=lambda: [[SimpleNamespace(value=len(self._docs()))]])
+
+    def stream(self):
+        return [SimpleNamespace(id=k, to_dict=lambda v=v: dict(v)) for k, v in self._docs().items()]
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+    def set(self, ref, data, merge=False):
+        self.ops.append((ref, data, merge))
+
+    def delete(self, ref):
+        self.ops.append((ref, None, False))
+
+    def commit(self):
+        if self.db.fail_commits:
+            self.db.fail_commits -= 1
+            raise RuntimeError("deadline exceeded")
+        if len(self.ops) > firebase_service.FIRESTORE_BATCH_LIMIT:
+            raise ValueError("too many writes in batch")
+        self.db.commits.append(len(self.ops))
+        for ref, data, merge in self.ops:
+            docs = self.db.data.setdefault(ref.collection, {})
+            if data is None:
+                docs.pop(ref.id, None)
+                continue
+            current = docs.get(ref.id, {}) if merge else {}
+            for key, value in data.items():
+                if isinstance(value, FakeIncrement):
+                    value = current.get(key, 0) + value.value
+                current[key] = value
+            docs[ref.id] = current
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.data = {}
+        self.commits = []
+        self.fail_commits = 0
+        self.fail_gets = 0
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    transaction = batch
+
+
+def _transactional(fn):
+    def run(transaction):
+        result = fn(transaction)
+        transaction.commit()
+        return result
+    return run
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(
+        firebase_service, "firestore",
+        SimpleNamespace(Increment=FakeIncrement, transactional=_transactional), raising=False
+    )
+    monkeypatch.setattr(firebase_service, "_counters_ready", True)
+    monkeypatch.setattr(firebase_service, "_counters_dirty", False)
+    svc = firebase_service.FirebaseService.__new__(firebase_service.FirebaseService)
+    svc.db = FakeFirestore()
+    svc.collection_name = "model_outputs"
+    svc.counters_name = "model_outputs_counters"
+    svc._write_buffer = WriteBehindBuffer(
+        "test-outputs", svc._commit_outputs, max_batch=499, flush_interval=60, retries=2, retry_backoff=0
+    )
+    yield svc
+    svc._write_buffer.close()
+
+
+def _counter_total(db, key):
+    return sum(shard.get(key, 0) for shard in db.data.get("model_outputs_counters", {}).values())
+
+
+def test_create_output_is_buffered_until_flush(service):
+    doc_id = service.create_output("yolo", {"filename": "a.jpg"}, {"detections": []})
+
+    assert doc_id
+    assert service.db.commits == []
+    assert service.get_output(doc_id)["service"] == "yolo"
+
+    service.flush()
+    assert doc_id in service.db.data["model_outputs"]
+    assert _counter_total(service.db, "yolo") == 1
+    assert _counter_total(service.db, "total") == 1
+
+
+def test_batches_stay_within_firestore_limit(service):
+    entries = [{"request_data": {"i": i}, "response_data": {}} for i in range(1200)]
+    doc_ids = service.create_outputs("bitnet", entries)
+
+    service.flush()
+    assert len(doc_ids) == 1200
+    assert len(service.db.data["model_outputs"]) == 1200
+    assert max(service.db.commits) <= firebase_service.FIRESTORE_BATCH_LIMIT
+    assert _counter_total(service.db, "bitnet") == 1200
+
+
+def test_failed_commit_is_retried(service):
+    service.db.fail_commits = 2
+    service.create_output("bitnet", {"prompt": "hi"}, {"content": "hello"})
+
+    service.flush()
+    assert len(service.db.data["model_outputs"]) == 1
+    assert service._write_buffer.stats()["retried"] == 2
+    assert service._write_buffer.stats()["failed"] == 0
+
+
+def test_close_flushes_pending_outputs(service):
+    service.create_output("yolo", {"filename": "b.jpg"}, {"detections": []})
+
+    service._write_buffer.close()
+    assert len(service.db.data["model_outputs"]) == 1
+    assert service._write_buffer.stats()["pending"] == 0
+
+
+def test_outputs_stay_visible_while_their_batch_commits(service):
+    committing = threading.Event()
+    release = threading.Event()
+    commit = service._commit_outputs
+
+    def slow_commit(items):
+        committing.set()
+        release.wait(5)
+        commit(items)
+
+    service._write_buffer.flush_fn = slow_commit
+    doc_id = service.create_output("yolo", {"filename": "c.jpg"}, {"detections": []})
+    flusher = threading.Thread(target=service.flush)
+    flusher.start()
+    try:
+        assert committing.wait(5)
+        assert service.get_output(doc_id)["service"] == "yolo"
+        assert service._write_buffer.stats()["pending"] == 1
+        # An update or delete waits for the in-flight batch before touching the document.
+        waiter = threading.Thread(target=service._flush_if_pending, args=(doc_id,))
+        waiter.start()
+        waiter.join(0.1)
+        assert waiter.is_alive()
+    finally:
+        release.set()
+        flusher.join(5)
+
+    waiter.join(5)
+    assert doc_id in service.db.data["model_outputs"]
+    assert service._write_buffer.stats()["pending"] == 0
+
+
+def test_skipped_increment_triggers_rebuild(service, monkeypatch):
+    monkeypatch.setattr(firebase_service, "_counters_ready", False)
+    service.db.data["model_outputs_counters"] = {firebase_service.COUNTERS_MARKER: {}}
+    rebuilds = []
+    monkeypatch.setattr(service, "rebuild_counters", lambda: rebuilds.append(True))
+
+    service.db.fail_gets = 1
+    service.create_output("yolo", {"filename": "d.jpg"}, {"detections": []})
+    service.flush()
+    assert _counter_total(service.db, "yolo") == 0
+    assert firebase_service._counters_dirty
+
+    # The marker exists, but the skipped increment forces a recount.
+    service.create_output("yolo", {"filename": "e.jpg"}, {"detections": []})
+    service.flush()
+    assert rebuilds == [True]
+    assert firebase_service._counters_ready
+    assert not firebase_service._counters_dirty
+
+
+def test_delete_before_counters_are_ready_is_recounted(service, monkeypatch):
+    doc_ids = service.create_outputs("yolo", [{"request_data": {}, "response_data": {}}] * 2)
+    service.flush()
+    assert _counter_total(service.db, "yolo") == 2
+
+    monkeypatch.setattr(firebase_service, "_counters_ready", False)
+    service.db.fail_gets = 1
+    assert service.delete_output(doc_ids[0])
+    assert firebase_service._counters_dirty
+
+    # The next initialisation recounts instead of trusting the stale shards.
+    assert firebase_service._ensure_counters(service)
+    assert service._read_counters()["yolo"] == 1
+    assert service._read_counters()["total"] == 1
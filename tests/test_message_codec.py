@@ -0,0 +1,84 @@
+"""
+Queue message codec round-trip tests.
+"""
+import sys
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from messaging import CodecError, decode, encode
+from messaging import codec
+
+MESSAGE = {
+    "service": "yolo",
+    "request_data": {"filename": "a.jpg"},
+    "response_data": {"detections": [{"class": "person", "confidence": 0.91, "bbox": [1, 2, 3, 4]}]},
+    "metadata": {"mock": False},
+}
+
+requires_msgpack = pytest.mark.skipif(not codec.MSGPACK_AVAILABLE, reason="msgpack not installed")
+requires_zstd = pytest.mark.skipif(not codec.ZSTD_AVAILABLE, reason="zstandard not installed")
+
+
+def test_json_round_trip():
+    body, content_type, content_encoding = encode(MESSAGE, codec="json", compress_threshold=0)
+
+    assert content_type == codec.JSON_CONTENT_TYPE
+    assert content_encoding is None
+    assert decode(body, content_type, content_encoding) == MESSAGE
+
+
+@requires_msgpack
+def test_msgpack_round_trip():
+    body, content_type, content_encoding = encode(MESSAGE, codec="msgpack", compress_threshold=0)
+
+    assert content_type == codec.MSGPACK_CONTENT_TYPE
+    assert content_encoding is None
+    assert decode(body, content_type, content_encoding) == MESSAGE
+
+
+@requires_zstd
+@pytest.mark.parametrize("name", ["json", pytest.param("msgpack", marks=requires_msgpack)])
+def test_large_bodies_are_compressed(name):
+    message = {**MESSAGE, "response_data": {"content": "word " * 5000}}
+    body, content_type, content_encoding = encode(message, codec=name, compress_threshold=1024)
+
+    assert content_encoding == codec.ZSTD_ENCODING
+    assert len(body) < 5000
+    assert decode(body, content_type, content_encoding) == message
+
+
+def test_small_bodies_are_not_compressed():
+    body, _, content_encoding = encode(MESSAGE, codec="json", compress_threshold=1 << 20)
+
+    assert content_encoding is None
+    assert json.loads(body) == MESSAGE
+
+
+def test_legacy_json_without_content_type():
+    body = json.dumps(MESSAGE).encode("utf-8")
+
+    assert decode(body) == MESSAGE
+    assert decode(body, "", None) == MESSAGE
+
+
+def test_non_json_values_are_stringified():
+    timestamp = datetime(2024, 1, 2, 3, 4, 5)
+    body, content_type, content_encoding = encode({"timestamp": timestamp}, codec="json", compress_threshold=0)
+
+    assert decode(body, content_type, content_encoding) == {"timestamp": str(timestamp)}
+
+
+@pytest.mark.parametrize("body, content_type, content_encoding", [
+    (b"not json", None, None),
+    (b"{}", "application/xml", None),
+    (b"{}", codec.JSON_CONTENT_TYPE, "gzip"),
+])
+def test_undecodable_bodies_raise_codec_error(body, content_type, content_encoding):
+    with pytest.raises(CodecError):
+        decode(body, content_type, content_encoding)
@@ -0,0 +1,200 @@
+"""
+MongoDB index tests - the /requests queries must be served by indexes.
+
+The query-shape tests check the filters, sorts and projections that
+MongoDBService builds against the declared indexes and always run. The
+explain-plan tests need a live server: set MONGODB_TEST_URI (they use the
+MONGO_DB_NAME database, ``milo_db_test`` by default).
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("pymongo")
+
+from database import mongo_service
+from database.pagination import next_cursor
+
+MONGODB_TEST_URI = os.getenv("MONGODB_TEST_URI")
+LIST_SORT = [("timestamp", mongo_service.DESCENDING), ("_id", mongo_service.DESCENDING)]
+
+
+class RecordingCursor:
+    def __init__(self, collection, query, projection):
+        collection.finds.append((query, projection))
+        self.collection = collection
+
+    def sort(self, keys):
+        self.collection.sorts.append(list(keys))
+        return self
+
+    def skip(self, n):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def __iter__(self):
+        return iter([])
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.finds = []
+        self.sorts = []
+
+    def find(self, query, projection=None):
+        return RecordingCursor(self, query, projection)
+
+
+@pytest.fixture
+def recorded():
+    service = mongo_service.MongoDBService.__new__(mongo_service.MongoDBService)
+    service.client = object()
+    service.requests_collection = RecordingCollection()
+    service._log_buffer = None
+    return service
+
+
+def _fields(query):
+    """Every field a filter references, including inside $or/$and."""
+    fields = set()
+    for key, value in query.items():
+        if key in ("$or", "$and"):
+            for clause in value:
+                fields |= _fields(clause)
+        else:
+            fields.add(key)
+    return fields
+
+
+def _covering_index(query, sort, projection):
+    """Name of a declared index that serves the query without a sort or fetch."""
+    equality = {k for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+    reversed_sort = [(k, -d) for k, d in sort]
+    for model in mongo_service.REQUEST_INDEXES:
+        keys = list(model.document["key"].items())
+        names = [k for k, _ in keys]
+        if set(names[:len(equality)]) != equality:
+            continue
+        if keys[len(equality):len(equality) + len(sort)] not in (sort, reversed_sort):
+            continue
+        if _fields(query) <= set(names) and set(projection) <= set(names):
+            return model.document["name"]
+    return None
+
+
+@pytest.mark.parametrize("service", [None, "bitnet"])
+def test_list_query_shape_is_covered(recorded, service):
+    recorded.get_requests(service=service, limit=50)
+    (query, projection), = recorded.requests_collection.finds
+    sort, = recorded.requests_collection.sorts
+
+    assert projection == mongo_service.REQUEST_LIST_FIELDS
+    expected = "service_timestamp" if service else "timestamp"
+    assert _covering_index(query, sort, projection) == expected
+
+
+@pytest.mark.parametrize("service", [None, "yolo"])
+def test_cursor_query_shape_is_covered(recorded, service):
+    cursor = next_cursor(
+        [{"_id": "0" * 24, "timestamp": "2024-01-01T12:00:00"}], 1, "_id"
+    )
+    recorded.get_requests(service=service, limit=1, cursor=cursor)
+    (query, projection), = recorded.requests_collection.finds
+    sort, = recorded.requests_collection.sorts
+
+    assert "timestamp" in query and "$or" in query
+    assert _covering_index(query, sort, projection) is not None
+
+
+def test_body_query_is_not_projected(recorded):
+    recorded.get_requests(limit=1, include_bodies=True)
+    (query, projection), = recorded.requests_collection.finds
+    sort, = recorded.requests_collection.sorts
+    assert projection is None
+    assert _covering_index(query, sort, {"_id": 1, "request": 1}) is None
+
+
+@pytest.fixture(scope="module")
+def db():
+    if not MONGODB_TEST_URI:
+        pytest.skip("MONGODB_TEST_URI not set")
+
+    uri, db_name = mongo_service.MONGO_URI, mongo_service.DB_NAME
+    mongo_service.MONGO_URI = MONGODB_TEST_URI
+    mongo_service.DB_NAME = os.getenv("MONGO_DB_NAME", "milo_db_test")
+    try:
+        service = mongo_service.MongoDBService()
+    finally:
+        mongo_service.MONGO_URI, mongo_service.DB_NAME = uri, db_name
+    if not service.is_connected():
+        pytest.skip("MongoDB not connected")
+    service.log_request("bitnet", {"prompt": "index test"}, {"content": "ok"})
+    service.log_request("yolo", {"filename": "index.jpg"}, {"detections": []})
+    service.flush()
+    yield service
+    service.close()
+
+
+def _stages(plan):
+    """All stage names in a winning plan, outermost first."""
+    stages = []
+    while plan:
+        stages.append(plan["stage"])
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+def _winning_plan(cursor):
+    explain = cursor.explain()
+    planner = explain.get("queryPlanner", {})
+    # Newer servers nest the classic plan under winningPlan.queryPlan.
+    plan = planner.get("winningPlan", {})
+    return plan.get("queryPlan", plan)
+
+
+def test_indexes_exist(db):
+    names = set(db.requests_collection.index_information())
+    assert {"service_timestamp", "timestamp"} <= names
+
+
+@pytest.mark.parametrize("query", [{}, {"service": "bitnet"}])
+def test_list_query_is_covered(db, query):
+    cursor = db.requests_collection.find(query, mongo_service.REQUEST_LIST_FIELDS).sort(LIST_SORT).limit(50)
+    stages = _stages(_winning_plan(cursor))
+
+    assert "IXSCAN" in stages
+    assert "COLLSCAN" not in stages
+    assert "SORT" not in stages
+    assert "FETCH" not in stages
+
+
+def test_list_results_have_no_bodies(db):
+    requests = db.get_requests(limit=5)
+    assert requests
+    assert all("request" not in r and "response" not in r for r in requests)
+
+    full = db.get_requests(limit=1, include_bodies=True)
+    assert "response" in full[0]
+
+
+def test_cursor_page_is_index_range_scan(db):
+    first = db.get_requests_page(limit=1)
+    assert first["next_cursor"]
+
+    query = db._after_cursor(first["next_cursor"])
+    cursor = db.requests_collection.find(query, mongo_service.REQUEST_LIST_FIELDS).sort(LIST_SORT).limit(50)
+    stages = _stages(_winning_plan(cursor))
+
+    assert "IXSCAN" in stages
+    assert "COLLSCAN" not in stages
+    assert "SORT" not in stages
+
+    second = db.get_requests_page(limit=1, cursor=first["next_cursor"])
+    assert second["requests"][0]["_id"] != first["requests"][0]["_id"]
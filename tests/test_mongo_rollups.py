@@ -0,0 +1,164 @@
+"""
+MongoDB rollup tests - logs written without rollups are backfilled once.
+
+The unit tests run against mongomock when it is installed. The backfill
+tests need a live server: set MONGODB_TEST_URI (they use the MONGO_DB_NAME
+database, ``milo_db_test`` by default).
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("pymongo")
+
+from database import mongo_service
+
+MONGODB_TEST_URI = os.getenv("MONGODB_TEST_URI")
+
+
+@pytest.fixture
+def mocked():
+    mongomock = pytest.importorskip("mongomock")
+    service = mongo_service.MongoDBService.__new__(mongo_service.MongoDBService)
+    service.client = mongomock.MongoClient()
+    service.db = service.client["milo_db_test"]
+    service.requests_collection = service.db[mongo_service.REQUESTS_COLLECTION]
+    service.rollups_collection = service.db[mongo_service.ROLLUPS_COLLECTION]
+    service._log_buffer = None
+    service._rollups_backfilled = False
+    return service
+
+
+@pytest.fixture(scope="module")
+def db():
+    if not MONGODB_TEST_URI:
+        pytest.skip("MONGODB_TEST_URI not set")
+
+    uri, db_name = mongo_service.MONGO_URI, mongo_service.DB_NAME
+    mongo_service.MONGO_URI = MONGODB_TEST_URI
+    mongo_service.DB_NAME = os.getenv("MONGO_DB_NAME", "milo_db_test")
+    try:
+        service = mongo_service.MongoDBService()
+    finally:
+        mongo_service.MONGO_URI, mongo_service.DB_NAME = uri, db_name
+    if not service.is_connected():
+        pytest.skip("MongoDB not connected")
+    yield service
+    service.close()
+
+
+def test_stats_read_rollups_once_backfilled(mocked):
+    from database.mongo_service import ROLLUPS_MARKER
+
+    hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    mocked.requests_collection.insert_many([{"service": "yolo"}, {"service": "bitnet"}])
+    mocked.rollups_collection.insert_many([
+        {"granularity": granularity, "bucket": hour, "service": service, "status": "success", "count": count}
+        for granularity in ("minute", "hour")
+        for service, count in (("yolo", 5), ("bitnet", 7))
+    ])
+
+    # Before the backfill has finished the rollups may be missing old logs.
+    mocked.rollups_collection.insert_one({"_id": ROLLUPS_MARKER, "state": "running"})
+    assert mocked.get_stats()["yolo_requests"] == 1
+
+    mocked.rollups_collection.update_one({"_id": ROLLUPS_MARKER}, {"$set": {"state": "done"}})
+    stats = mocked.get_stats()
+    assert stats == {"connected": True, "total_requests": 12, "yolo_requests": 5, "bitnet_requests": 7}
+
+
+def test_stale_running_marker_is_taken_over(mocked, monkeypatch):
+    from database.mongo_service import ROLLUPS_MARKER
+
+    backfills = []
+    monkeypatch.setattr(mocked, "backfill_rollups", lambda: backfills.append(True))
+    now = datetime.utcnow()
+    mocked.rollups_collection.insert_one({
+        "_id": ROLLUPS_MARKER, "state": "running", "started_at": now, "lease_until": now + timedelta(minutes=5)
+    })
+
+    # Another process holds a live lease.
+    assert mocked.ensure_rollups()
+    assert backfills == []
+
+    # It died: the lease ran out with the marker still "running".
+    mocked.rollups_collection.update_one({"_id": ROLLUPS_MARKER}, {"$set": {"lease_until": now - timedelta(seconds=1)}})
+    assert mocked.ensure_rollups()
+    assert backfills == [True]
+    assert mocked.rollups_collection.find_one({"_id": ROLLUPS_MARKER})["state"] == "done"
+
+
+def test_failed_backfill_releases_the_marker(mocked, monkeypatch):
+    from database.mongo_service import ROLLUPS_MARKER
+
+    def fail():
+        raise RuntimeError("aggregation failed")
+
+    monkeypatch.setattr(mocked, "backfill_rollups", fail)
+    assert not mocked.ensure_rollups()
+    assert mocked.rollups_collection.find_one({"_id": ROLLUPS_MARKER}) is None
+
+
+def test_retried_flush_rolls_up_each_document_once(mocked, monkeypatch):
+    from bson.objectid import ObjectId
+    from pymongo.errors import BulkWriteError
+    from database.write_buffer import WriteBehindBuffer
+
+    insert_many = mocked.requests_collection.insert_many
+    attempts = []
+
+    def flaky_insert_many(documents, ordered=True):
+        attempts.append(len(documents))
+        if len(attempts) > 1:
+            return insert_many(documents, ordered=ordered)
+        # The first attempt stores every document but the second.
+        insert_many([d for i, d in enumerate(documents) if i != 1], ordered=ordered)
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 91, "errmsg": "shutting down"}], "nInserted": 2})
+
+    rolled = []
+    monkeypatch.setattr(mocked.requests_collection, "insert_many", flaky_insert_many)
+    monkeypatch.setattr(mocked, "_update_rollups", lambda documents: rolled.extend(d["_id"] for d in documents))
+    buffer = WriteBehindBuffer("test-requests", mocked._insert_requests, retries=2, retry_backoff=0)
+    documents = [{"_id": ObjectId(), "service": "yolo", "timestamp": datetime.utcnow()} for _ in range(3)]
+    for document in documents:
+        buffer.add(document)
+    buffer.close()
+
+    assert attempts == [3, 3]
+    assert mocked.requests_collection.count_documents({}) == 3
+    # The retry hits duplicate keys for the first and third; they are not counted again.
+    assert sorted(rolled) == sorted(d["_id"] for d in documents)
+    assert buffer.stats()["failed"] == 0
+    assert buffer.stats()["retried"] == 1
+
+
+def test_backfill_counts_logs_written_before_rollups(db):
+    from bson.objectid import ObjectId
+    from database.mongo_service import ROLLUPS_MARKER
+
+    # An hour nothing else writes to, inserted behind the rollups' back.
+    bucket = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=3)
+    db.requests_collection.insert_many([
+        {"_id": ObjectId(), "service": "yolo", "timestamp": bucket + timedelta(minutes=i),
+         "request": {}, "response": {}, "status": "success", "latency_ms": 10.0 * (i + 1)}
+        for i in range(3)
+    ])
+    window = {"start": bucket, "end": bucket + timedelta(hours=1), "service": "yolo"}
+    before = db.get_request_stats(**window)["totals"]["count"]
+
+    db.rollups_collection.delete_one({"_id": ROLLUPS_MARKER})
+    assert db.ensure_rollups()
+    stats = db.get_request_stats(**window)
+    assert stats["totals"]["count"] == before + 3
+    assert stats["totals"]["latency_max_ms"] >= 30.0
+
+    # The marker now guards it; a second call does not recount.
+    assert db.rollups_collection.find_one({"_id": ROLLUPS_MARKER})["state"] == "done"
+    assert db.ensure_rollups()
+    assert db.get_request_stats(**window)["totals"]["count"] == before + 3
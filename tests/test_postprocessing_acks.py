@@ -0,0 +1,221 @@
+"""
+Postprocessing acknowledgement tests against a fake channel.
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import load_service_app
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("pika")
+
+load_service_app("postprocessing_app", "postprocessing-service")
+
+from postprocessing_app import consumer as consumer_module
+from postprocessing_app import sinks as sinks_module
+from postprocessing_app.acks import AckTracker
+
+
+class FakeChannel:
+    def __init__(self):
+        self.is_open = True
+        self.calls = []
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        if not self.is_open:
+            raise RuntimeError("channel closed")
+        self.calls.append(("ack", delivery_tag, multiple))
+
+    def basic_nack(self, delivery_tag, requeue=True):
+        if not self.is_open:
+            raise RuntimeError("channel closed")
+        self.calls.append(("nack", delivery_tag, requeue))
+
+
+class NullSink:
+    def write(self, outputs, summary):
+        pass
+
+
+@pytest.fixture
+def consumer(monkeypatch):
+    monkeypatch.setattr(consumer_module, "route_failure", lambda *args: "retry")
+    c = consumer_module.Consumer(workers=1, sink=NullSink())
+    c.channel = FakeChannel()
+    yield c
+    c.executor.shutdown(wait=False)
+
+
+def _deliver(consumer, *tags):
+    for tag in tags:
+        consumer.acks.add(tag)
+
+
+def test_out_of_order_completions_ack_contiguous_prefix():
+    acks = AckTracker()
+    for tag in range(1, 6):
+        acks.add(tag)
+
+    acks.ack(3)
+    acks.ack(2)
+    assert acks.collect() == (None, [])
+
+    acks.ack(1)
+    acks.ack(5)
+    assert acks.collect() == (3, [])
+    assert len(acks) == 2
+
+    acks.ack(4)
+    assert acks.collect() == (5, [])
+    assert len(acks) == 0
+
+
+def test_nack_is_returned_and_not_covered_by_multiple_ack():
+    acks = AckTracker()
+    for tag in range(1, 4):
+        acks.add(tag)
+
+    acks.nack(2, requeue=True)
+    acks.ack(1)
+    acks.ack(3)
+    assert acks.collect() == (3, [(2, True)])
+    assert acks.collect() == (None, [])
+
+
+def test_nack_at_end_of_prefix_leaves_ack_at_last_acked_tag():
+    acks = AckTracker()
+    for tag in range(1, 4):
+        acks.add(tag)
+
+    acks.ack(1)
+    acks.ack(2)
+    acks.nack(3, requeue=False)
+    assert acks.collect() == (2, [(3, False)])
+
+
+def test_flush_sends_nacks_before_multiple_ack(consumer):
+    _deliver(consumer, 1, 2, 3)
+    consumer.acks.ack(3)
+    consumer.acks.nack(2, requeue=True)
+    consumer.acks.ack(1)
+
+    consumer._flush_acks()
+    assert consumer.channel.calls == [("nack", 2, True), ("ack", 3, True)]
+
+
+def test_failed_message_is_routed_then_acked(consumer):
+    _deliver(consumer, 1, 2)
+    consumer.acks.ack(2)
+    consumer._fail(1, SimpleNamespace(), b"{}", "Processing error: boom")
+
+    consumer._flush_acks()
+    assert consumer.channel.calls == [("ack", 2, True)]
+    assert len(consumer.acks) == 0
+
+
+def test_route_failure_error_nacks_with_requeue(consumer, monkeypatch):
+    def broken(*args):
+        raise RuntimeError("publish failed")
+
+    monkeypatch.setattr(consumer_module, "route_failure", broken)
+    _deliver(consumer, 1, 2)
+    consumer.acks.ack(2)
+    consumer._fail(1, SimpleNamespace(), b"{}", "Processing error: boom")
+
+    consumer._flush_acks()
+    assert consumer.channel.calls == [("nack", 1, True), ("ack", 2, True)]
+
+
+def test_channel_close_drops_tags_and_ignores_late_completions(consumer):
+    _deliver(consumer, 1, 2, 3)
+    consumer.acks.ack(1)
+    consumer.channel.is_open = False
+
+    consumer._flush_acks()
+    assert consumer.channel.calls == []
+    assert len(consumer.acks) == 0
+
+    # A late completion for a tag from the closed channel is ignored rather
+    # than left to settle a new channel's tag with the same number.
+    consumer.channel = FakeChannel()
+    consumer.acks.ack(2)
+    _deliver(consumer, 1, 2)
+    consumer.acks.ack(1)
+    consumer._flush_acks()
+    assert consumer.channel.calls == [("ack", 1, True)]
+    assert len(consumer.acks) == 1
+
+
+class RecordingSink:
+    def __init__(self, fail_batches=False):
+        self.fail_batches = fail_batches
+        self.writes = []
+
+    def write(self, outputs, summary):
+        self.writes.append([dict(o) for o in outputs])
+        if self.fail_batches and len(outputs) > 1:
+            raise RuntimeError("partial write")
+
+
+def _message(tag, body):
+    return (tag, SimpleNamespace(content_type="application/json", content_encoding=None), body)
+
+
+def test_outputs_get_stable_ids_across_rewrites(consumer):
+    sink = RecordingSink(fail_batches=True)
+    consumer.sink = sink
+    bodies = [
+        b'{"service": "bitnet", "response_data": {"content": "a"}, "timestamp": "t1"}',
+        b'{"service": "bitnet", "response_data": {"content": "b"}, "timestamp": "t2"}',
+    ]
+    _deliver(consumer, 1, 2)
+    consumer.process_window([_message(1, bodies[0]), _message(2, bodies[1])])
+    # The failed window write is followed by one write per message.
+    batch, first, second = sink.writes
+    assert [o["_id"] for o in batch] == [first[0]["_id"], second[0]["_id"]]
+    assert first[0]["_id"] != second[0]["_id"]
+
+    consumer.process_window([_message(3, bodies[0])])
+    assert sink.writes[-1][0]["_id"] == first[0]["_id"]
+
+
+class BulkCollection:
+    """mongomock collection that applies ``bulk_write`` operations one by one.
+
+    mongomock's own ``bulk_write`` does not accept current pymongo operations.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            if isinstance(op, sinks_module.ReplaceOne):
+                self.collection.replace_one(op._filter, op._doc, upsert=op._upsert)
+            else:
+                self.collection.insert_one(op._doc)
+
+
+def test_mongo_sink_rewrite_does_not_duplicate(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.setattr(sinks_module, "MongoClient", mongomock.MongoClient)
+    sink = sinks_module.MongoSink()
+    sink.outputs = BulkCollection(sink.outputs)
+    outputs = [{"_id": f"abc:{i}", "service": "yolo", "detection_count": i} for i in range(3)]
+
+    # One output made it in before the batch failed; the retry rewrites all of them.
+    sink.outputs.insert_one(dict(outputs[0]))
+    sink.write(outputs, {"batch_size": 3})
+    sink.write(outputs, {"batch_size": 3})
+
+    assert sink.outputs.count_documents({}) == 3
+    assert sink.batches.count_documents({}) == 1
+    assert "_id" in outputs[0] and len(outputs[0]) == 3
@@ -0,0 +1,155 @@
+"""
+RabbitMQ publisher tests - publisher confirms against fake channels.
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("fastapi")
+pytest.importorskip("multipart")
+pika = pytest.importorskip("pika")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "api-gateway"))
+
+from pika.frame import Method
+from pika.spec import Basic
+from app.services import rabbitmq_publisher
+from app.services.rabbitmq_publisher import RabbitMQPublisher
+
+
+class FakeChannel:
+    def __init__(self, channel_number):
+        self.channel_number = channel_number
+        self.is_open = True
+        self.published = []
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append(body)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.is_open = True
+        self.ioloop = SimpleNamespace(call_later=lambda delay, fn: None)
+
+    def channel(self, on_open_callback):
+        pass
+
+
+@pytest.fixture
+def publisher():
+    pub = RabbitMQPublisher(channels=2, batch_size=100)
+    pub._connection = FakeConnection()
+    return pub
+
+
+def _open(publisher, *numbers):
+    channels = [FakeChannel(n) for n in numbers]
+    for channel in channels:
+        publisher._on_channel_ready(channel)
+    return channels
+
+
+def _send(publisher, *bodies):
+    publisher._buffer.extend((body, "application/json", None) for body in bodies)
+    publisher._drain()
+
+
+def _confirm(publisher, channel, method):
+    publisher._on_confirm(Method(channel.channel_number, method))
+
+
+def _unconfirmed(publisher, channel):
+    return [message[0] for message, _ in publisher._unconfirmed[channel.channel_number].values()]
+
+
+def test_multiple_ack_confirms_up_to_tag_on_its_channel(publisher):
+    one, two = _open(publisher, 1, 2)
+    _send(publisher, b"a", b"b", b"c", b"d", b"e", b"f")
+    # Round-robin: channel 1 got a, c, e (tags 1-3); channel 2 got b, d, f.
+    assert one.published == [b"a", b"c", b"e"]
+    assert two.published == [b"b", b"d", b"f"]
+
+    _confirm(publisher, one, Basic.Ack(delivery_tag=2, multiple=True))
+    assert _unconfirmed(publisher, one) == [b"e"]
+    assert _unconfirmed(publisher, two) == [b"b", b"d", b"f"]
+    assert publisher.stats()["confirmed"] == 2
+
+    _confirm(publisher, two, Basic.Ack(delivery_tag=3, multiple=False))
+    assert _unconfirmed(publisher, two) == [b"b", b"d"]
+    assert publisher.stats()["confirmed"] == 3
+    assert publisher.stats()["nacked"] == 0
+    assert publisher.stats()["unconfirmed"] == 3
+
+
+def test_multiple_nack_requeues_in_order_and_republishes(publisher):
+    channel, = _open(publisher, 1)
+    _send(publisher, b"a", b"b", b"c")
+    publisher._buffer.append((b"d", "application/json", None))
+
+    publisher.batch_size = 0
+    _confirm(publisher, channel, Basic.Nack(delivery_tag=2, multiple=True))
+    assert _unconfirmed(publisher, channel) == [b"c"]
+    assert [m[0] for m in publisher._buffer] == [b"a", b"b", b"d"]
+    assert publisher.stats()["nacked"] == 2
+    assert publisher.stats()["unconfirmed"] == 1
+
+    publisher.batch_size = 100
+    publisher._drain()
+    assert channel.published == [b"a", b"b", b"c", b"a", b"b", b"d"]
+    # Tags keep counting on the channel, so the retries are tags 4-6.
+    assert list(publisher._unconfirmed[1]) == [3, 4, 5, 6]
+
+
+def test_confirm_for_unknown_channel_or_tag_is_ignored(publisher):
+    channel, = _open(publisher, 1)
+    _send(publisher, b"a")
+
+    publisher._on_confirm(Method(9, Basic.Ack(delivery_tag=1, multiple=True)))
+    _confirm(publisher, channel, Basic.Ack(delivery_tag=5, multiple=False))
+    assert _unconfirmed(publisher, channel) == [b"a"]
+    assert publisher.stats()["confirmed"] == 0
+
+
+def test_closed_channel_requeues_unconfirmed_ahead_of_buffer(publisher):
+    channel, = _open(publisher, 1)
+    _send(publisher, b"a", b"b")
+    _confirm(publisher, channel, Basic.Ack(delivery_tag=1, multiple=False))
+    publisher._buffer.append((b"c", "application/json", None))
+
+    publisher._on_channel_closed(channel, "gone")
+    assert [m[0] for m in publisher._buffer] == [b"b", b"c"]
+    assert publisher.stats()["requeued"] == 1
+    assert publisher.stats()["unconfirmed"] == 0
+
+    # A late confirm from the closed channel does not touch the requeued message.
+    _confirm(publisher, channel, Basic.Ack(delivery_tag=2, multiple=True))
+    assert publisher.stats()["confirmed"] == 1
+
+
+def test_in_flight_limit_holds_back_the_buffer(publisher):
+    publisher.max_inflight = 2
+    channel, = _open(publisher, 1)
+    _send(publisher, b"a", b"b", b"c")
+    assert channel.published == [b"a", b"b"]
+
+    _confirm(publisher, channel, Basic.Ack(delivery_tag=1, multiple=False))
+    assert channel.published == [b"a", b"b", b"c"]
+
+
+def test_publisher_is_recreated_after_fork(monkeypatch):
+    monkeypatch.setattr(rabbitmq_publisher, "_publisher", None)
+    monkeypatch.setattr(rabbitmq_publisher, "_publisher_pid", None)
+    monkeypatch.setattr(rabbitmq_publisher.os, "getpid", lambda: 100)
+    parent = rabbitmq_publisher.get_rabbitmq_publisher()
+    assert rabbitmq_publisher.get_rabbitmq_publisher() is parent
+
+    monkeypatch.setattr(rabbitmq_publisher.os, "getpid", lambda: 101)
+    child = rabbitmq_publisher.get_rabbitmq_publisher()
+    assert child is not parent
+    assert rabbitmq_publisher.get_rabbitmq_publisher() is child
@@ -0,0 +1,154 @@
+"""
+Side-effect dispatcher tests - overflow policies, spill replay and drain.
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("fastapi")
+pytest.importorskip("multipart")
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "api-gateway"))
+
+from app.services import side_effects
+from app.services.side_effects import SideEffectDispatcher
+
+
+class SlowDispatcher(SideEffectDispatcher):
+    """Delivers by recording the record, once ``gate`` is open."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("max_size", 1)
+        kwargs.setdefault("workers", 1)
+        super().__init__(db_client=object(), firebase_client=object(), rabbitmq_client=object(), **kwargs)
+        self.gate = asyncio.Event()
+        self.started = asyncio.Event()
+        self.delivered = []
+
+    async def _deliver(self, record):
+        self.started.set()
+        await self.gate.wait()
+        self.delivered.append(record["request_data"]["i"])
+
+
+async def _submit(dispatcher, i):
+    return await dispatcher.submit("bitnet", {"i": i}, {"content": "ok"})
+
+
+async def _fill(dispatcher):
+    """One record held by the worker and one waiting in the (size 1) queue."""
+    assert await _submit(dispatcher, 0)
+    await dispatcher.started.wait()
+    assert await _submit(dispatcher, 1)
+
+
+def test_drop_policy_discards_when_full(tmp_path):
+    async def run():
+        dispatcher = SlowDispatcher(policy="drop", spill_path=str(tmp_path / "spill.jsonl"))
+        await _fill(dispatcher)
+        assert not await _submit(dispatcher, 2)
+
+        dispatcher.gate.set()
+        await dispatcher.stop(timeout=1)
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert dispatcher.delivered == [0, 1]
+    assert dispatcher.stats()["dropped"] == 1
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+def test_block_policy_waits_for_space(tmp_path):
+    async def run():
+        dispatcher = SlowDispatcher(policy="block", spill_path=str(tmp_path / "spill.jsonl"))
+        await _fill(dispatcher)
+        blocked = asyncio.create_task(_submit(dispatcher, 2))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+
+        dispatcher.gate.set()
+        assert await asyncio.wait_for(blocked, 1)
+        await dispatcher.stop(timeout=1)
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert dispatcher.delivered == [0, 1, 2]
+    assert dispatcher.stats()["dropped"] == 0
+
+
+def test_spilled_records_are_replayed_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(side_effects, "SIDE_EFFECT_REPLAY_INTERVAL", 0.01)
+    spill_path = tmp_path / "spill.jsonl"
+
+    async def run():
+        dispatcher = SlowDispatcher(policy="spill", spill_path=str(spill_path))
+        # A second gateway worker sharing the spill file.
+        other = SlowDispatcher(policy="spill", spill_path=str(spill_path))
+        await other.start()
+        other.gate.set()
+
+        await _fill(dispatcher)
+        assert await _submit(dispatcher, 2)
+        assert await _submit(dispatcher, 3)
+        assert spill_path.read_text().count("\n") == 2
+
+        dispatcher.gate.set()
+        for _ in range(100):
+            if len(dispatcher.delivered) + len(other.delivered) == 4:
+                break
+            await asyncio.sleep(0.01)
+        # Give any duplicate replay a chance to show up.
+        await asyncio.sleep(0.1)
+        await dispatcher.stop(timeout=1)
+        await other.stop(timeout=1)
+        return dispatcher, other
+
+    dispatcher, other = asyncio.run(run())
+    assert sorted(dispatcher.delivered + other.delivered) == [0, 1, 2, 3]
+    assert dispatcher.stats()["spilled"] == 2
+    assert dispatcher.stats()["replayed"] + other.stats()["replayed"] == 2
+    assert not spill_path.exists()
+    assert not list(tmp_path.glob("*.replay"))
+
+
+def test_stop_drains_pending_records(tmp_path):
+    async def run():
+        dispatcher = SlowDispatcher(policy="drop", max_size=10, spill_path=str(tmp_path / "spill.jsonl"))
+        for i in range(5):
+            assert await _submit(dispatcher, i)
+        asyncio.get_running_loop().call_later(0.05, dispatcher.gate.set)
+        await dispatcher.stop(timeout=1)
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert dispatcher.delivered == [0, 1, 2, 3, 4]
+    assert not dispatcher.running
+    assert dispatcher.stats()["dropped"] == 0
+
+
+@pytest.mark.parametrize("policy", ["drop", "spill"])
+def test_stop_timeout_drops_or_spills_leftovers(tmp_path, policy):
+    spill_path = tmp_path / "spill.jsonl"
+
+    async def run():
+        dispatcher = SlowDispatcher(policy=policy, max_size=10, spill_path=str(spill_path))
+        for i in range(3):
+            assert await _submit(dispatcher, i)
+        await dispatcher.started.wait()
+        await dispatcher.stop(timeout=0.05)
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    # Record 0 was in flight when the worker was cancelled; 1 and 2 were still queued.
+    assert dispatcher.delivered == []
+    if policy == "spill":
+        assert spill_path.read_text().count("\n") == 3
+        assert dispatcher.stats()["spilled"] == 3
+    else:
+        assert not spill_path.exists()
+        assert dispatcher.stats()["dropped"] == 3
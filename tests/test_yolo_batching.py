@@ -0,0 +1,174 @@
+"""
+YOLO batch scheduler tests with a stub executor.
+"""
+import time
+import asyncio
+
+from conftest import load_service_app
+
+load_service_app("yolo_app", "yolo-service")
+
+from yolo_app.batching import BatchScheduler
+
+
+class StubExecutor:
+    """Records each batch and answers with the image it was given."""
+
+    def __init__(self, fail_on=None, short=False):
+        self.batches = []
+        self.running = 0
+        self.max_running = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.fail_on = fail_on
+        self.short = short
+
+    async def run_batch(self, images):
+        self.batches.append(list(images))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.gate.wait()
+        finally:
+            self.running -= 1
+        if self.fail_on in images:
+            raise RuntimeError("worker crashed")
+        results = [{"image": image} for image in images]
+        return results[:-1] if self.short else results
+
+
+async def _settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_batches_are_capped_at_max_batch_size():
+    async def run():
+        stub = StubExecutor()
+        scheduler = BatchScheduler(stub.run_batch, max_batch_size=2, max_wait_ms=20)
+        images = [f"img{i}".encode() for i in range(5)]
+        results = await asyncio.gather(*(scheduler.submit(image) for image in images))
+        await scheduler.stop()
+        return stub, scheduler, images, results
+
+    stub, scheduler, images, results = asyncio.run(run())
+    assert [len(batch) for batch in stub.batches] == [2, 2, 1]
+    assert [r["image"] for r in results] == images
+    assert scheduler.stats()["batch_size_histogram"] == {"1": 1, "2": 2}
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    async def run():
+        stub = StubExecutor()
+        scheduler = BatchScheduler(stub.run_batch, max_batch_size=8, max_wait_ms=50)
+        start = time.monotonic()
+        first = asyncio.create_task(scheduler.submit(b"a"))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(scheduler.submit(b"b"))
+        await asyncio.gather(first, second)
+        elapsed = time.monotonic() - start
+        await scheduler.stop()
+        return stub, elapsed
+
+    stub, elapsed = asyncio.run(run())
+    # b arrived inside a's wait window, so both went in one batch once it expired.
+    assert stub.batches == [[b"a", b"b"]]
+    assert 0.04 <= elapsed < 1
+
+
+def test_busy_slots_queue_requests_into_larger_batches():
+    async def run():
+        stub = StubExecutor()
+        stub.gate.clear()
+        scheduler = BatchScheduler(stub.run_batch, max_batch_size=8, max_wait_ms=0, concurrency=2)
+        tasks = [asyncio.create_task(scheduler.submit(b"a"))]
+        await _settle()
+        tasks.append(asyncio.create_task(scheduler.submit(b"b")))
+        await _settle()
+        # Both slots are busy; these wait in the queue.
+        tasks += [asyncio.create_task(scheduler.submit(image)) for image in (b"c", b"d", b"e")]
+        await _settle()
+        assert stub.running == 2
+        assert scheduler.stats()["queued"] == 3
+
+        stub.gate.set()
+        await asyncio.gather(*tasks)
+        await scheduler.stop()
+        return stub
+
+    stub = asyncio.run(run())
+    assert stub.batches == [[b"a"], [b"b"], [b"c", b"d", b"e"]]
+    assert stub.max_running == 2
+
+
+def test_failed_batch_fails_only_its_own_callers():
+    async def run():
+        stub = StubExecutor(fail_on=b"bad")
+        scheduler = BatchScheduler(stub.run_batch, max_batch_size=2, max_wait_ms=20)
+        results = await asyncio.gather(
+            *(scheduler.submit(image) for image in (b"ok1", b"bad", b"ok2")),
+            return_exceptions=True
+        )
+        # The slot was released, so the scheduler keeps serving.
+        after = await scheduler.submit(b"later")
+        await scheduler.stop()
+        return results, after
+
+    results, after = asyncio.run(run())
+    # ok1 shared a batch with the failing image and gets the same error.
+    assert isinstance(results[0], RuntimeError)
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == {"image": b"ok2"}
+    assert after == {"image": b"later"}
+
+
+def test_short_result_list_fails_the_batch_instead_of_hanging():
+    async def run():
+        stub = StubExecutor(short=True)
+        scheduler = BatchScheduler(stub.run_batch, max_batch_size=2, max_wait_ms=20)
+        results = await asyncio.wait_for(
+            asyncio.gather(scheduler.submit(b"a"), scheduler.submit(b"b"), return_exceptions=True),
+            timeout=1
+        )
+        await scheduler.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_stop_fails_queued_requests():
+    async def run():
+        stub = StubExecutor()
+        stub.gate.clear()
+        scheduler = BatchScheduler(stub.run_batch, max_batch_size=1, max_wait_ms=0)
+        running = asyncio.create_task(scheduler.submit(b"a"))
+        await _settle()
+        queued = asyncio.create_task(scheduler.submit(b"b"))
+        await _settle()
+
+        stopping = asyncio.create_task(scheduler.stop())
+        await _settle()
+        stub.gate.set()
+        await stopping
+        return await asyncio.gather(running, queued, return_exceptions=True)
+
+    running, queued = asyncio.run(run())
+    assert running == {"image": b"a"}
+    assert isinstance(queued, RuntimeError)
+
+
+def test_stop_fails_the_batch_being_collected():
+    async def run():
+        stub = StubExecutor()
+        scheduler = BatchScheduler(stub.run_batch, max_batch_size=8, max_wait_ms=5000)
+        collecting = asyncio.create_task(scheduler.submit(b"a"))
+        await _settle()
+        # _collect() has taken the image off the queue and is waiting for more.
+        assert scheduler.stats()["queued"] == 0
+        await scheduler.stop()
+        return stub, await asyncio.wait_for(asyncio.gather(collecting, return_exceptions=True), timeout=1)
+
+    stub, (result,) = asyncio.run(run())
+    assert stub.batches == []
+    assert isinstance(result, RuntimeError)
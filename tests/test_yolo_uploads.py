@@ -0,0 +1,88 @@
+"""
+YOLO batch upload tests - archive extraction limits.
+"""
+import io
+import struct
+import tarfile
+import zipfile
+
+import pytest
+
+from conftest import load_service_app
+
+load_service_app("yolo_app", "yolo-service")
+
+from yolo_app import uploads
+from yolo_app.uploads import UploadError, extract_archive
+
+
+@pytest.fixture(autouse=True)
+def small_limits(monkeypatch):
+    monkeypatch.setattr(uploads, "YOLO_MAX_ARCHIVE_BYTES", 64 * 1024)
+    monkeypatch.setattr(uploads, "READ_CHUNK_BYTES", 4096)
+
+
+def _zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _lie_about_sizes(data, size):
+    """Rewrite every declared uncompressed size in a zip to ``size``."""
+    data = bytearray(data)
+    offset = data.find(b"PK\x03\x04")
+    while offset != -1:
+        struct.pack_into("<I", data, offset + 22, size)
+        offset = data.find(b"PK\x03\x04", offset + 4)
+    offset = data.find(b"PK\x01\x02")
+    while offset != -1:
+        struct.pack_into("<I", data, offset + 24, size)
+        offset = data.find(b"PK\x01\x02", offset + 4)
+    return bytes(data)
+
+
+def test_zip_images_are_extracted():
+    data = _zip({"a.jpg": b"one", "dir/b.png": b"two", "notes.txt": b"skip", "__MACOSX/c.jpg": b"skip"})
+    assert extract_archive(data) == [("a.jpg", b"one"), ("dir/b.png", b"two")]
+
+
+def test_declared_sizes_over_limit_are_rejected_early():
+    data = _zip({"a.jpg": b"\0" * (65 * 1024)})
+    with pytest.raises(UploadError, match="too large"):
+        extract_archive(data)
+
+
+def test_understated_zip_sizes_do_not_bypass_the_limit():
+    data = _lie_about_sizes(_zip({f"{i}.jpg": b"\0" * (40 * 1024) for i in range(4)}), 10)
+    assert sum(m.file_size for m in zipfile.ZipFile(io.BytesIO(data)).infolist()) == 40
+
+    with pytest.raises(UploadError):
+        extract_archive(data)
+
+
+def test_read_stops_once_the_budget_is_exceeded():
+    stream = io.BytesIO(b"\0" * (1024 * 1024))
+    with pytest.raises(UploadError, match="too large"):
+        uploads._read_limited(stream, 10 * 1024)
+    # Only the chunks up to the one that crossed the budget were read.
+    assert stream.tell() <= 10 * 1024 + uploads.READ_CHUNK_BYTES
+
+
+def test_tar_total_is_limited_across_members():
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for i in range(2):
+            content = b"\0" * (40 * 1024)
+            info = tarfile.TarInfo(f"{i}.jpg")
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    with pytest.raises(UploadError, match="too large"):
+        extract_archive(buffer.getvalue())
+
+
+def test_non_archive_is_rejected():
+    with pytest.raises(UploadError, match="zip or tar"):
+        extract_archive(b"not an archive")
@@ -0,0 +1,140 @@
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+YOLO_MAX_BATCH_SIZE = int(os.getenv("YOLO_MAX_BATCH_SIZE", "8"))
+YOLO_MAX_BATCH_WAIT_MS = float(os.getenv("YOLO_MAX_BATCH_WAIT_MS", "10"))
+
+
+class BatchScheduler:
+    """Groups concurrent detection requests into batched forward passes.
+
+    The first queued image opens a batch; more images are collected until
+    ``max_batch_size`` is reached or ``max_wait_ms`` has elapsed, then the
+    whole batch is handed to ``infer_fn`` and each caller gets its own result.
+    Up to ``concurrency`` batches run at once; while every slot is busy new
+    requests keep queueing and form larger batches.
+    """
+
+    def __init__(
+        self,
+        infer_fn: Callable[[List[bytes]], Awaitable[List[Dict[str, Any]]]],
+        max_batch_size: int = YOLO_MAX_BATCH_SIZE,
+        max_wait_ms: float = YOLO_MAX_BATCH_WAIT_MS,
+        concurrency: int = 1
+    ):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.concurrency = max(1, concurrency)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: Set[asyncio.Task] = set()
+        # The batch _collect() is filling; kept here so stop() can fail it.
+        self._collecting: List[Tuple[bytes, asyncio.Future]] = []
+        self.batches = 0
+        self.images = 0
+        self.histogram: Dict[int, int] = {}
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Batch scheduler started (max_batch_size={self.max_batch_size}, max_wait={self.max_wait * 1000:.0f}ms)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await asyncio.gather(*self._inflight, return_exceptions=True)
+        self._task = None
+        pending, self._collecting = self._collecting, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+    async def submit(self, image_bytes: bytes) -> Dict[str, Any]:
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_bytes, future))
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "concurrency": self.concurrency,
+            "inflight_batches": len(self._inflight),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "images": self.images,
+            "avg_batch_size": round(self.images / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.histogram.items())},
+        }
+
+    async def _collect(self) -> List[Tuple[bytes, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = self._collecting
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            self._collecting = []
+            task = asyncio.create_task(self._process(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _process(self, batch: List[Tuple[bytes, asyncio.Future]]):
+        images = [image for image, _ in batch]
+        self.batches += 1
+        self.images += len(images)
+        self.histogram[len(images)] = self.histogram.get(len(images), 0) + 1
+        try:
+            results = await self.infer_fn(images)
+        except Exception as e:
+            logger.error(f"Batch inference failed for {len(images)} images: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+        if len(results) != len(batch):
+            # Never leave a caller waiting on a result that will not come.
+            logger.error(f"Batch inference returned {len(results)} results for {len(images)} images")
+            error = RuntimeError("Batch inference returned the wrong number of results")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,197 @@
+import os
+import json
+import asyncio
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+YOLO_CACHE_ENABLED = os.getenv("YOLO_CACHE_ENABLED", "1") == "1"
+YOLO_CACHE_MAX_ENTRIES = int(os.getenv("YOLO_CACHE_MAX_ENTRIES", "1024"))
+YOLO_CACHE_DIR = os.getenv("YOLO_CACHE_DIR", "")
+YOLO_CACHE_TTL = float(os.getenv("YOLO_CACHE_TTL", "86400"))
+YOLO_CACHE_DISK_MAX_BYTES = int(os.getenv("YOLO_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+class DetectionCache:
+    """Content-addressed cache of detection results.
+
+    Keys are a SHA-256 of the image bytes plus the model signature (weights,
+    library version and thresholds), so a model or threshold change never
+    serves stale results. Entries live in an in-process LRU and, when
+    ``cache_dir`` is set, in a shared on-disk tier with TTL and a size cap.
+
+    Disk reads and writes run in threads. The size cap is enforced against
+    an index of the files this process has seen (scanned once at startup,
+    then updated on every write), oldest first.
+    """
+
+    def __init__(
+        self,
+        signature: str,
+        max_entries: int = YOLO_CACHE_MAX_ENTRIES,
+        cache_dir: str = YOLO_CACHE_DIR,
+        ttl: float = YOLO_CACHE_TTL,
+        disk_max_bytes: int = YOLO_CACHE_DISK_MAX_BYTES
+    ):
+        self.signature = signature
+        self.max_entries = max(1, max_entries)
+        self.cache_dir = cache_dir or None
+        self.ttl = ttl
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        # path -> (size, mtime), oldest write first.
+        self._disk_index: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._disk_bytes = 0
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+        }
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for path, size, mtime in sorted(self._disk_entries(), key=lambda e: e[2]):
+                self._disk_index[path] = (size, mtime)
+                self._disk_bytes += size
+
+    def key(self, image_bytes: bytes) -> str:
+        digest = hashlib.sha256(image_bytes)
+        digest.update(self.signature.encode())
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return (result, tier) or (None, None) on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if now - stored_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return result, "memory"
+                del self._memory[key]
+
+        if self.cache_dir:
+            result = await asyncio.to_thread(self._disk_get, key, now)
+            if result is not None:
+                self._remember(key, result, now)
+                self._counters["disk_hits"] += 1
+                return result, "disk"
+
+        self._counters["misses"] += 1
+        return None, None
+
+    async def set(self, key: str, result: Dict[str, Any]):
+        now = time.time()
+        self._remember(key, result, now)
+        self._counters["stores"] += 1
+        if self.cache_dir:
+            await asyncio.to_thread(self._disk_set, key, result)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+        hits = lookups - self._counters["misses"]
+        return {
+            "signature": self.signature,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "disk_enabled": self.cache_dir is not None,
+            "disk_bytes": self._disk_bytes,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            **self._counters,
+        }
+
+    def _remember(self, key: str, result: Dict[str, Any], now: float):
+        with self._lock:
+            self._memory[key] = (now, result)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl:
+                self._disk_remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to read detection cache entry {key}: {e}")
+            return None
+
+    def _disk_set(self, key: str, result: Dict[str, Any]):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = json.dumps(result).encode()
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write detection cache entry {key}: {e}")
+            return
+        with self._disk_lock:
+            previous = self._disk_index.pop(path, None)
+            if previous is not None:
+                self._disk_bytes -= previous[0]
+            self._disk_index[path] = (len(data), time.time())
+            self._disk_bytes += len(data)
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _disk_remove(self, path: str):
+        with self._disk_lock:
+            entry = self._disk_index.pop(path, None)
+            if entry is not None:
+                self._disk_bytes -= entry[0]
+        try:
+            os.remove(path)
+            self._counters["disk_evictions"] += 1
+        except FileNotFoundError:
+            pass
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _evict_disk(self):
+        """Drop expired entries, then the oldest, until 90% of the budget."""
+        now = time.time()
+        target = self.disk_max_bytes * 0.9
+        while True:
+            with self._disk_lock:
+                if not self._disk_index:
+                    return
+                path, (_, mtime) = next(iter(self._disk_index.items()))
+                if self._disk_bytes <= target and now - mtime <= self.ttl:
+                    return
+            self._disk_remove(path)
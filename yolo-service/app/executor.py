@@ -0,0 +1,127 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CPU_COUNT = os.cpu_count() or 1
+
+YOLO_EXECUTOR = os.getenv("YOLO_EXECUTOR", "process").lower()
+YOLO_WORKERS = int(os.getenv("YOLO_WORKERS", str(min(4, CPU_COUNT))))
+YOLO_TORCH_THREADS = int(os.getenv("YOLO_TORCH_THREADS", "0"))
+
+
+def _worker_id() -> str:
+    if multiprocessing.parent_process() is not None:
+        return f"pid-{os.getpid()}"
+    return threading.current_thread().name
+
+
+def _init_worker(torch_threads: int):
+    """Pin torch threads and load the model once per worker."""
+    import torch
+    torch.set_num_threads(torch_threads)
+    from .yolo_service import get_model
+    get_model()
+
+
+def _warmup() -> str:
+    return _worker_id()
+
+
+def _run_batch(images: List[bytes]) -> Tuple[str, float, List[Dict[str, Any]]]:
+    from .yolo_service import detect_batch
+    start = time.perf_counter()
+    results = detect_batch(images)
+    return _worker_id(), time.perf_counter() - start, results
+
+
+class InferenceExecutor:
+    """Runs YOLO batches on a pool of worker processes or threads.
+
+    ``process`` mode gives each worker its own interpreter and model, which
+    avoids the GIL entirely; ``thread`` mode shares one process and splits
+    the torch intra-op threads between workers instead.
+    """
+
+    def __init__(
+        self,
+        kind: str = YOLO_EXECUTOR,
+        workers: int = YOLO_WORKERS,
+        torch_threads: int = YOLO_TORCH_THREADS
+    ):
+        if kind not in ("process", "thread"):
+            logger.warning(f"Unknown YOLO executor '{kind}', using 'process'")
+            kind = "process"
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.torch_threads = torch_threads or max(1, CPU_COUNT // self.workers)
+        self._pool: Optional[Executor] = None
+        self._started_at = 0.0
+        self._busy: Dict[str, float] = {}
+        self._batches: Dict[str, int] = {}
+
+    async def start(self):
+        if self._pool is not None:
+            return
+        if self.kind == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.torch_threads,)
+            )
+        else:
+            import torch
+            torch.set_num_threads(self.torch_threads)
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="yolo-worker",
+                initializer=_init_worker,
+                initargs=(self.torch_threads,)
+            )
+        self._started_at = time.monotonic()
+
+        loop = asyncio.get_running_loop()
+        ready = await asyncio.gather(
+            *(loop.run_in_executor(self._pool, _warmup) for _ in range(self.workers))
+        )
+        logger.info(
+            f"YOLO {self.kind} pool ready: {len(set(ready))} workers, "
+            f"{self.torch_threads} torch threads each"
+        )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def run_batch(self, images: List[bytes]) -> List[Dict[str, Any]]:
+        await self.start()
+        loop = asyncio.get_running_loop()
+        worker, busy, results = await loop.run_in_executor(self._pool, _run_batch, images)
+        self._busy[worker] = self._busy.get(worker, 0.0) + busy
+        self._batches[worker] = self._batches.get(worker, 0) + 1
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "torch_threads_per_worker": self.torch_threads,
+            "uptime_seconds": round(uptime, 1),
+            "per_worker": {
+                worker: {
+                    "batches": self._batches[worker],
+                    "busy_seconds": round(busy, 3),
+                    "utilisation": round(busy / uptime, 4) if uptime else 0.0,
+                }
+                for worker, busy in sorted(self._busy.items())
+            },
+        }
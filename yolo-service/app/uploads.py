@@ -0,0 +1,84 @@
+import io
+import os
+import tarfile
+import zipfile
+import zlib
+from typing import BinaryIO, List, Tuple
+
+YOLO_MAX_BATCH_IMAGES = int(os.getenv("YOLO_MAX_BATCH_IMAGES", "64"))
+YOLO_MAX_ARCHIVE_BYTES = int(os.getenv("YOLO_MAX_ARCHIVE_BYTES", str(200 * 1024 * 1024)))
+READ_CHUNK_BYTES = 1024 * 1024
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".gif", ".tif", ".tiff"}
+
+
+class UploadError(ValueError):
+    pass
+
+
+def _is_image_name(name: str) -> bool:
+    base = os.path.basename(name)
+    if not base or base.startswith(".") or name.startswith("__MACOSX/"):
+        return False
+    return os.path.splitext(base)[1].lower() in IMAGE_EXTENSIONS
+
+
+def _check_limits(count: int, total_bytes: int):
+    if count > YOLO_MAX_BATCH_IMAGES:
+        raise UploadError(f"Too many images (max {YOLO_MAX_BATCH_IMAGES})")
+    if total_bytes > YOLO_MAX_ARCHIVE_BYTES:
+        raise UploadError(f"Archive too large (max {YOLO_MAX_ARCHIVE_BYTES} bytes uncompressed)")
+
+
+def _read_limited(stream: BinaryIO, budget: int) -> bytes:
+    """Read ``stream`` in chunks, failing as soon as more than ``budget`` bytes come out."""
+    chunks = []
+    total = 0
+    while True:
+        chunk = stream.read(READ_CHUNK_BYTES)
+        if not chunk:
+            return b"".join(chunks)
+        total += len(chunk)
+        if total > budget:
+            raise UploadError(f"Archive too large (max {YOLO_MAX_ARCHIVE_BYTES} bytes uncompressed)")
+        chunks.append(chunk)
+
+
+def extract_archive(data: bytes) -> List[Tuple[str, bytes]]:
+    """Return (name, bytes) for every image in a zip or tar archive.
+
+    The declared member sizes only give an early rejection; the size limit
+    is enforced on the bytes actually decompressed.
+    """
+    buffer = io.BytesIO(data)
+    images: List[Tuple[str, bytes]] = []
+    budget = YOLO_MAX_ARCHIVE_BYTES
+
+    if zipfile.is_zipfile(buffer):
+        try:
+            with zipfile.ZipFile(buffer) as archive:
+                members = [m for m in archive.infolist() if not m.is_dir() and _is_image_name(m.filename)]
+                _check_limits(len(members), sum(m.file_size for m in members))
+                for member in members:
+                    with archive.open(member) as extracted:
+                        content = _read_limited(extracted, budget)
+                    budget -= len(content)
+                    images.append((member.filename, content))
+        except (zipfile.BadZipFile, zlib.error) as e:
+            raise UploadError(f"Corrupt zip archive: {e}")
+        return images
+
+    buffer.seek(0)
+    try:
+        with tarfile.open(fileobj=buffer, mode="r:*") as archive:
+            members = [m for m in archive.getmembers() if m.isfile() and _is_image_name(m.name)]
+            _check_limits(len(members), sum(m.size for m in members))
+            for member in members:
+                extracted = archive.extractfile(member)
+                if extracted is not None:
+                    content = _read_limited(extracted, budget)
+                    budget -= len(content)
+                    images.append((member.name, content))
+    except tarfile.TarError:
+        raise UploadError("Archive must be a zip or tar file")
+    return images
@@ -1,9 +1,17 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from fastapi import FastAPI, HTTPException, status, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from telemetry import instrument_app, observe
+from .batching import BatchScheduler
+from .cache import YOLO_CACHE_ENABLED, DetectionCache
+from .executor import InferenceExecutor
+from .uploads import YOLO_MAX_BATCH_IMAGES, UploadError, extract_archive
 
 try:
-    from .yolo_service import detect_objects
+    from .yolo_service import MODEL_SIGNATURE
     YOLO_AVAILABLE = True
 except ImportError as e:
     logging.error(f"Could not import YOLO service: {e}")
@@ -12,9 +20,26 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+executor = InferenceExecutor() if YOLO_AVAILABLE else None
+scheduler = BatchScheduler(executor.run_batch, concurrency=executor.workers) if executor else None
+cache = DetectionCache(MODEL_SIGNATURE) if YOLO_AVAILABLE and YOLO_CACHE_ENABLED else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if scheduler:
+        await executor.start()
+        await scheduler.start()
+    yield
+    if scheduler:
+        await scheduler.stop()
+        executor.shutdown()
+
+
 app = FastAPI(
     title="YOLO Object Detection Service",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -24,6 +49,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrument_app(app)
 
 
 @app.get("/health")
@@ -34,6 +60,33 @@ async def health():
     }
 
 
+@app.get("/stats")
+async def stats():
+    return {
+        "batching": scheduler.stats() if scheduler else None,
+        "workers": executor.stats() if executor else None,
+        "cache": cache.stats() if cache else None
+    }
+
+
+async def _detect(image_bytes: bytes) -> dict:
+    """Serve from the detection cache, or run the image through the scheduler."""
+    if cache is None:
+        with observe("model", "detect"):
+            return await scheduler.submit(image_bytes)
+    
+    key = cache.key(image_bytes)
+    cached, tier = await cache.get(key)
+    if cached is not None:
+        return {**cached, "cache": {"hit": True, "tier": tier}}
+    
+    with observe("model", "detect"):
+        result = await scheduler.submit(image_bytes)
+    if "error" not in result:
+        await cache.set(key, result)
+    return {**result, "cache": {"hit": False}}
+
+
 @app.post("/detect")
 async def detect(file: UploadFile = File(...)):
     if not YOLO_AVAILABLE:
@@ -44,7 +97,7 @@ async def detect(file: UploadFile = File(...)):
     
     try:
         contents = await file.read()
-        result = detect_objects(contents)
+        result = await _detect(contents)
         
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
@@ -57,3 +110,50 @@ async def detect(file: UploadFile = File(...)):
         logger.error(f"YOLO processing error: {e}")
         raise HTTPException(status_code=500, detail=f"YOLO processing error: {str(e)}")
 
+
+@app.post("/detect/batch")
+async def detect_batch_endpoint(
+    files: Optional[List[UploadFile]] = File(default=None),
+    archive: Optional[UploadFile] = File(default=None)
+):
+    if not YOLO_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="YOLO service is not available"
+        )
+    
+    try:
+        images = []
+        for upload in files or []:
+            images.append((upload.filename or f"image_{len(images)}.jpg", await upload.read()))
+        if archive is not None:
+            images.extend(extract_archive(await archive.read()))
+        
+        if not images:
+            raise HTTPException(status_code=400, detail="No images provided")
+        if len(images) > YOLO_MAX_BATCH_IMAGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many images (max {YOLO_MAX_BATCH_IMAGES})"
+            )
+        
+        detections = await asyncio.gather(*(_detect(data) for _, data in images))
+        results = [
+            {"filename": filename, **result}
+            for (filename, _), result in zip(images, detections)
+        ]
+        
+        return {
+            "results": results,
+            "total_images": len(results),
+            "failed_images": sum(1 for r in results if "error" in r),
+            "total_objects": sum(r["total_objects"] for r in results)
+        }
+        
+    except HTTPException:
+        raise
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"YOLO batch processing error: {e}")
+        raise HTTPException(status_code=500, detail=f"YOLO processing error: {str(e)}")
@@ -1,33 +1,80 @@
+import ultralytics
 from ultralytics import YOLO
 from PIL import Image
+from typing import List, Dict, Any
 import io
 import os
+import threading
 
 os.environ["TORCH_WEIGHTS_ONLY"] = "False"
 
-model = YOLO("yolo11n.pt")
+YOLO_MODEL = os.getenv("YOLO_MODEL", "yolo11n.pt")
+YOLO_CONF_THRESHOLD = float(os.getenv("YOLO_CONF_THRESHOLD", "0.25"))
+YOLO_IOU_THRESHOLD = float(os.getenv("YOLO_IOU_THRESHOLD", "0.7"))
 
-def detect_objects(image_bytes: bytes):
-    try:
-        image = Image.open(io.BytesIO(image_bytes))
-    except Exception:
-        return {"error": "invalid image", "detections": [], "total_objects": 0}
-    
-    results = model(image)
-    
+# Everything that changes the detections for a given image.
+MODEL_SIGNATURE = (
+    f"{YOLO_MODEL}:ultralytics-{ultralytics.__version__}"
+    f":conf={YOLO_CONF_THRESHOLD}:iou={YOLO_IOU_THRESHOLD}"
+)
+
+# Ultralytics predictors are not thread-safe, so each worker thread
+# (or process) loads its own copy of the model on first use.
+_local = threading.local()
+
+
+def get_model() -> YOLO:
+    model = getattr(_local, "model", None)
+    if model is None:
+        model = YOLO(YOLO_MODEL)
+        _local.model = model
+    return model
+
+
+def _invalid_image():
+    return {"error": "invalid image", "detections": [], "total_objects": 0}
+
+
+def _format_result(model, result) -> Dict[str, Any]:
     detections = []
-    for box in results[0].boxes:
+    for box in result.boxes:
         cls_id = int(box.cls[0])
         label = model.names[cls_id]
         conf = float(box.conf[0])
-        
+
         detections.append({
             "label": label,
             "confidence": round(conf, 3)
         })
-    
+
     return {
         "detections": detections,
         "total_objects": len(detections)
     }
 
+
+def detect_batch(images: List[bytes]) -> List[Dict[str, Any]]:
+    """Run one forward pass over several images; results keep input order."""
+    results: List[Dict[str, Any]] = [_invalid_image() for _ in images]
+    decoded = []
+    positions = []
+    for index, image_bytes in enumerate(images):
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            image.load()
+        except Exception:
+            continue
+        decoded.append(image)
+        positions.append(index)
+
+    if decoded:
+        model = get_model()
+        outputs = model(decoded, conf=YOLO_CONF_THRESHOLD, iou=YOLO_IOU_THRESHOLD, verbose=False)
+        for index, output in zip(positions, outputs):
+            results[index] = _format_result(model, output)
+
+    return results
+
+
+def detect_objects(image_bytes: bytes):
+    return detect_batch([image_bytes])[0]